@@ -0,0 +1,169 @@
+"""
+Account Registry
+Builds the monitored account list from character files plus a schedule sidecar
+"""
+
+import os
+import json
+import glob
+import logging
+import tempfile
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+ALL_HOURS = list(range(24))
+
+@dataclass
+class AccountConfig:
+    username: str
+    display_name: str
+    schedule_description: str
+    active_hours_utc: List[int]  # Hours when posts are expected
+    max_posts_per_day: int
+    min_interval_minutes: int
+    max_interval_minutes: int
+    reply_window_minutes: int = None  # Expected reply time for mentions
+    checks: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Extra analyzer checks and their settings
+    character_file: Optional[str] = None
+    active_hours_mask: int = field(init=False, repr=False, compare=False)  # Bit h set = hour h is active
+
+    def __post_init__(self):
+        self.active_hours_mask = 0
+        for hour in self.active_hours_utc:
+            self.active_hours_mask |= 1 << hour
+
+    def is_active_hour(self, hour: int) -> bool:
+        return bool(self.active_hours_mask >> hour & 1)
+
+def _hours_between(start: str, end: str) -> List[int]:
+    """Hours from 'HH:MM' start up to (not including) end, wrapping past midnight"""
+    first, last = int(start.split(':')[0]), int(end.split(':')[0])
+    if first == last:
+        return list(ALL_HOURS)
+    return [(first + offset) % 24 for offset in range((last - first) % 24)]
+
+def schedule_from_character(character: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The schedule a character file implies: its Twitter handle, posting
+    interval, daily limit, active hours and reply window, where present.
+    Secrets other than the Twitter username are never read.
+    """
+    secrets = (character.get('settings') or {}).get('secrets') or {}
+    constraints = character.get('postingConstraints') or {}
+    memory = constraints.get('memory') or {}
+    timing_policy = character.get('POST_TIMING_POLICY') or {}
+    schedule = {'display_name': character.get('name')}
+
+    username = secrets.get('TWITTER_USERNAME') or character.get('TWITTER_USERNAME')
+    if username:
+        schedule['username'] = username
+    if 'minTimeBetweenPosts' in memory:
+        schedule['min_interval_minutes'] = memory['minTimeBetweenPosts'] // 60
+    elif 'POST_INTERVAL_MIN' in character:
+        schedule['min_interval_minutes'] = character['POST_INTERVAL_MIN']
+    if 'maxTimeBetweenPosts' in memory:
+        schedule['max_interval_minutes'] = memory['maxTimeBetweenPosts'] // 60
+    elif 'POST_INTERVAL_MAX' in character:
+        schedule['max_interval_minutes'] = character['POST_INTERVAL_MAX']
+    if 'maxPostsPerDay' in memory:
+        schedule['max_posts_per_day'] = memory['maxPostsPerDay']
+    elif 'daily_max' in timing_policy:
+        schedule['max_posts_per_day'] = timing_policy['daily_max']
+    if 'acknowledgmentResponseWindow' in memory:
+        schedule['reply_window_minutes'] = memory['acknowledgmentResponseWindow'] // 60
+    active = constraints.get('activeHours') or {}
+    if active.get('timezone', 'UTC') == 'UTC' and 'start' in active and 'end' in active:
+        schedule['active_hours_utc'] = _hours_between(active['start'], active['end'])
+    return schedule
+
+def _build_account(key: str, schedule: Dict[str, Any]) -> AccountConfig:
+    interval_min = schedule.get('min_interval_minutes', 60)
+    interval_max = schedule.get('max_interval_minutes', 1440)
+    active_hours = schedule.get('active_hours_utc', ALL_HOURS)
+    return AccountConfig(
+        username=schedule['username'],
+        display_name=schedule.get('display_name') or key,
+        schedule_description=schedule.get('schedule_description') or
+            f"Every {interval_min}-{interval_max} min, {len(active_hours)} active hours/day",
+        active_hours_utc=sorted(set(active_hours), key=active_hours.index),
+        max_posts_per_day=schedule.get('max_posts_per_day', 24),
+        min_interval_minutes=interval_min,
+        max_interval_minutes=interval_max,
+        reply_window_minutes=schedule.get('reply_window_minutes'),
+        checks=schedule.get('checks') or {},
+        character_file=schedule.get('character')
+    )
+
+def _fingerprint(paths: List[str]) -> List[List[Any]]:
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+    return fingerprint
+
+def _parse_accounts(schedule_path: str, character_paths: List[str]) -> Dict[str, AccountConfig]:
+    sidecar = {}
+    if os.path.exists(schedule_path):
+        with open(schedule_path, encoding='utf-8') as f:
+            sidecar = json.load(f).get('accounts', {})
+    keys_by_file = {entry['character']: key for key, entry in sidecar.items() if entry.get('character')}
+
+    accounts = {}
+    for path in character_paths:
+        file_name = os.path.basename(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                character = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable character file {file_name}: {e}")
+            continue
+
+        key = keys_by_file.get(file_name, file_name.split('.')[0].lower())
+        schedule = {**schedule_from_character(character), 'character': file_name, **sidecar.get(key, {})}
+        if not schedule.get('username'):
+            continue  # Not a Twitter character, and no handle given in the sidecar
+        accounts[key] = _build_account(key, schedule)
+
+    # Accounts listed only in the sidecar, e.g. agents whose character lives elsewhere
+    for key, entry in sidecar.items():
+        if key not in accounts and entry.get('username'):
+            accounts[key] = _build_account(key, entry)
+    return accounts
+
+def load_accounts(characters_dir: str, schedule_path: str, cache_path: Optional[str] = None) -> Dict[str, AccountConfig]:
+    """
+    Monitored accounts keyed by account key. Character files can be large, so
+    the compiled result is cached in `cache_path` and reused until any
+    character file or the sidecar changes.
+    """
+    character_paths = sorted(glob.glob(os.path.join(characters_dir, "*.character.json")))
+    sources = character_paths + ([schedule_path] if os.path.exists(schedule_path) else [])
+    fingerprint = _fingerprint(sources)
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('fingerprint') == fingerprint:
+                return {key: AccountConfig(**fields) for key, fields in cached['accounts'].items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable account cache {cache_path}: {e}")
+
+    accounts = _parse_accounts(schedule_path, character_paths)
+
+    if cache_path:
+        compiled = {}
+        for key, account in accounts.items():
+            fields = asdict(account)
+            del fields['active_hours_mask']  # Derived again on load
+            compiled[key] = fields
+        # Every process importing config can get here at once, so each writes its own
+        # temporary file and the last rename wins
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(cache_path) or '.',
+                                         prefix=f"{os.path.basename(cache_path)}.", suffix='.tmp',
+                                         delete=False) as f:
+            json.dump({'fingerprint': fingerprint, 'accounts': compiled}, f)
+        os.replace(f.name, cache_path)
+    return accounts
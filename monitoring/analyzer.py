@@ -3,101 +3,269 @@ Schedule Analysis Module
 Analyzes posting patterns and generates compliance reports
 """
 
-import sqlite3
+import os
 import json
+import time
+from collections import Counter, deque
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 import logging
 
 from config import ACCOUNTS, MONITORING_CONFIG, DATA_DIR, REPORTS_DIR
+from storage import get_storage
+from migrations import migrate, from_epoch
+from metrics import METRICS
+from rolling_windows import NEW_POSTS_SQL, ACCOUNT_POSTS_SQL, get_windows
 
 logger = logging.getLogger(__name__)
 
+POSTS_IN_TIMEFRAME_SQL = '''
+    SELECT id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes, scraped_at
+    FROM posts 
+    WHERE username = ? AND timestamp > ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
+HOURLY_ROLLUPS_SQL = '''
+    SELECT hour_start, total_posts, original_posts, reply_posts, first_original, last_original
+    FROM post_rollups_hourly
+    WHERE username = ? AND hour_start >= ?
+'''
+
+BUSIEST_DAY_SQL = '''
+    SELECT MAX(original_posts)
+    FROM post_rollups_daily
+    WHERE username = ? AND day_start >= ?
+'''
+
+# Engagement gained per hour across an account's posts, from the metrics history deltas
+ENGAGEMENT_BY_HOUR_SQL = '''
+    SELECT scraped_at / 3600 AS hour, COUNT(*), SUM(likes), SUM(retweets), SUM(replies), SUM(quotes)
+    FROM post_metrics_history
+    WHERE username = ? AND scraped_at / 3600 >= ?
+    GROUP BY scraped_at / 3600
+    ORDER BY scraped_at / 3600
+'''
+
+# One post's engagement deltas in scrape order, straight off the primary key
+POST_ENGAGEMENT_SQL = '''
+    SELECT scraped_at, likes, retweets, replies, quotes
+    FROM post_metrics_history
+    WHERE post_id = ?
+    ORDER BY scraped_at
+'''
+
+# An account's hourly rollups in order, for the compliance sweep
+SWEEP_ROLLUPS_SQL = '''
+    SELECT hour_start, total_posts, original_posts, reply_posts, first_original, last_original
+    FROM post_rollups_hourly
+    WHERE username = ? AND hour_start >= ? AND hour_start < ?
+    ORDER BY hour_start
+'''
+
+COMPLIANCE_HISTORY_SQL = '''
+    SELECT window_end, compliance_score, posts_found, original_posts, reply_posts,
+           active_hours_compliance, average_interval_minutes, issues, checks
+    FROM compliance_history
+    WHERE username = ? AND window_hours = ? AND window_end > ? AND window_end % ? = 0
+    ORDER BY window_end
+'''
+
+# What _check_schedule puts in every analysis; anything else came from the account's own checks
+ANALYSIS_FIELDS = {'account', 'display_name', 'analysis_period_hours', 'expected_schedule', 'posts_found',
+                   'compliance_score', 'issues', 'recommendations', 'post_details', 'original_posts_count',
+                   'active_hours_compliance', 'average_interval_minutes'}
+
+# Every query this module runs, with sample parameters for query plan checks
+QUERIES = {
+    'posts_in_timeframe': (POSTS_IN_TIMEFRAME_SQL, ('LadyMacbethAI', 0, -1)),
+    'hourly_rollups': (HOURLY_ROLLUPS_SQL, ('LadyMacbethAI', 0)),
+    'busiest_day': (BUSIEST_DAY_SQL, ('LadyMacbethAI', 0)),
+    'engagement_by_hour': (ENGAGEMENT_BY_HOUR_SQL, ('LadyMacbethAI', 0)),
+    'post_engagement': (POST_ENGAGEMENT_SQL, ('1',)),
+    'rolling_window_new_posts': (NEW_POSTS_SQL, (0,)),
+    'rolling_window_account': (ACCOUNT_POSTS_SQL, ('LadyMacbethAI', 0)),
+    'sweep_rollups': (SWEEP_ROLLUPS_SQL, ('LadyMacbethAI', 0, 0)),
+    'compliance_history': (COMPLIANCE_HISTORY_SQL, ('LadyMacbethAI', 24, 0, 86400)),
+}
+
 class ScheduleAnalyzer:
-    def __init__(self):
-        self.db_path = f"{DATA_DIR}/twitter_monitoring.db"
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or f"{DATA_DIR}/twitter_monitoring.db"
+        self.storage = get_storage(self.db_path)
+        migrate(self.storage)
     
-    def get_posts_in_timeframe(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
-        """Get all posts for a user in the specified timeframe"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_posts_in_timeframe(self, username: str, hours_back: int = 24,
+                               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get all posts for a user in the specified timeframe, newest first"""
         cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_back)
         
-        cursor.execute('''
-            SELECT id, username, content, timestamp, post_type, reply_to, metrics, scraped_at
-            FROM posts 
-            WHERE username = ? AND timestamp > ?
-            ORDER BY timestamp DESC
-        ''', (username, cutoff_time.isoformat()))
+        with METRICS.timer('monitoring_analyzer_query_seconds', query='posts_in_timeframe'), \
+             self.storage.reader() as conn:
+            rows = conn.execute(POSTS_IN_TIMEFRAME_SQL,
+                                (username, int(cutoff_time.timestamp()), limit or -1)).fetchall()
         
         posts = []
-        for row in cursor.fetchall():
+        for row in rows:
             posts.append({
                 'id': row[0],
                 'username': row[1],
                 'content': row[2],
-                'timestamp': datetime.fromisoformat(row[3].replace('Z', '+00:00')),
+                'timestamp': from_epoch(row[3]),
                 'post_type': row[4],
                 'reply_to': row[5],
-                'metrics': json.loads(row[6]) if row[6] else {},
-                'scraped_at': row[7]
+                'metrics': {'likes': row[6], 'retweets': row[7], 'replies': row[8], 'quotes': row[9]},
+                'scraped_at': from_epoch(row[10]).isoformat() if row[10] is not None else None
             })
         
-        conn.close()
         return posts
     
+    def get_engagement_by_hour(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
+        """Likes, retweets, replies and quotes an account's posts gained in each hour, oldest first"""
+        first_hour = int(datetime.now(timezone.utc).timestamp()) // 3600 - hours_back
+        with METRICS.timer('monitoring_analyzer_query_seconds', query='engagement_by_hour'), \
+             self.storage.reader() as conn:
+            rows = conn.execute(ENGAGEMENT_BY_HOUR_SQL, (username, first_hour)).fetchall()
+        return [{
+            'hour': from_epoch(hour * 3600).isoformat(),
+            'snapshots': snapshots,
+            'likes': likes,
+            'retweets': retweets,
+            'replies': replies,
+            'quotes': quotes
+        } for hour, snapshots, likes, retweets, replies, quotes in rows]
+    
+    def get_post_engagement(self, post_id: str) -> List[Dict[str, Any]]:
+        """A post's engagement as of each scrape that saw it change, oldest first"""
+        with METRICS.timer('monitoring_analyzer_query_seconds', query='post_engagement'), \
+             self.storage.reader() as conn:
+            rows = conn.execute(POST_ENGAGEMENT_SQL, (post_id,)).fetchall()
+        history = []
+        totals = [0, 0, 0, 0]
+        for scraped_at, *deltas in rows:
+            totals = [total + delta for total, delta in zip(totals, deltas)]
+            history.append({'scraped_at': from_epoch(scraped_at).isoformat(),
+                            **dict(zip(('likes', 'retweets', 'replies', 'quotes'), totals))})
+        return history
+    
+    def _activity_from_posts(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Counts the schedule checks need, from raw posts"""
+        originals = [p for p in posts if p['post_type'] == 'original']
+        return {
+            'posts_found': len(posts),
+            'original_posts': len(originals),
+            'reply_posts': sum(1 for p in posts if p['post_type'] == 'reply'),
+            'posts_by_hour': Counter(p['timestamp'].hour for p in posts),
+            'originals_by_hour': Counter(p['timestamp'].hour for p in originals),
+            'first_original': min((p['timestamp'] for p in originals), default=None),
+            'last_original': max((p['timestamp'] for p in originals), default=None),
+            # Short windows are checked as a whole against the daily limit
+            'daily_originals': len(originals)
+        }
+    
+    def _activity_from_rollups(self, username: str, hours_back: int) -> Dict[str, Any]:
+        """
+        The same counts from hourly/daily rollups, for windows too long to read
+        post by post. The window starts on an hour boundary.
+        """
+        cutoff = int((datetime.now(timezone.utc) - timedelta(hours=hours_back)).timestamp())
+        activity = {
+            'posts_found': 0,
+            'original_posts': 0,
+            'reply_posts': 0,
+            'posts_by_hour': Counter(),
+            'originals_by_hour': Counter(),
+            'first_original': None,
+            'last_original': None,
+            'daily_originals': 0
+        }
+        
+        with METRICS.timer('monitoring_analyzer_query_seconds', query='rollups'), \
+             self.storage.reader() as conn:
+            rows = conn.execute(HOURLY_ROLLUPS_SQL, (username, cutoff // 3600 * 3600)).fetchall()
+            busiest_day = conn.execute(BUSIEST_DAY_SQL, (username, cutoff // 86400 * 86400)).fetchone()[0]
+        
+        first_original = last_original = None
+        for hour_start, total, originals, replies, first, last in rows:
+            hour = from_epoch(hour_start).hour
+            activity['posts_found'] += total
+            activity['original_posts'] += originals
+            activity['reply_posts'] += replies
+            activity['posts_by_hour'][hour] += total
+            activity['originals_by_hour'][hour] += originals
+            if first is not None:
+                first_original = first if first_original is None else min(first_original, first)
+                last_original = last if last_original is None else max(last_original, last)
+        
+        if first_original is not None:
+            activity['first_original'] = from_epoch(first_original)
+            activity['last_original'] = from_epoch(last_original)
+        # Long windows are checked day by day: the busiest day against the daily limit
+        activity['daily_originals'] = busiest_day or 0
+        return activity
+    
     def analyze_posting_schedule(self, account_key: str, hours_back: int = 24) -> Dict[str, Any]:
         """Analyze how well an account follows its expected schedule"""
         config = ACCOUNTS[account_key]
-        posts = self.get_posts_in_timeframe(config.username, hours_back)
+        rolling_window = MONITORING_CONFIG["rolling_window"]
+        if rolling_window["enabled"] and hours_back == rolling_window["hours"]:
+            with METRICS.timer('monitoring_analyzer_query_seconds', query='rolling_window'):
+                activity = get_windows(self.db_path).activity(config.username)
+            recent_posts = self.get_posts_in_timeframe(config.username, hours_back, limit=10)
+        elif hours_back > MONITORING_CONFIG["rollup_report_threshold_hours"]:
+            activity = self._activity_from_rollups(config.username, hours_back)
+            recent_posts = self.get_posts_in_timeframe(config.username, hours_back, limit=10)
+        else:
+            recent_posts = self.get_posts_in_timeframe(config.username, hours_back)
+            activity = self._activity_from_posts(recent_posts)
         
+        with METRICS.timer('monitoring_analyzer_compute_seconds'):
+            return self._check_schedule(config, hours_back, activity, recent_posts)
+    
+    def _check_schedule(self, config, hours_back: int, activity: Dict[str, Any],
+                        recent_posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The analysis of one account's activity, with its issues and compliance score"""
         analysis = {
             'account': config.username,
             'display_name': config.display_name,
             'analysis_period_hours': hours_back,
             'expected_schedule': config.schedule_description,
-            'posts_found': len(posts),
+            'posts_found': activity['posts_found'],
             'compliance_score': 0.0,
             'issues': [],
             'recommendations': [],
             'post_details': []
         }
         
-        if not posts:
+        if not activity['posts_found']:
             analysis['issues'].append("No posts found in analysis period")
             analysis['recommendations'].append("Check if agent is posting or if scraping is working")
             return analysis
         
         # Analyze posting frequency
-        original_posts = [p for p in posts if p['post_type'] == 'original']
-        analysis['original_posts_count'] = len(original_posts)
+        original_count = activity['original_posts']
+        analysis['original_posts_count'] = original_count
         
         # Check daily post limit
-        if len(original_posts) > config.max_posts_per_day:
-            analysis['issues'].append(f"Exceeded daily post limit: {len(original_posts)}/{config.max_posts_per_day}")
+        if activity['daily_originals'] > config.max_posts_per_day:
+            analysis['issues'].append(f"Exceeded daily post limit: {activity['daily_originals']}/{config.max_posts_per_day}")
         
         # Analyze posting times
-        posting_hours = [p['timestamp'].hour for p in original_posts]
-        active_hour_posts = [h for h in posting_hours if h in config.active_hours_utc]
+        active_hour_posts = sum(count for hour, count in activity['originals_by_hour'].items()
+                                if config.is_active_hour(hour))
         
-        if original_posts:
-            active_compliance = len(active_hour_posts) / len(original_posts)
+        if original_count:
+            active_compliance = active_hour_posts / original_count
             analysis['active_hours_compliance'] = active_compliance
             
             if active_compliance < 0.8:  # 80% threshold
                 analysis['issues'].append(f"Many posts outside active hours: {active_compliance:.1%} compliance")
         
-        # Analyze posting intervals
-        if len(original_posts) > 1:
-            intervals = []
-            sorted_posts = sorted(original_posts, key=lambda x: x['timestamp'])
-            
-            for i in range(1, len(sorted_posts)):
-                interval = (sorted_posts[i]['timestamp'] - sorted_posts[i-1]['timestamp']).total_seconds() / 60
-                intervals.append(interval)
-            
-            avg_interval = sum(intervals) / len(intervals)
+        # Analyze posting intervals; the mean gap between consecutive posts is the span over the gap count
+        if original_count > 1:
+            span = (activity['last_original'] - activity['first_original']).total_seconds() / 60
+            avg_interval = span / (original_count - 1)
             analysis['average_interval_minutes'] = avg_interval
             
             # Check if intervals are within expected range
@@ -106,11 +274,15 @@ class ScheduleAnalyzer:
             elif avg_interval > config.max_interval_minutes:
                 analysis['issues'].append(f"Posting too infrequently: {avg_interval:.1f}min avg (max: {config.max_interval_minutes}min)")
         
-        # Account-specific analysis
-        if account_key == "bitbard":
-            analysis.update(self._analyze_bitbard_schedule(posts, config))
-        elif account_key == "ladymacbeth":
-            analysis.update(self._analyze_ladymacbeth_schedule(posts, config))
+        # Account-specific checks, as listed in the account's schedule
+        for check_name, params in config.checks.items():
+            check = self.ACCOUNT_CHECKS.get(check_name)
+            if check is None:
+                logger.warning(f"Unknown schedule check '{check_name}' for {config.username}")
+                continue
+            result = check(self, activity, config, params)
+            analysis['issues'].extend(result.pop('issues', []))
+            analysis.update(result)
         
         # Calculate overall compliance score
         score = 100.0
@@ -119,7 +291,7 @@ class ScheduleAnalyzer:
         analysis['compliance_score'] = score
         
         # Add post details for manual review
-        for post in posts[:10]:  # Latest 10 posts
+        for post in recent_posts[:10]:  # Latest 10 posts
             analysis['post_details'].append({
                 'timestamp': post['timestamp'].strftime('%Y-%m-%d %H:%M UTC'),
                 'content_preview': post['content'][:100] + "..." if len(post['content']) > 100 else post['content'],
@@ -129,53 +301,173 @@ class ScheduleAnalyzer:
         
         return analysis
     
-    def _analyze_bitbard_schedule(self, posts: List[Dict], config) -> Dict[str, Any]:
-        """BitBard-specific schedule analysis"""
-        analysis = {}
+    def _check_daily_cue(self, activity: Dict[str, Any], config, params: Dict[str, Any]) -> Dict[str, Any]:
+        """One scheduled post a day inside a fixed window, e.g. BitBard's daily "Cue" """
+        analysis = {'issues': []}
+        hours = params.get('hours_utc', config.active_hours_utc)
+        expected = params.get('max_per_day', 1)
         
-        # Look for daily "Cue" posts around 14:00-15:00 UTC (8AM Mountain)
-        cue_posts = []
-        for post in posts:
-            if post['post_type'] == 'original' and post['timestamp'].hour in [14, 15]:
-                # Check if it's a "cue" type post (would need content analysis)
-                cue_posts.append(post)
+        # (telling a "cue" from other originals would need content analysis)
+        cue_posts = sum(activity['originals_by_hour'][hour] for hour in hours)
         
-        analysis['daily_cue_posts'] = len(cue_posts)
+        analysis['daily_cue_posts'] = cue_posts
         
-        if len(cue_posts) == 0:
-            analysis['issues'] = analysis.get('issues', [])
-            analysis['issues'].append("No daily cue posts found at expected time (14:00-15:00 UTC)")
-        elif len(cue_posts) > 1:
-            analysis['issues'] = analysis.get('issues', [])
-            analysis['issues'].append(f"Multiple cue posts found: {len(cue_posts)} (expected: 1)")
+        if cue_posts == 0:
+            analysis['issues'].append(f"No daily cue posts found at expected time "
+                                      f"({min(hours):02d}:00-{max(hours):02d}:00 UTC)")
+        elif cue_posts > expected:
+            analysis['issues'].append(f"Multiple cue posts found: {cue_posts} (expected: {expected})")
         
         return analysis
     
-    def _analyze_ladymacbeth_schedule(self, posts: List[Dict], config) -> Dict[str, Any]:
-        """Lady Macbeth-specific schedule analysis"""
-        analysis = {}
-        
-        # Check reply responsiveness
-        replies = [p for p in posts if p['post_type'] == 'reply']
-        analysis['reply_count'] = len(replies)
-        
+    def _check_reply_count(self, activity: Dict[str, Any], config, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Reply responsiveness"""
         # Note: In a real implementation, we'd track mention timestamps vs reply timestamps
-        # to measure the 30-minute reply window compliance
+        # to measure reply window compliance
+        return {'reply_count': activity['reply_posts']}
+    
+    def _check_active_hours_share(self, activity: Dict[str, Any], config, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Share of all posts, replies included, made during the active hours"""
+        analysis = {'issues': []}
+        result_key = params.get('result_key', 'active_hours_share')
+        label = params.get('label', 'active-hours')
         
-        # Check for consistent activity during night hours (18:00-06:00 UTC)
-        night_posts = [p for p in posts if p['timestamp'].hour in config.active_hours_utc]
-        if posts:
-            night_compliance = len(night_posts) / len(posts)
-            analysis['night_hours_compliance'] = night_compliance
+        active_posts = sum(count for hour, count in activity['posts_by_hour'].items()
+                           if config.is_active_hour(hour))
+        if activity['posts_found']:
+            share = active_posts / activity['posts_found']
+            analysis[result_key] = share
             
-            if night_compliance < 0.7:  # 70% threshold for night activity
-                analysis['issues'] = analysis.get('issues', [])
-                analysis['issues'].append(f"Low night activity: {night_compliance:.1%} of posts")
+            if share < params.get('min_share', 0.7):
+                analysis['issues'].append(f"Low {label} activity: {share:.1%} of posts")
         
         return analysis
     
-    def generate_report(self, hours_back: int = 24) -> Dict[str, Any]:
-        """Generate comprehensive monitoring report"""
+    # Checks an account can opt into through the "checks" of its schedule
+    ACCOUNT_CHECKS = {
+        'daily_cue': _check_daily_cue,
+        'reply_count': _check_reply_count,
+        'active_hours_share': _check_active_hours_share,
+    }
+    
+    def sweep_compliance(self, days: Optional[int] = None, step_hours: Optional[int] = None,
+                         window_hours: Optional[int] = None,
+                         account_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Check every account's schedule over each window_hours window ending
+        on a step_hours boundary in the last `days` days, and store the
+        results in compliance_history. Each account's hourly rollups are
+        read once, in order. A window gains the hours entering it and loses
+        the ones leaving it, so the sweep costs one pass over the rollups
+        plus one schedule check per window. Rollups outlive the raw posts,
+        so the sweep reaches past the retention window.
+        """
+        settings = MONITORING_CONFIG["compliance_sweep"]
+        days = days or settings["days"]
+        step = (step_hours or settings["step_hours"]) * 3600
+        window = (window_hours or settings["window_hours"]) * 3600
+        if window > 86400:
+            raise ValueError("Sweep windows are checked as a whole against the daily limit, "
+                             "so they can be at most 24 hours")
+        
+        last_end = int(datetime.now(timezone.utc).timestamp()) // step * step
+        ends = range(last_end - days * 86400 + step, last_end + 1, step)
+        swept_at = int(datetime.now(timezone.utc).timestamp())
+        totals = {'accounts': 0, 'windows': 0, 'rollup_rows': 0}
+        started = time.perf_counter()
+        
+        for account_key in account_keys or list(ACCOUNTS.keys()):
+            config = ACCOUNTS[account_key]
+            with self.storage.reader() as conn:
+                rows = conn.execute(SWEEP_ROLLUPS_SQL, (config.username, ends[0] - window, ends[-1])).fetchall()
+            
+            in_window = deque()
+            totals_in_window = Counter()
+            posts_by_hour, originals_by_hour = Counter(), Counter()
+            next_row = 0
+            results = []
+            for end in ends:
+                while next_row < len(rows) and rows[next_row][0] < end:
+                    hour_start, total, originals, replies, first, last = row = rows[next_row]
+                    in_window.append(row)
+                    totals_in_window.update(posts=total, originals=originals, replies=replies)
+                    posts_by_hour[hour_start % 86400 // 3600] += total
+                    originals_by_hour[hour_start % 86400 // 3600] += originals
+                    next_row += 1
+                while in_window and in_window[0][0] < end - window:
+                    hour_start, total, originals, replies, first, last = in_window.popleft()
+                    totals_in_window.subtract(posts=total, originals=originals, replies=replies)
+                    posts_by_hour[hour_start % 86400 // 3600] -= total
+                    originals_by_hour[hour_start % 86400 // 3600] -= originals
+                
+                # At most a day of hourly rows, so the first and last original are a short scan
+                firsts = [row[4] for row in in_window if row[4] is not None]
+                lasts = [row[5] for row in in_window if row[5] is not None]
+                activity = {
+                    'posts_found': totals_in_window['posts'],
+                    'original_posts': totals_in_window['originals'],
+                    'reply_posts': totals_in_window['replies'],
+                    'posts_by_hour': +posts_by_hour,
+                    'originals_by_hour': +originals_by_hour,
+                    'first_original': from_epoch(min(firsts)) if firsts else None,
+                    'last_original': from_epoch(max(lasts)) if lasts else None,
+                    'daily_originals': totals_in_window['originals']
+                }
+                analysis = self._check_schedule(config, window // 3600, activity, [])
+                results.append((
+                    config.username, window // 3600, end, analysis['compliance_score'], analysis['posts_found'],
+                    analysis.get('original_posts_count', 0), activity['reply_posts'],
+                    analysis.get('active_hours_compliance'), analysis.get('average_interval_minutes'),
+                    json.dumps(analysis['issues']),
+                    json.dumps({key: value for key, value in analysis.items() if key not in ANALYSIS_FIELDS}),
+                    swept_at
+                ))
+            
+            with self.storage.writer() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO compliance_history
+                    (username, window_hours, window_end, compliance_score, posts_found, original_posts, reply_posts,
+                     active_hours_compliance, average_interval_minutes, issues, checks, swept_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', results)
+            totals['accounts'] += 1
+            totals['windows'] += len(results)
+            totals['rollup_rows'] += len(rows)
+        
+        totals['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Compliance sweep: {totals['windows']} windows over {days} days for "
+                    f"{totals['accounts']} accounts in {totals['seconds']}s")
+        return totals
+    
+    def get_compliance_history(self, username: str, days: int = 30, step_hours: int = 24,
+                               window_hours: int = 24) -> List[Dict[str, Any]]:
+        """Swept compliance for an account's windows ending on step_hours boundaries in the last `days` days"""
+        since = int(datetime.now(timezone.utc).timestamp()) - days * 86400
+        with METRICS.timer('monitoring_analyzer_query_seconds', query='compliance_history'), \
+             self.storage.reader() as conn:
+            rows = conn.execute(COMPLIANCE_HISTORY_SQL, (username, window_hours, since, step_hours * 3600)).fetchall()
+        return [{
+            'window_end': from_epoch(window_end).isoformat(),
+            'compliance_score': score,
+            'posts_found': posts_found,
+            'original_posts': original_posts,
+            'reply_posts': reply_posts,
+            'active_hours_compliance': active_compliance,
+            'average_interval_minutes': avg_interval,
+            'issues': json.loads(issues),
+            **json.loads(checks)
+        } for (window_end, score, posts_found, original_posts, reply_posts, active_compliance, avg_interval,
+               issues, checks) in rows]
+    
+    def generate_report(self, hours_back: int = 24, save: bool = True) -> Dict[str, Any]:
+        """Generate comprehensive monitoring report, saved to reports/ unless `save` is False"""
+        with METRICS.timer('monitoring_report_seconds'):
+            report = self._generate_report(hours_back)
+        if save:
+            self.save_report(report)
+        return report
+    
+    def _generate_report(self, hours_back: int) -> Dict[str, Any]:
         report = {
             'generated_at': datetime.now(timezone.utc).isoformat(),
             'analysis_period_hours': hours_back,
@@ -194,6 +486,12 @@ class ScheduleAnalyzer:
             logger.info(f"Analyzing {config.display_name} schedule compliance")
             
             analysis = self.analyze_posting_schedule(account_key, hours_back)
+            if hours_back > 24:
+                # Day by day, as last swept; empty until a sweep has covered the period
+                analysis['daily_compliance'] = [
+                    {'day_end': day['window_end'], 'compliance_score': day['compliance_score'],
+                     'issues': day['issues']}
+                    for day in self.get_compliance_history(config.username, -(-hours_back // 24))]
             report['accounts'][account_key] = analysis
             
             report['summary']['total_posts'] += analysis['posts_found']
@@ -204,15 +502,22 @@ class ScheduleAnalyzer:
         if account_count > 0:
             report['summary']['average_compliance'] = total_compliance / account_count
         
-        # Save report to file
+        return report
+    
+    def save_report(self, report: Dict[str, Any]) -> str:
+        """Save a report to a timestamped file in reports/ and return its path"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         report_file = f"{REPORTS_DIR}/schedule_report_{timestamp}.json"
+        copy = 1
+        while os.path.exists(report_file):  # Another report saved within the same second
+            copy += 1
+            report_file = f"{REPORTS_DIR}/schedule_report_{timestamp}_{copy}.json"
         
-        with open(report_file, 'w') as f:
+        with METRICS.timer('monitoring_report_write_seconds'), open(report_file, 'w') as f:
             json.dump(report, f, indent=2, default=str)
         
         logger.info(f"Report saved to {report_file}")
-        return report
+        return report_file
     
     def print_report_summary(self, report: Dict[str, Any]):
         """Print a human-readable summary of the report"""
@@ -239,8 +544,10 @@ class ScheduleAnalyzer:
         print(f"\n📂 Full report saved to reports/ directory")
 
 if __name__ == "__main__":
+    from report_cache import get_report_cache
+    
     analyzer = ScheduleAnalyzer()
     
-    # Generate report for last 24 hours
-    report = analyzer.generate_report(24)
+    # Report on the last 24 hours, reusing a saved one if no new data has come in since
+    report = get_report_cache(analyzer.db_path).get(24)
     analyzer.print_report_summary(report) 
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Tweet Archive Import
+Streams JSON tweet exports into the monitoring database in batches, skipping posts already stored
+"""
+
+import re
+import json
+import time
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, TextIO
+
+from config import MONITORING_CONFIG
+from migrations import migrate, to_epoch, engagement_counts
+from retention import refresh_rollups
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Snowflake ids carry their creation time in milliseconds since this epoch
+SNOWFLAKE_EPOCH_MS = 1288834974657
+FIRST_SNOWFLAKE_ID = 29_700_859_247  # Ids below this predate snowflakes and carry no time
+
+# Field names each engagement count goes by in the exports we have seen:
+# our own metrics dicts, agent-twitter-client Tweets and the v1/v2 APIs
+METRIC_FIELDS = {
+    'likes': ('likes', 'likeCount', 'like_count', 'favorite_count'),
+    'retweets': ('retweets', 'retweetCount', 'retweet_count'),
+    'replies': ('replies', 'replyCount', 'reply_count'),
+    'quotes': ('quotes', 'quoteCount', 'quote_count'),
+}
+
+def iter_json_array(stream: TextIO, chunk_size: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield the elements of the JSON array in a text stream one at a time.
+    Only the element being decoded and one read are held in memory; a read
+    that ends partway through an element is extended until it decodes.
+    """
+    chunk_size = chunk_size or MONITORING_CONFIG["archive_import"]["read_chunk_chars"]
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    read_size = chunk_size
+
+    def more() -> bool:
+        """Append the next read to what is left of the buffer; False at end of file"""
+        nonlocal buffer, position, eof
+        if eof:
+            return False
+        chunk = stream.read(read_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def next_char() -> str:
+        """The next non-whitespace character, without consuming it; '' at end of file"""
+        nonlocal position
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position < len(buffer):
+                return buffer[position]
+            if not more():
+                return ''
+
+    if next_char() != '[':
+        raise ValueError("Archive is not a JSON array")
+    position += 1
+    if next_char() == ']':
+        return
+
+    while True:
+        if next_char() in (']', ''):
+            raise ValueError("Archive ends inside its array" if position >= len(buffer)
+                             else "Trailing comma in archive")
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                read_size *= 2  # Keeps re-decoding a large element linear in its size
+                if not more():
+                    raise
+                continue
+            # A whole element is followed by whitespace, ',' or ']'; anything else, like the end
+            # of the buffer, may be a number the read cut short
+            if (end < len(buffer) and buffer[end] in ' \t\n\r,]') or not more():
+                break
+        read_size = chunk_size
+        position = end
+        yield value
+
+        separator = next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"Expected ',' or ']' in archive, found {separator!r}" if separator
+                             else "Archive ends inside its array")
+        position += 1
+
+def _epoch(item: Dict[str, Any]) -> Optional[int]:
+    """When a tweet was posted: its timestamp field, a date string, or failing those its snowflake id"""
+    timestamp = item.get('timestamp')
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp / 1000 if timestamp > 1e11 else timestamp)  # Seconds or milliseconds
+    for field in ('timestamp', 'timeParsed', 'createdAt', 'created_at'):
+        value = item.get(field)
+        if not isinstance(value, str) or not value:
+            continue
+        try:
+            return to_epoch(value)
+        except ValueError:
+            pass
+        try:
+            return int(datetime.strptime(value, '%a %b %d %H:%M:%S %z %Y').timestamp())  # v1 API format
+        except ValueError:
+            pass
+    tweet_id = int(item['id'])
+    if tweet_id >= FIRST_SNOWFLAKE_ID:
+        return ((tweet_id >> 22) + SNOWFLAKE_EPOCH_MS) // 1000
+    return None
+
+def _metrics(item: Dict[str, Any]) -> Dict[str, int]:
+    sources = [source for source in (item.get('metrics'), item.get('public_metrics'), item)
+               if isinstance(source, dict)]
+    metrics = {}
+    for column, names in METRIC_FIELDS.items():
+        metrics[column] = next((source[name] for source in sources for name in names
+                                if isinstance(source.get(name), (int, float))), 0)
+    return metrics
+
+def archive_post(item: Any, username: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    One archived tweet as a scraped post, with `username` for exports that
+    leave the author out. Returns None for items that cannot be placed on an
+    account's timeline: plain strings, or tweets missing an id, author or time.
+    """
+    if not isinstance(item, dict) or not str(item.get('id', '')).isdigit():
+        return None
+    author = (item.get('username') or username or '').lstrip('@')
+    timestamp = _epoch(item)
+    if not author or timestamp is None:
+        return None
+
+    replied_status = item.get('inReplyToStatusId') or item.get('in_reply_to_status_id_str')
+    # posts.reply_to holds the replied-to handle, as scraped posts do; the status id only marks a reply
+    replied_tweet = item.get('inReplyToStatus')
+    reply_to = item.get('in_reply_to_screen_name') or (
+        replied_tweet.get('username') if isinstance(replied_tweet, dict) else None)
+    if item.get('isRetweet'):
+        post_type = 'retweet'
+    elif item.get('isReply') or replied_status or reply_to:
+        post_type = 'reply'
+    elif item.get('isQuoted') or item.get('isQuote'):
+        post_type = 'quote'
+    else:
+        post_type = 'original'
+
+    return {
+        'id': str(item['id']),
+        'username': author,
+        'content': item.get('text') or item.get('full_text') or '',
+        'timestamp': timestamp,
+        'post_type': post_type,
+        'reply_to': str(reply_to).lstrip('@') if reply_to else None,
+        'metrics': _metrics(item)
+    }
+
+def import_archive(db_path: str, path: str, username: Optional[str] = None,
+                   batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Stream one JSON array of tweets into the monitoring database, one
+    transaction per `batch_size` posts. Ids already stored, and repeats
+    within the file, are left as they are. Returns how many items were read,
+    imported, already stored, and skipped by reason.
+    """
+    batch_size = batch_size or MONITORING_CONFIG["archive_import"]["batch_size"]
+    storage = get_storage(db_path)
+    migrate(storage)
+
+    totals = {'read': 0, 'imported': 0, 'already_stored': 0}
+    skipped = Counter()
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        with storage.writer() as conn:
+            cursor = conn.executemany('''
+                INSERT OR IGNORE INTO posts
+                (id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(post['id'], post['username'], post['content'], post['timestamp'], post['post_type'],
+                   post['reply_to'], *engagement_counts(post['metrics'])) for post in batch])
+            imported = cursor.rowcount
+            if imported:
+                refresh_rollups(conn, [(post['username'], post['timestamp']) for post in batch])
+        totals['imported'] += imported
+        totals['already_stored'] += len(batch) - imported
+        logger.info(f"Imported {totals['imported']} of {totals['read']} items from {path}")
+        batch.clear()
+
+    with open(path, encoding='utf-8') as stream:
+        for item in iter_json_array(stream):
+            totals['read'] += 1
+            post = archive_post(item, username)
+            if post is None:
+                if not isinstance(item, dict):
+                    skipped['not_a_tweet'] += 1
+                elif not str(item.get('id', '')).isdigit():
+                    skipped['no_id'] += 1
+                elif not (item.get('username') or username):
+                    skipped['no_author'] += 1
+                else:
+                    skipped['no_time'] += 1
+                continue
+            batch.append(post)
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        'skipped': dict(skipped),
+        'seconds': round(elapsed, 2),
+        'items_per_second': round(totals['read'] / elapsed) if elapsed else 0
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description='Import JSON tweet archives into the monitoring database')
+    parser.add_argument('archives', nargs='+', help='JSON files holding an array of tweets')
+    parser.add_argument('--username', help='Account the tweets belong to, for exports without a username field')
+    parser.add_argument('--db', default=f"{DATA_DIR}/twitter_monitoring.db", help='Database file')
+    parser.add_argument('--batch', type=int, default=None,
+                        help=f"Posts per transaction (default: {MONITORING_CONFIG['archive_import']['batch_size']})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for path in args.archives:
+        result = import_archive(args.db, path, args.username, args.batch)
+        print(f"📥 {path}: {result['imported']:,} imported, {result['already_stored']:,} already stored, "
+              f"{sum(result['skipped'].values()):,} skipped of {result['read']:,} "
+              f"({result['items_per_second']:,} items/s)")
+        for reason, count in result['skipped'].items():
+            print(f"   {reason:<12} {count:,}")
+        if result['skipped'].get('no_author'):
+            print("   Pass --username for exports that don't name the tweets' author")
+        if result['skipped'].get('not_a_tweet'):
+            print("   Plain-text exports carry no ids or times, so their tweets can't be placed on a timeline")
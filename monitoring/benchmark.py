@@ -0,0 +1,2003 @@
+#!/usr/bin/env python3
+"""
+Monitoring Benchmarks
+Measures scraper behaviour against local stand-in servers - no network needed
+"""
+
+import os
+import re
+import json
+import glob
+import sqlite3
+import time
+import resource
+import tempfile
+import logging
+import platform
+import subprocess
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from http.server import HTTPServer
+from typing import Dict, List, Any, Optional
+from urllib.request import urlopen
+
+from accounts import load_accounts
+from archive_import import archive_post, import_archive, iter_json_array
+import analyzer
+from analyzer import ScheduleAnalyzer
+from config import ACCOUNTS, MONITORING_CONFIG, DATA_DIR
+from dashboard import MonitoringDashboard
+from metrics import MetricsRegistry
+from log_pipeline import LogPipeline
+from fake_nitter import FIXTURES_DIR, SYNTHETIC_FIXTURES_DIR, FakeNitterServer, generated_timelines, render_timeline
+from migrations import engagement_counts, from_epoch, to_epoch
+from nitter_parser import parse_timeline
+from poll_scheduler import next_poll_at
+from rate_limiter import RateLimiter, RateLimited
+from retention import enforce_retention, refresh_rollups, retention_cutoff
+from report_cache import ReportCache, get_report_cache
+from rolling_windows import RollingWindows
+from scraper import TwitterScraper
+from seen_filter import STORED_COLUMNS_SQL
+from storage import get_storage
+from workload import VIOLATIONS, bulk_load, generate_day, recent_posts
+
+logger = logging.getLogger(__name__)
+
+# Benchmarks against local stand-ins measure the scraper, not the rate limits
+NO_RATE_LIMITS = {**MONITORING_CONFIG["rate_limits"], "default": {"requests_per_minute": 10 ** 9, "burst": 10 ** 6}}
+
+@contextmanager
+def override_config(accounts: Dict[str, Any], **settings):
+    """Temporarily swap the monitored accounts and monitoring settings"""
+    saved_accounts = dict(ACCOUNTS)
+    saved_settings = {key: MONITORING_CONFIG[key] for key in settings}
+    ACCOUNTS.clear()
+    ACCOUNTS.update(accounts)
+    MONITORING_CONFIG.update(settings)
+    try:
+        yield
+    finally:
+        ACCOUNTS.clear()
+        ACCOUNTS.update(saved_accounts)
+        MONITORING_CONFIG.update(saved_settings)
+
+def synthetic_accounts(count: int) -> Dict[str, Any]:
+    """The configured accounts plus uniquely named clones, `count` in total"""
+    templates = list(ACCOUNTS.values())
+    accounts = dict(list(ACCOUNTS.items())[:count])
+    for i in range(len(accounts), count):
+        template = templates[i % len(templates)]
+        accounts[f"bench{i}"] = replace(template, username=f"{template.username}_{i}")
+    return accounts
+
+def benchmark_cycle(account_count: int = 6, timeout: float = 2.0, slow_latency: float = 0.5) -> Dict[str, Any]:
+    """
+    Time a sequential and a concurrent monitoring cycle against one dead,
+    one slow and one healthy stand-in instance
+    """
+    results = {}
+
+    with FakeNitterServer(dead=True, hang_seconds=timeout * 2) as dead, \
+         FakeNitterServer(latency_seconds=slow_latency) as slow, \
+         FakeNitterServer() as healthy:
+
+        settings = {
+            "nitter_instances": [dead.base_url, slow.base_url, healthy.base_url],
+            "search_url": f"{healthy.base_url}/search",
+            "request_timeout_seconds": timeout,
+            "cycle_deadline_seconds": timeout * 10,
+            "rate_limits": NO_RATE_LIMITS,
+        }
+
+        for mode, concurrent in (("sequential", False), ("concurrent", True)):
+            with tempfile.TemporaryDirectory() as tmp_dir, \
+                 override_config(synthetic_accounts(account_count), concurrent_cycles=concurrent, **settings):
+                scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+                started = time.perf_counter()
+                posts_found, errors = scraper.run_monitoring_cycle()
+                elapsed = time.perf_counter() - started
+                scraper.storage.close()
+
+            results[mode] = {
+                'wall_seconds': round(elapsed, 3),
+                'posts_found': posts_found,
+                'errors': len(errors)
+            }
+
+    results['speedup'] = round(results['sequential']['wall_seconds'] / results['concurrent']['wall_seconds'], 2)
+    return results
+
+def synthetic_timeline(username: str, item_count: int, newest: datetime) -> str:
+    """A Nitter timeline page with one original post per hour, newest first"""
+    posts = [{
+        'id': str(1933000000000000000 - i),
+        'timestamp': newest - timedelta(hours=i),
+        'content': f"Synthetic post {i} " + "lorem ipsum " * 12,
+        'post_type': 'original',
+        'metrics': {'likes': i, 'retweets': i // 2, 'replies': i // 3}
+    } for i in range(item_count)]
+    return render_timeline(username, posts, cursor="bench-cursor")
+
+def _parse_worker(mode: str, pages: List[str], cutoff: datetime, duration: float, results):
+    """Parse pages repeatedly for `duration` seconds in a fresh interpreter"""
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    chunk_size = 16384
+    parsed = 0
+    posts = 0
+
+    if mode == 'dom':
+        from bs4 import BeautifulSoup
+
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        for page in pages:
+            if mode == 'dom':
+                # Baseline: build the whole document tree, then select items
+                soup = BeautifulSoup(page, 'lxml')
+                posts += len(soup.select('div.timeline-item'))
+            else:
+                chunks = (page[i:i + chunk_size] for i in range(0, len(page), chunk_size))
+                posts += len(parse_timeline(chunks, 'bench', cutoff).posts)
+            parsed += 1
+    elapsed = time.perf_counter() - started
+
+    results.put({
+        'pages_per_second': round(parsed / elapsed, 1),
+        'posts_per_page': round(posts / parsed, 1),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb
+    })
+
+def benchmark_parse(item_count: int = 200, duration: float = 3.0) -> Dict[str, Any]:
+    """
+    Parse throughput and peak RSS for the fixture pages and a large
+    synthetic page, each measured in its own process
+    """
+    newest = datetime(2025, 6, 12, 12, 0, tzinfo=timezone.utc)
+    fixture_pages = [open(path, encoding='utf-8').read()
+                     for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))]
+    large_page = [synthetic_timeline('bench', item_count, newest)]
+    everything = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    scenarios = {
+        'fixtures_stream': ('stream', fixture_pages, everything),
+        'large_page_stream_full': ('stream', large_page, everything),
+        'large_page_stream_24h': ('stream', large_page, newest - timedelta(hours=24)),
+        'large_page_dom_baseline': ('dom', large_page, everything),
+    }
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name, (mode, pages, cutoff) in scenarios.items():
+        queue = context.Queue()
+        worker = context.Process(target=_parse_worker, args=(mode, pages, cutoff, duration, queue))
+        worker.start()
+        results[name] = queue.get()
+        worker.join()
+    return results
+
+def synthetic_posts(count: int, batch_size: int, changed_every: int = 0):
+    """
+    Yield batches of posts for a handful of accounts. With `changed_every`,
+    every Nth post carries bumped metrics, as on a re-scrape.
+    """
+    newest = datetime(2025, 6, 12, 12, 0, tzinfo=timezone.utc)
+    usernames = [config.username for config in ACCOUNTS.values()]
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            bump = 1 if changed_every and i % changed_every == 0 else 0
+            batch.append({
+                'id': str(1900000000000000000 + i),
+                'username': usernames[i % len(usernames)],
+                'content': f"Synthetic post {i} " + "lorem ipsum " * 8,
+                'timestamp': (newest - timedelta(minutes=i)).isoformat(),
+                'post_type': 'original',
+                'reply_to': None,
+                'metrics': {'likes': i % 500 + bump, 'retweets': i % 50, 'replies': i % 20, 'quotes': 0}
+            })
+        yield batch
+
+def _store_posts_per_row(scraper: TwitterScraper, posts: List[Dict[str, Any]]):
+    """The previous store_posts: one INSERT OR REPLACE per post"""
+    conn = sqlite3.connect(scraper.db_path)
+    cursor = conn.cursor()
+    for post in posts:
+        cursor.execute('''
+            INSERT OR REPLACE INTO posts
+            (id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (post['id'], post['username'], post['content'], to_epoch(post['timestamp']),
+              post.get('post_type', 'original'), post.get('reply_to'), *engagement_counts(post.get('metrics'))))
+    scraper._advance_watermarks(cursor, posts)
+    conn.commit()
+    conn.close()
+
+def benchmark_ingest(post_count: int = 1_000_000, batch_size: int = 200) -> Dict[str, Any]:
+    """
+    Ingest throughput of the per-row and batched store paths: a fresh load,
+    an identical re-scrape, and a re-scrape where 1 post in 10 has new metrics
+    """
+    passes = (('fresh', 0), ('rescrape_unchanged', 0), ('rescrape_10pct_changed', 10))
+    results = {}
+
+    for mode in ('per_row', 'batched'):
+        results[mode] = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+            for name, changed_every in passes:
+                totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+                started = time.perf_counter()
+                for batch in synthetic_posts(post_count, batch_size, changed_every):
+                    if mode == 'per_row':
+                        _store_posts_per_row(scraper, batch)
+                    else:
+                        for outcome, count in scraper.store_posts(batch).items():
+                            totals[outcome] += count
+                elapsed = time.perf_counter() - started
+                results[mode][name] = {
+                    'wall_seconds': round(elapsed, 2),
+                    'posts_per_second': round(post_count / elapsed),
+                    **(totals if mode == 'batched' else {})
+                }
+            scraper.storage.close()
+    return results
+
+def write_synthetic_characters(directory: str, count: int) -> str:
+    """
+    Write `count` character files and a schedule sidecar giving every tenth
+    account a daily cue check. Returns the sidecar path.
+    """
+    sidecar = {}
+    for i in range(count):
+        start = i % 24
+        character = {
+            'name': f"Agent {i}",
+            'settings': {'secrets': {'TWITTER_USERNAME': f"SyntheticAgent{i}"}},
+            'postingConstraints': {
+                'memory': {'minTimeBetweenPosts': 3600, 'maxTimeBetweenPosts': 5400 + 60 * (i % 60),
+                           'maxPostsPerDay': 10 + i % 5, 'acknowledgmentResponseWindow': 1800},
+                'activeHours': {'start': f"{start:02d}:00", 'end': f"{(start + 12) % 24:02d}:00", 'timezone': 'UTC'}
+            },
+            'bio': ["Synthetic monitoring agent " + "lorem ipsum " * 200]
+        }
+        with open(os.path.join(directory, f"agent{i}.character.json"), 'w', encoding='utf-8') as f:
+            json.dump(character, f)
+        if i % 10 == 0:
+            sidecar[f"agent{i}"] = {'checks': {'daily_cue': {'hours_utc': [start], 'max_per_day': 1}}}
+
+    schedule_path = os.path.join(directory, "accounts.schedule.json")
+    with open(schedule_path, 'w', encoding='utf-8') as f:
+        json.dump({'accounts': sidecar}, f)
+    return schedule_path
+
+def benchmark_accounts(account_count: int = 500, posts_per_account: int = 24) -> Dict[str, Any]:
+    """
+    Load `account_count` synthetic characters cold and from the cache, run a
+    cycle against a local instance, and analyze every account's schedule.
+    Any account missing from a stage is listed under 'failures'.
+    """
+    results = {'failures': []}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        characters_dir = os.path.join(tmp_dir, "characters")
+        os.makedirs(characters_dir)
+        schedule_path = write_synthetic_characters(characters_dir, account_count)
+        cache_path = os.path.join(tmp_dir, "accounts_cache.json")
+
+        for name in ('load_cold', 'load_cached'):
+            started = time.perf_counter()
+            accounts = load_accounts(characters_dir, schedule_path, cache_path)
+            results[name] = {'wall_seconds': round(time.perf_counter() - started, 3)}
+        if len(accounts) != account_count:
+            results['failures'].append(f"loaded {len(accounts)} of {account_count} accounts")
+
+        with FakeNitterServer() as healthy, \
+             override_config(accounts, nitter_instances=[healthy.base_url], rate_limits=NO_RATE_LIMITS,
+                             search_url=f"{healthy.base_url}/search", hedged_fetch=False):
+            db_path = os.path.join(tmp_dir, "bench.db")
+            scraper = TwitterScraper(db_path=db_path)
+            started = time.perf_counter()
+            posts_found, errors = scraper.run_monitoring_cycle()
+            results['cycle'] = {'wall_seconds': round(time.perf_counter() - started, 3), 'errors': len(errors)}
+            results['failures'].extend(errors)
+
+            # One original per hour over the last day for every account
+            newest = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            for n, config in enumerate(accounts.values()):
+                scraper.store_posts([{
+                    'id': str(1950000000000000000 + n * posts_per_account + i),
+                    'username': config.username,
+                    'content': f"Synthetic post {i}",
+                    'timestamp': (newest - timedelta(hours=i)).isoformat(),
+                    'post_type': 'original',
+                    'metrics': {}
+                } for i in range(posts_per_account)])
+
+            analyzer = ScheduleAnalyzer(db_path=db_path)
+            started = time.perf_counter()
+            analyses = {key: analyzer.analyze_posting_schedule(key, 24) for key in accounts}
+            results['analyze'] = {'wall_seconds': round(time.perf_counter() - started, 3)}
+            scraper.storage.close()
+
+        unanalyzed = [key for key, analysis in analyses.items() if analysis['posts_found'] != posts_per_account]
+        if unanalyzed:
+            results['failures'].append(f"{len(unanalyzed)} accounts analyzed with missing posts")
+        cue_accounts = [key for key, config in accounts.items() if 'daily_cue' in config.checks]
+        if any('daily_cue_posts' not in analyses[key] for key in cue_accounts):
+            results['failures'].append("daily cue check skipped for some accounts")
+        results['accounts'] = len(accounts)
+        results['cue_accounts'] = len(cue_accounts)
+    return results
+
+def simulated_post_times(config, day_start: float, off_schedule_every: int) -> List[float]:
+    """
+    A day of posts for one account: every min_interval_minutes through its
+    active hours, plus a post every `off_schedule_every` hours outside them
+    """
+    times = []
+    t = day_start
+    while t < day_start + 86400:
+        hour = datetime.fromtimestamp(t, timezone.utc).hour
+        if config.is_active_hour(hour):
+            times.append(t + 120)
+            t += config.min_interval_minutes * 60
+        else:
+            if off_schedule_every and hour % off_schedule_every == 0:
+                times.append(t + 1800)
+            t += 3600 - t % 3600
+    return times
+
+def benchmark_schedule(account_count: int = 0, off_schedule_every: int = 5) -> Dict[str, Any]:
+    """
+    Simulate one day of polling for the configured accounts (plus clones up
+    to `account_count`), polling every check interval around the clock vs
+    the poll scheduler. Reports fetches, the longest wait from a post to the
+    poll that sees it, and the most posts any single poll had to pick up.
+    """
+    accounts = synthetic_accounts(max(account_count, len(ACCOUNTS)))
+    day_start = float(to_epoch(datetime(2025, 6, 12, tzinfo=timezone.utc)))
+    settings = {**MONITORING_CONFIG["poll_scheduling"]}
+    results = {}
+
+    for mode, enabled in (("fixed", False), ("scheduled", True)):
+        settings["enabled"] = enabled
+        polls = 0
+        worst_delay = 0.0
+        worst_batch = 0
+        for config in accounts.values():
+            posts = simulated_post_times(config, day_start, off_schedule_every)
+            seen = 0
+            now = day_start
+            while now < day_start + 86400:
+                polls += 1
+                newly_seen = 0
+                while seen < len(posts) and posts[seen] <= now:
+                    worst_delay = max(worst_delay, now - posts[seen])
+                    seen += 1
+                    newly_seen += 1
+                worst_batch = max(worst_batch, newly_seen)
+                now = next_poll_at(config, now, posts[seen - 1] if seen else None, settings)
+        results[mode] = {
+            'polls': polls,
+            'max_detection_minutes': round(worst_delay / 60, 1),
+            'max_posts_per_poll': worst_batch
+        }
+
+    results['accounts'] = len(accounts)
+    results['fetch_reduction'] = round(1 - results['scheduled']['polls'] / results['fixed']['polls'], 3)
+    return results
+
+def _rate_limited_worker(db_path: str, url: str, rate_limits: Dict[str, Any], threads: int, duration: float):
+    """Send requests to `url` from several threads for `duration` seconds, through the shared limiter"""
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+
+    MONITORING_CONFIG["rate_limits"] = rate_limits
+    limiter = RateLimiter(db_path)
+    deadline = time.time() + duration
+
+    def hammer():
+        with requests.Session() as session:
+            while True:
+                try:
+                    limiter.acquire(url, max_wait=deadline - time.time())
+                except RateLimited:
+                    return  # No token left before the deadline
+                if time.time() >= deadline:
+                    return
+                session.get(url, timeout=5).close()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(hammer) for _ in range(threads)]:
+            future.result()
+
+def benchmark_rate_limit(processes: int = 2, threads: int = 8, duration: float = 10.0,
+                         requests_per_minute: int = 120, burst: int = 5) -> Dict[str, Any]:
+    """
+    Several processes of several threads each hammer one local instance
+    through a shared limit; then a 429 with Retry-After must pause every
+    sender for the time it asked for
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeNitterServer() as server:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        host = server.base_url.split('://')[1]
+        rate_limits = {**MONITORING_CONFIG["rate_limits"],
+                       "hosts": {host: {"requests_per_minute": requests_per_minute, "burst": burst}}}
+        with override_config(dict(ACCOUNTS), rate_limits=rate_limits):
+            RateLimiter(db_path)  # Create the table before the workers race to
+        workers = [context.Process(target=_rate_limited_worker,
+                                   args=(db_path, f"{server.base_url}/bench", rate_limits, threads, duration))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        sent = len(server.request_times)
+        allowed = burst + requests_per_minute / 60 * duration
+        results['shared_limit'] = {
+            'senders': processes * threads,
+            'requests': sent,
+            'allowed': int(allowed),
+            'within_limit': sent <= allowed + 1
+        }
+
+    retry_after = 2
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         FakeNitterServer(throttle_requests=1, retry_after=str(retry_after)) as server, \
+         override_config(dict(ACCOUNTS), nitter_instances=[server.base_url], rate_limits=NO_RATE_LIMITS):
+        scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+        first = scraper.scrape_nitter_posts('bench')
+        scraper.rate_limiter.acquire(f"{server.base_url}/bench", max_wait=retry_after * 2)
+        second = scraper.scrape_nitter_posts('bench')
+        requests_made = server.request_times
+        gap = requests_made[1] - requests_made[0]
+        results['retry_after'] = {
+            'asked_seconds': retry_after,
+            'waited_seconds': round(gap, 2),
+            'honored': first is None and second == [] and gap >= retry_after - 0.05
+        }
+        scraper.storage.close()
+    return results
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of a list of samples (nearest rank), in the samples' unit"""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None}
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+    return {'p50': pick(50), 'p95': pick(95), 'p99': pick(99)}
+
+def benchmark_replay(account_count: int = 20, rounds: int = 3, latency: float = 0.02,
+                     jitter: float = 0.1, error_rate: float = 0.05, seed: int = 0) -> Dict[str, Any]:
+    """
+    Scrape the recorded fixture accounts plus generated ones from a local
+    instance with seeded latency and errors, `rounds` times over. The first
+    round reads every timeline; later ones should be answered with 304s,
+    except for a timeline whose posts failed to store.
+    """
+    accounts = synthetic_accounts(max(account_count, len(ACCOUNTS)))
+    fixture_posts = {}
+    everything = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    for config in accounts.values():
+        path = os.path.join(FIXTURES_DIR, f"{config.username}.html")
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                fixture_posts[config.username] = len(parse_timeline(iter([f.read()]), config.username, everything).posts)
+    # Reach back far enough to cover the recorded pages
+    lookback_hours = int((datetime.now(timezone.utc) - everything).total_seconds() // 3600)
+
+    results = {'rounds': []}
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         FakeNitterServer(fixtures_dir=FIXTURES_DIR, timelines=generated_timelines(30), etags=True,
+                          latency_seconds=latency, latency_jitter_seconds=jitter,
+                          error_rate=error_rate, seed=seed) as server, \
+         override_config(accounts, nitter_instances=[server.base_url], rate_limits=NO_RATE_LIMITS,
+                         instance_routing={**MONITORING_CONFIG["instance_routing"], "failure_threshold": 10 ** 6}):
+        scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+        for round_number in range(rounds):
+            scraper.cycle_stats = scraper._new_cycle_stats()
+            latencies = []
+            errors = 0
+            mismatched = []
+            for config in accounts.values():
+                started = time.perf_counter()
+                posts = scraper.scrape_nitter_posts(config.username, hours_back=lookback_hours)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if posts is None:
+                    errors += 1
+                    continue
+                scraper.store_unseen(posts)
+                if (round_number == 0 and config.username in fixture_posts
+                      and len(posts) != fixture_posts[config.username]):
+                    mismatched.append(config.username)
+            results['rounds'].append({
+                'latency_ms': {key: round(value, 1) for key, value in percentiles(latencies).items()},
+                'errors': errors,
+                'fixture_mismatches': mismatched,
+                **{outcome: scraper.cycle_stats['fetch_cache'][outcome]
+                   for outcome in ('changed', 'not_modified', 'hash_unchanged')}
+            })
+        scraper.storage.close()
+
+    # Scrape the generated timelines again after every post gained likes, with the first account's
+    # store failing. Stored posts inside the engagement refresh window must pick up the new counts;
+    # reading stops at the first older one.
+    gained = {'likes': 0}
+    generated = generated_timelines(30)
+    def timeline(username: str) -> List[Dict[str, Any]]:
+        return [{**post, 'metrics': {**post['metrics'], 'likes': post['metrics']['likes'] + gained['likes']}}
+                for post in generated(username)]
+    usernames = [config.username for config in accounts.values() if config.username not in fixture_posts]
+    refresh_hours = MONITORING_CONFIG["engagement_refresh_hours"]
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         FakeNitterServer(timelines=timeline, etags=True) as server, \
+         override_config(accounts, nitter_instances=[server.base_url], rate_limits=NO_RATE_LIMITS):
+        scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+        store_posts = scraper.store_posts
+        def fail_once(posts: List[Dict[str, Any]]):
+            scraper.store_posts = store_posts
+            raise sqlite3.OperationalError("database is locked")
+        for likes in (0, 1000):
+            gained['likes'] = likes
+            refresh_after = to_epoch(datetime.now(timezone.utc) - timedelta(hours=refresh_hours))
+            scraper.store_posts = fail_once if likes else store_posts
+            for username in usernames:
+                try:
+                    scraper.store_unseen(scraper.scrape_nitter_posts(username) or [])
+                except sqlite3.OperationalError:
+                    failed_store = username
+        # The failed store must not have saved the page's ETag, or this fetch gets a 304 and its posts stay stale
+        scraper.store_unseen(scraper.scrape_nitter_posts(failed_store) or [])
+        with scraper.storage.reader() as conn:
+            recent, refreshed, stale = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(likes >= 1000), 0),
+                       (SELECT COUNT(*) FROM posts WHERE timestamp < ? AND likes >= 1000)
+                FROM posts WHERE timestamp >= ?
+            ''', (refresh_after, refresh_after)).fetchone()
+        scraper.storage.close()
+    results['engagement_refresh'] = {'hours': refresh_hours, 'recent_posts': recent,
+                                     'refreshed': refreshed, 'older_refreshed': stale}
+
+    results['accounts'] = len(accounts)
+    results['fixture_accounts'] = len(fixture_posts)
+    results['fixtures'] = 'synthetic' if FIXTURES_DIR == SYNTHETIC_FIXTURES_DIR else 'recorded'
+    return results
+
+def benchmark_parse_pool(account_count: int = 200, posts_per_account: int = 200,
+                         workers: int = 0) -> Dict[str, Any]:
+    """
+    One cycle over many large generated timelines, parsed on the fetch
+    threads and then through the parse pool and batching writer. Both modes
+    must store the same posts.
+    """
+    accounts = synthetic_accounts(account_count)
+    timelines = generated_timelines(posts_per_account, interval_minutes=5)
+    modes = {
+        'threads': {**MONITORING_CONFIG["parse_pipeline"], "enabled": False},
+        'process_pool': {**MONITORING_CONFIG["parse_pipeline"], "enabled": True, "parse_workers": workers},
+    }
+    results = {'failures': []}
+    with FakeNitterServer(timelines=timelines, page_size=posts_per_account) as server:
+        for mode, pipeline_settings in modes.items():
+            with tempfile.TemporaryDirectory() as tmp_dir, \
+                 override_config(accounts, nitter_instances=[server.base_url], rate_limits=NO_RATE_LIMITS,
+                                 hedged_fetch=False, concurrent_cycles=True, parse_pipeline=pipeline_settings):
+                scraper = TwitterScraper(db_path=os.path.join(tmp_dir, "bench.db"))
+                if pipeline_settings["enabled"]:
+                    # Start the worker processes outside the timed cycle, as a long-running scraper would
+                    scraper._start_pipeline().close()
+                started = time.perf_counter()
+                posts_found, errors = scraper.run_monitoring_cycle()
+                elapsed = time.perf_counter() - started
+                with scraper.storage.reader() as conn:
+                    stored = conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+                results[mode] = {
+                    'wall_seconds': round(elapsed, 3),
+                    'posts_per_second': round(posts_found / elapsed),
+                    'posts_stored': stored,
+                    'errors': len(errors),
+                    'stages': scraper.cycle_stats.get('pipeline')
+                }
+                results['failures'].extend(errors)
+                scraper.close()
+                scraper.storage.close()
+
+    if results['threads']['posts_stored'] != results['process_pool']['posts_stored']:
+        results['failures'].append(f"the process pool stored {results['process_pool']['posts_stored']} posts, "
+                                   f"the threads {results['threads']['posts_stored']}")
+    results['accounts'] = len(accounts)
+    results['workers'] = workers or os.cpu_count()
+    return results
+
+def benchmark_seen_filter(account_count: int = 200, rounds: int = 6, hours_back: int = 72) -> Dict[str, Any]:
+    """
+    Re-scrape the synthetic source every ten simulated minutes and store
+    each round with and without the seen-post filter. Both databases must
+    end up with the same posts. A restart with a small recent window then
+    sends every post through the saved bloom filter and its verification
+    read.
+    """
+    accounts = synthetic_accounts(account_count)
+    start = time.time()
+    snapshots = [[post for config in accounts.values()
+                  for post in recent_posts(config, hours_back, now=start + number * 600)]
+                 for number in range(rounds)]
+    results = {'failures': [], 'rounds': []}
+    seen_settings = MONITORING_CONFIG["seen_filter"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scrapers = {}
+        for mode, enabled in (('unfiltered', False), ('filtered', True)):
+            with override_config(accounts, seen_filter={**seen_settings, "enabled": enabled}):
+                scrapers[mode] = TwitterScraper(db_path=os.path.join(tmp_dir, f"{mode}.db"))
+
+        for number, posts in enumerate(snapshots):
+            result = {'posts': len(posts)}
+            for mode, enabled in (('unfiltered', False), ('filtered', True)):
+                scraper = scrapers[mode]
+                with override_config(accounts, seen_filter={**seen_settings, "enabled": enabled}):
+                    scraper.seen.reset_stats()
+                    started = time.perf_counter()
+                    scraper.store_unseen(posts)
+                    result[f'{mode}_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            result.update(scrapers['filtered'].seen.cycle_stats())
+            results['rounds'].append(result)
+
+        def stored(scraper: TwitterScraper) -> List[Any]:
+            with scraper.storage.reader() as conn:
+                return conn.execute(f'SELECT {STORED_COLUMNS_SQL} FROM posts ORDER BY id').fetchall()
+        if stored(scrapers['filtered']) != stored(scrapers['unfiltered']):
+            results['failures'].append("the filtered database's posts differ from the unfiltered one's")
+
+        # Posts imported from past the retention window are saved with the filter and then deleted by
+        # retention. Posts another process stores next reuse their rowids, and must still be topped up.
+        old = start - (MONITORING_CONFIG["data_retention_days"] + 2) * 86400
+        scrapers['filtered'].store_unseen([{'id': f"seen_imported_{config.username}", 'username': config.username,
+                                            'content': "Imported", 'timestamp': from_epoch(old).isoformat()}
+                                           for config in accounts.values()])
+        with override_config(accounts, seen_filter=seen_settings):
+            scrapers['filtered'].close()
+        db_path = scrapers['filtered'].db_path
+        for scraper in scrapers.values():
+            scraper.storage.close()
+        late_posts = [{'id': f"seen_late_{config.username}_{n}", 'username': config.username,
+                       'content': f"Stored by another process {n}", 'timestamp': from_epoch(start - n).isoformat()}
+                      for config in accounts.values() for n in range(3)]
+        with override_config(accounts, seen_filter={**seen_settings, "enabled": False}):
+            other = TwitterScraper(db_path=db_path)
+            enforce_retention(other.storage)
+            other.store_posts(late_posts)
+            other.storage.close()
+
+        with override_config(accounts, seen_filter={**seen_settings, "recent_per_account": 1}):
+            started = time.perf_counter()
+            restarted = TwitterScraper(db_path=db_path)
+            load_seconds = time.perf_counter() - started
+            restarted.seen.reset_stats()
+            restarted.store_unseen(snapshots[-1] + late_posts)
+            results['restart'] = {'load_seconds': round(load_seconds, 3),
+                                  'bloom_entries': restarted.seen.bloom.entries,
+                                  **restarted.seen.cycle_stats()}
+            restarted.storage.close()
+        if not results['restart']['bloom_entries']:
+            results['failures'].append("the restarted scraper did not load the saved filter")
+        if results['restart']['skip_ratio'] != 1.0:
+            results['failures'].append(f"after a restart only {results['restart']['skip_ratio']:.1%} "
+                                       f"of an unchanged round was skipped")
+
+    results['accounts'] = len(accounts)
+    return results
+
+def write_archive(path: str, tweet_count: int, usernames: List[str]):
+    """An agent-twitter-client style export of `tweet_count` tweets, written one at a time"""
+    newest_id = 1863806895884247223
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for i in range(tweet_count):
+            tweet_id = newest_id - i * (60 << 22) // len(usernames)  # One tweet per account a minute
+            tweet = {
+                'id': str(tweet_id),
+                'username': usernames[i % len(usernames)],
+                'text': f"Archived post {i} " + "lorem ipsum " * 12,
+                'timestamp': ((tweet_id >> 22) + 1288834974657) // 1000,
+                'likes': i % 97, 'retweets': i % 13, 'replies': i % 7,
+                'isReply': i % 5 == 0, 'isRetweet': i % 11 == 0,
+                'inReplyToStatusId': str(tweet_id - 1) if i % 5 == 0 else None
+            }
+            f.write(('' if i == 0 else ',\n') + json.dumps(tweet, indent=4))
+        f.write('\n]\n')
+
+def _archive_worker(db_path: Optional[str], archive_path: str, results):
+    """
+    Import one archive in a fresh interpreter, so its peak RSS is the
+    import's own; without a database, only read and map its tweets
+    """
+    logging.getLogger().setLevel(logging.ERROR)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if db_path:
+        result = import_archive(db_path, archive_path)
+    else:
+        started = time.perf_counter()
+        with open(archive_path, encoding='utf-8') as f:
+            mapped = sum(1 for item in iter_json_array(f) if archive_post(item))
+        result = {'read': mapped, 'seconds': round(time.perf_counter() - started, 2)}
+    result['rss_growth_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb
+    results.put(result)
+
+def benchmark_archive(tweet_counts: List[int], account_count: int = 50) -> Dict[str, Any]:
+    """
+    Read, then import, generated archives of each size, each in its own
+    process, then import the largest again. Reading must not grow with the
+    archive, an import may only add SQLite's page cache and memory map, and
+    the second import must find every post already stored.
+    """
+    usernames = [config.username for config in synthetic_accounts(account_count).values()]
+    context = multiprocessing.get_context('spawn')
+    results = {'failures': [], 'imports': {}}
+
+    def run(db_path: Optional[str], archive_path: str) -> Dict[str, Any]:
+        queue = context.Queue()
+        worker = context.Process(target=_archive_worker, args=(db_path, archive_path, queue))
+        worker.start()
+        result = queue.get()
+        worker.join()
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in tweet_counts:
+            archive_path = os.path.join(tmp_dir, f"archive_{count}.json")
+            write_archive(archive_path, count, usernames)
+            result = run(os.path.join(tmp_dir, f"archive_{count}.db"), archive_path)
+            result['file_mb'] = round(os.path.getsize(archive_path) / 1024 ** 2, 1)
+            result['read_rss_growth_kb'] = run(None, archive_path)['rss_growth_kb']
+            results['imports'][str(count)] = result
+            if result['imported'] != count:
+                results['failures'].append(f"{count}-tweet archive: {result['imported']} imported")
+        results['reimport'] = run(os.path.join(tmp_dir, f"archive_{count}.db"), archive_path)
+        if results['reimport']['already_stored'] != count:
+            results['failures'].append(f"re-import found {results['reimport']['already_stored']} "
+                                       f"of {count} posts already stored")
+
+    smallest, largest = (results['imports'][str(count)] for count in (min(tweet_counts), max(tweet_counts)))
+    if largest['read_rss_growth_kb'] > smallest['read_rss_growth_kb'] + 8 * 1024:
+        results['failures'].append(f"reading the largest archive grew peak RSS by "
+                                   f"{largest['read_rss_growth_kb'] / 1024:.1f} MB, the smallest by "
+                                   f"{smallest['read_rss_growth_kb'] / 1024:.1f} MB")
+    storage = MONITORING_CONFIG["storage"]
+    sqlite_bound_kb = (storage["mmap_size_mb"] + storage["cache_size_mb"]) * 1024
+    for count, result in results['imports'].items():
+        # Leaves 64 MB for one batch of posts on top of the map and page cache
+        if result['rss_growth_kb'] > result['read_rss_growth_kb'] + sqlite_bound_kb + 64 * 1024:
+            results['failures'].append(f"importing {count} tweets grew peak RSS by "
+                                       f"{result['rss_growth_kb'] / 1024:.1f} MB, past SQLite's cache and map")
+    return results
+
+def _metrics_cycle_worker(db_path: str, base_url: str, account_count: int, cycles: int, results):
+    """Run monitoring cycles in a fresh interpreter, standing in for the scraper's process"""
+    logging.getLogger().setLevel(logging.ERROR)
+    with override_config(synthetic_accounts(account_count), nitter_instances=[base_url],
+                         rate_limits=NO_RATE_LIMITS, hedged_fetch=False):
+        scraper = TwitterScraper(db_path=db_path)
+        for _ in range(cycles):
+            started = time.perf_counter()
+            scraper.run_monitoring_cycle()
+            elapsed = time.perf_counter() - started
+            observations = sum(series['count'] for series in scraper.cycle_stats['metrics']['timings'].values())
+            results.put({'seconds': elapsed, 'observations': observations})
+        scraper.close()
+
+def check_exposition(text: str) -> List[str]:
+    """Problems with a Prometheus text exposition: missing TYPE lines, or histogram buckets that don't add up"""
+    problems = []
+    typed = set()
+    buckets: Dict[str, List[float]] = {}
+    counts: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            typed.add(line.split()[2])
+            continue
+        if line.startswith('#') or not line:
+            continue
+        series, value = line.rsplit(' ', 1)
+        name = series.split('{', 1)[0]
+        family = name if name in typed else re.sub(r'_(bucket|sum|count)$', '', name)
+        if family not in typed:
+            problems.append(f"{name} has no TYPE line")
+        if name.endswith('_bucket'):
+            key = re.sub(r',?le="[^"]*"', '', series.replace('_bucket', '', 1))
+            buckets.setdefault(key, []).append(float(value))
+        elif name.endswith('_count'):
+            counts[series.replace('_count', '', 1)] = float(value)
+    for key, values in buckets.items():
+        if values != sorted(values):
+            problems.append(f"{key} buckets are not cumulative")
+        if counts.get(key) != values[-1]:
+            problems.append(f"{key} +Inf bucket {values[-1]} differs from its count {counts.get(key)}")
+    return problems
+
+def benchmark_metrics(account_count: int = 50, cycles: int = 3, observations: int = 200_000) -> Dict[str, Any]:
+    """
+    The cost of one timed block, then monitoring cycles in a separate
+    scraper process and a report and dashboard requests in this one.
+    /api/metrics must serve both processes' stages as valid Prometheus
+    text, and timing must cost under 1% of a cycle.
+    """
+    results = {'failures': []}
+    registry = MetricsRegistry({**MONITORING_CONFIG["metrics"], "enabled": True})
+    started = time.perf_counter()
+    for _ in range(observations):
+        with registry.timer('monitoring_store_seconds', source='nitter'):
+            pass
+    timed = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(observations):
+        pass
+    results['observation_ns'] = round((timed - (time.perf_counter() - started)) / observations * 1e9)
+
+    context = multiprocessing.get_context('spawn')
+    accounts = synthetic_accounts(account_count)
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         FakeNitterServer(timelines=generated_timelines(50)) as nitter:
+        db_path = os.path.join(tmp_dir, "metrics.db")
+        queue = context.Queue()
+        worker = context.Process(target=_metrics_cycle_worker,
+                                 args=(db_path, nitter.base_url, account_count, cycles, queue))
+        worker.start()
+        results['cycles'] = [queue.get() for _ in range(cycles)]
+        worker.join()
+
+        saved_reports_dir = analyzer.REPORTS_DIR
+        analyzer.REPORTS_DIR = tmp_dir
+        try:
+            with override_config(accounts):
+                handler = type('BenchmarkDashboard', (MonitoringDashboard,), {'db_path': db_path,
+                                                                              'log_message': lambda *args: None})
+                dashboard = HTTPServer(('127.0.0.1', 0), handler)
+                threading.Thread(target=dashboard.serve_forever, daemon=True).start()
+                base_url = f"http://127.0.0.1:{dashboard.server_address[1]}"
+                for path in ('/api/status', '/api/report?hours=24', '/api/status'):
+                    urlopen(base_url + path).read()
+                exposition = urlopen(base_url + '/api/metrics').read().decode()
+                dashboard.shutdown()
+                dashboard.server_close()
+        finally:
+            analyzer.REPORTS_DIR = saved_reports_dir
+        with sqlite3.connect(db_path) as conn:
+            sessions = [json.loads(stats) for (stats,) in conn.execute('SELECT stats FROM monitoring_sessions')]
+
+    results['exposition_lines'] = len(exposition.splitlines())
+    results['failures'].extend(check_exposition(exposition))
+    expected = {'scraper': ['monitoring_fetch_seconds', 'monitoring_parse_seconds', 'monitoring_source_seconds',
+                            'monitoring_store_seconds', 'monitoring_cycle_seconds', 'monitoring_posts_stored_total'],
+                'dashboard': ['monitoring_http_request_seconds', 'monitoring_http_requests_total',
+                              'monitoring_analyzer_query_seconds', 'monitoring_analyzer_compute_seconds',
+                              'monitoring_report_seconds', 'monitoring_report_write_seconds']}
+    for process, names in expected.items():
+        for name in names:
+            if not re.search(rf'^{name}(_count)?{{process="{process}"', exposition, re.MULTILINE):
+                results['failures'].append(f"/api/metrics has no {name} from the {process}")
+    if len(sessions) != cycles or not all(session.get('metrics', {}).get('timings') for session in sessions):
+        results['failures'].append("not every session saved its stage timings")
+    else:
+        results['session_timings'] = sessions[-1]['metrics']['timings']
+
+    for cycle in results['cycles']:
+        cycle['overhead'] = cycle['observations'] * results['observation_ns'] / 1e9 / cycle['seconds']
+        if cycle['overhead'] > 0.01:
+            results['failures'].append(f"timing took {cycle['overhead']:.2%} of a cycle")
+    results['accounts'] = account_count
+    return results
+
+def _slow_disk(handler: logging.Handler, delay_seconds: float) -> logging.Handler:
+    """Make each write to `handler` take `delay_seconds` longer, like a busy or networked disk"""
+    emit = handler.emit
+    def slow_emit(record):
+        time.sleep(delay_seconds)
+        emit(record)
+    handler.emit = slow_emit
+    return handler
+
+def _log_from_fork(pipeline: LogPipeline, logger_name: str, count: int, results):
+    """Log through a pipeline inherited over a fork, and report how much of the parent's ring is visible"""
+    child_logger = logging.getLogger(logger_name)
+    for i in range(count):
+        child_logger.warning(f"child {os.getpid()} record {i}")
+    records, _ = pipeline.ring.records(limit=0)
+    results.put(len(records))
+
+def benchmark_logging(record_count: int = 5000, threads: int = 8, write_delay_ms: float = 1.0) -> Dict[str, Any]:
+    """
+    Log from several threads to a log file made slow on purpose, directly
+    as scraper.py used to and through the log pipeline. Then check the
+    pipeline drops rather than blocks on a full queue, samples a chatty
+    line, rotates its file, and shares its ring with a forked process.
+    """
+    results = {'failures': []}
+    settings = {**MONITORING_CONFIG["logging"], "sampling": {**MONITORING_CONFIG["logging"]["sampling"], "levels": []}}
+    delay = write_delay_ms / 1000
+    per_thread = record_count // threads
+
+    def log_from_threads(bench_logger: logging.Logger) -> Dict[str, Any]:
+        latencies = []
+        def work():
+            own = []
+            for i in range(per_thread):
+                started = time.perf_counter()
+                bench_logger.info(f"Stored {i} posts in database")
+                own.append(time.perf_counter() - started)
+            latencies.extend(own)
+        started = time.perf_counter()
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'caller_seconds': round(elapsed, 3),
+            'p50_us': round(latencies[len(latencies) // 2] * 1e6, 1),
+            'p99_us': round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+            'max_ms': round(latencies[-1] * 1000, 2)
+        }
+
+    def bench_logger(name: str) -> logging.Logger:
+        bench = logging.getLogger(f"benchmark.logging.{name}")
+        bench.propagate = False
+        bench.setLevel(logging.DEBUG)
+        return bench
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Synchronous: every caller waits for the disk, as with a plain FileHandler
+        direct = bench_logger('direct')
+        handler = _slow_disk(logging.FileHandler(os.path.join(tmp_dir, 'direct.log')), delay)
+        direct.addHandler(handler)
+        results['direct'] = log_from_threads(direct)
+        direct.removeHandler(handler)
+        handler.close()
+
+        # Queued: callers only enqueue; the listener thread pays for the disk
+        def queued_run(name: str, queue_size: int) -> Dict[str, Any]:
+            pipeline = LogPipeline(os.path.join(tmp_dir, f'{name}.log'), 'DEBUG',
+                                   {**settings, "queue_size": queue_size})
+            _slow_disk(pipeline.handlers[-1], delay)
+            pipeline.handlers = [handler for handler in pipeline.handlers
+                                 if type(handler) is not logging.StreamHandler]
+            pipeline.listener.handlers = tuple(pipeline.handlers)
+            queued = bench_logger(name)
+            queued.addHandler(pipeline.queue_handler)
+            pipeline.listener.start()
+            result = log_from_threads(queued)
+            started = time.perf_counter()
+            pipeline.stop()
+            queued.removeHandler(pipeline.queue_handler)
+            result['drain_seconds'] = round(time.perf_counter() - started, 3)
+            result.update(pipeline.ring.stats())
+            return result
+        results['queued'] = queued_run('queued', record_count * 2)
+        results['queued_small'] = queued_run('queued_small', record_count // 10)
+
+        if results['queued']['written'] != per_thread * threads or results['queued']['dropped']:
+            results['failures'].append(f"queued pipeline wrote {results['queued']['written']} of "
+                                       f"{per_thread * threads} records")
+        if not results['queued_small']['dropped']:
+            results['failures'].append("a queue smaller than the burst dropped nothing")
+        for mode in ('queued', 'queued_small'):
+            # p99 on a busy box measures thread switches, so judge callers by their median and total time
+            if results[mode]['p50_us'] > write_delay_ms * 1000 / 10:
+                results['failures'].append(f"{mode} callers' p50 {results[mode]['p50_us']}us is near the "
+                                           f"{write_delay_ms}ms disk write")
+            if results[mode]['caller_seconds'] > results['direct']['caller_seconds'] / 10:
+                results['failures'].append(f"{mode} callers took {results[mode]['caller_seconds']}s, "
+                                           f"direct ones {results['direct']['caller_seconds']}s")
+
+        # Sampling: one chatty call site, many times within a window
+        sampling = MONITORING_CONFIG["logging"]["sampling"]
+        pipeline = LogPipeline(None, 'DEBUG', {**MONITORING_CONFIG["logging"], "sampling": {**sampling, "levels": ["INFO"]}})
+        pipeline.handlers = [pipeline.handlers[0]]
+        pipeline.listener.handlers = tuple(pipeline.handlers)
+        sampled = bench_logger('sampled')
+        sampled.addHandler(pipeline.queue_handler)
+        pipeline.listener.start()
+        for i in range(1000):
+            sampled.info(f"Found {i} posts")
+        sampled.warning("warnings are never sampled")
+        pipeline.stop()
+        sampled.removeHandler(pipeline.queue_handler)
+        expected = sampling["burst"] + (1000 - sampling["burst"]) // sampling["every"] + 1
+        results['sampling'] = {**pipeline.ring.stats(), 'expected': expected}
+        if pipeline.ring.stats()['written'] != expected:
+            results['failures'].append(f"sampling kept {pipeline.ring.stats()['written']} of 1000 records, "
+                                       f"expected {expected}")
+
+        # Rotation and the ring, including from a forked process
+        log_file = os.path.join(tmp_dir, 'rotated.log')
+        pipeline = LogPipeline(log_file, 'DEBUG', {**settings, "max_bytes": 64 * 1024, "backup_count": 3,
+                                                   "ring_size": 500})
+        pipeline.handlers = [handler for handler in pipeline.handlers if type(handler) is not logging.StreamHandler]
+        pipeline.listener.handlers = tuple(pipeline.handlers)
+        rotated = bench_logger('rotated')
+        rotated.addHandler(pipeline.queue_handler)
+        pipeline.listener.start()
+        for i in range(5000):
+            rotated.info(f"record {i} " + 'x' * 40)
+        # Records from different processes are ordered by when they reach the queue, so let
+        # the parent's drain first to find the child's at the end of the ring
+        while pipeline.ring.stats()['written'] < 5000:
+            time.sleep(0.01)
+        context = multiprocessing.get_context('fork')
+        child_results = context.Queue()
+        child = context.Process(target=_log_from_fork,
+                                args=(pipeline, rotated.name, 50, child_results))
+        child.start()
+        child_seen = child_results.get(timeout=60)
+        child.join()
+        pipeline.stop()
+        rotated.removeHandler(pipeline.queue_handler)
+
+        files = sorted(glob.glob(log_file + '*'))
+        records, last = pipeline.ring.records(limit=0)
+        results['rotation'] = {'files': len(files), 'largest_kb': max(os.path.getsize(path) for path in files) // 1024}
+        results['ring'] = {'held': len(records), 'last': last, 'child_saw': child_seen,
+                           'from_child': sum(record['message'].startswith('child ') for record in records)}
+        if len(files) != 4 or results['rotation']['largest_kb'] > 64:
+            results['failures'].append(f"rotation left {len(files)} files, the largest "
+                                       f"{results['rotation']['largest_kb']} KB")
+        if len(records) != 500 or [record['seq'] for record in records] != list(range(last - 499, last + 1)):
+            results['failures'].append("the ring does not hold its last 500 records in order")
+        if results['ring']['from_child'] != 50:
+            results['failures'].append(f"{results['ring']['from_child']} of the forked process's 50 records "
+                                       f"reached the ring")
+        if not child_seen:
+            results['failures'].append("the forked process could not read the ring")
+    results['records'] = per_thread * threads
+    results['threads'] = threads
+    results['write_delay_ms'] = write_delay_ms
+    return results
+
+def benchmark_rolling(account_count: int = 200, days: int = 3, rounds: int = 5) -> Dict[str, Any]:
+    """
+    Analyze every account over the standard window from the rolling
+    windows and by recomputing from posts, after a bulk load and after
+    each of several rounds of newly stored posts. Both must agree; then
+    compare reloading the saved windows with building them from posts.
+    """
+    accounts = synthetic_accounts(account_count)
+    hours = MONITORING_CONFIG["rolling_window"]["hours"]
+    results = {'failures': [], 'rounds': []}
+
+    with tempfile.TemporaryDirectory() as tmp_dir, override_config(accounts):
+        db_path = os.path.join(tmp_dir, "rolling.db")
+        results['load'] = bulk_load(db_path, accounts, days)
+        scraper = TwitterScraper(db_path=db_path)
+        schedule_analyzer = ScheduleAnalyzer(db_path=db_path)
+
+        def analyze_all(rolling: bool) -> Any:
+            with override_config(accounts, rolling_window={**MONITORING_CONFIG["rolling_window"], "enabled": rolling}):
+                started = time.perf_counter()
+                analyses = {key: schedule_analyzer.analyze_posting_schedule(key, hours) for key in accounts}
+                return analyses, time.perf_counter() - started
+
+        def compare(label: str) -> Dict[str, Any]:
+            full, full_seconds = analyze_all(False)
+            rolling, rolling_seconds = analyze_all(True)
+            mismatched = [key for key in accounts if full[key] != rolling[key]]
+            if mismatched:
+                results['failures'].append(f"{label}: rolling and full analyses differ for {len(mismatched)} "
+                                           f"accounts, e.g. {mismatched[0]}")
+            return {'full_seconds': round(full_seconds, 3), 'rolling_seconds': round(rolling_seconds, 3)}
+
+        results['initial'] = compare("after the bulk load")
+        now = int(time.time())
+        for round_number in range(rounds):
+            posts = []
+            for i, config in enumerate(accounts.values()):
+                for n in range(3):
+                    post_type = ('original', 'reply', 'retweet')[(i + n + round_number) % 3]
+                    posts.append({'id': f"rolling_{round_number}_{config.username}_{n}", 'username': config.username,
+                                  'content': f"Round {round_number} post {n}", 'post_type': post_type,
+                                  'reply_to': 'someone' if post_type == 'reply' else None,
+                                  'timestamp': from_epoch(now - 60 * (rounds - round_number) - n).isoformat(),
+                                  'metrics': {'likes': round_number}})
+            # Last round's posts again with more likes: updated rows must not be counted twice
+            if round_number:
+                posts.extend({**post, 'metrics': {'likes': round_number}} for post in results['rounds'][-1]['posts'])
+            scraper.store_posts(posts)
+            started = time.perf_counter()
+            read = scraper.windows.refresh()
+            refresh_seconds = time.perf_counter() - started
+            results['rounds'].append({'posts': posts[:len(accounts) * 3], 'stored': len(posts), 'read': read,
+                                      'refresh_ms': round(refresh_seconds * 1000, 2),
+                                      **compare(f"round {round_number + 1}")})
+
+        # An import of posts older than the retention window, then a retention run that deletes them.
+        # They held the newest rows, so the next posts stored reuse their rowids.
+        old = now - (MONITORING_CONFIG["data_retention_days"] + 2) * 86400
+        scraper.store_posts([{'id': f"rolling_imported_{config.username}", 'username': config.username,
+                              'content': "Imported", 'timestamp': from_epoch(old).isoformat()}
+                             for config in accounts.values()])
+        scraper.windows.refresh()
+        enforce_retention(scraper.storage)
+        scraper.store_posts([{'id': f"rolling_retention_{config.username}", 'username': config.username,
+                              'content': "After retention", 'timestamp': from_epoch(now - 30).isoformat()}
+                             for config in accounts.values()])
+        results['after_retention'] = {'read': scraper.windows.refresh(), **compare("after a retention run")}
+
+        # Restart:the saved windows plus what was stored since, against building every account from posts
+        scraper.windows.save()
+        scraper.store_posts([{'id': f"rolling_restart_{config.username}", 'username': config.username,
+                              'content': "After the save", 'timestamp': from_epoch(now).isoformat()}
+                             for config in accounts.values()])
+        usernames = [config.username for config in accounts.values()]
+        started = time.perf_counter()
+        reloaded = RollingWindows(db_path)
+        results['reload_seconds'] = round(time.perf_counter() - started, 3)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('DELETE FROM activity_windows')
+        started = time.perf_counter()
+        rebuilt = RollingWindows(db_path)
+        rebuilt.track(usernames)
+        results['rebuild_seconds'] = round(time.perf_counter() - started, 3)
+        if any(reloaded.activity(username) != rebuilt.activity(username) for username in usernames):
+            results['failures'].append("reloaded windows differ from windows built from posts")
+        scraper.close()
+        schedule_analyzer.storage.close()
+
+    for result in results['rounds']:
+        del result['posts']
+    results['accounts'] = account_count
+    results['window_posts'] = sum(len(window.posts) for window in rebuilt.windows.values())
+    return results
+
+def benchmark_reportcache(account_count: int = 200, days: int = 3, requests: int = 50) -> Dict[str, Any]:
+    """
+    Request /api/report repeatedly between scraper cycles, then after one,
+    and check reports are computed and saved once per data version, kept
+    to max_entries, and reused from disk by another process's cache
+    """
+    accounts = synthetic_accounts(account_count)
+    results = {'failures': []}
+    with tempfile.TemporaryDirectory() as tmp_dir, override_config(accounts):
+        db_path = os.path.join(tmp_dir, "reportcache.db")
+        bulk_load(db_path, accounts, days)
+        saved_reports_dir = analyzer.REPORTS_DIR
+        analyzer.REPORTS_DIR = tmp_dir
+        try:
+            handler = type('BenchmarkDashboard', (MonitoringDashboard,), {'db_path': db_path,
+                                                                          'log_message': lambda *args: None})
+            dashboard = HTTPServer(('127.0.0.1', 0), handler)
+            threading.Thread(target=dashboard.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{dashboard.server_address[1]}"
+
+            def request_reports(count: int) -> List[float]:
+                latencies = []
+                for _ in range(count):
+                    started = time.perf_counter()
+                    urlopen(base_url + '/api/report?hours=24').read()
+                    latencies.append(time.perf_counter() - started)
+                return latencies
+
+            def report_files() -> int:
+                return len(glob.glob(os.path.join(tmp_dir, 'schedule_report_*.json')))
+
+            latencies = request_reports(requests)
+            results['between_cycles'] = {'first_ms': round(latencies[0] * 1000, 2),
+                                         'repeat_p50_ms': round(sorted(latencies[1:])[len(latencies) // 2] * 1000, 2),
+                                         'files': report_files()}
+            cache = get_report_cache(db_path)
+            started = time.perf_counter()
+            for _ in range(1000):
+                cache.get(24)
+            results['hit_us'] = round((time.perf_counter() - started) / 1000 * 1e6, 1)
+
+            # A scraper cycle stores a post and records its session: a new data version
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("INSERT INTO posts (id, username, content, timestamp, post_type) VALUES (?, ?, ?, ?, ?)",
+                             ('reportcache_1', next(iter(accounts.values())).username, 'New post', int(time.time()),
+                              'original'))
+                conn.execute("INSERT INTO monitoring_sessions (session_id, started_at, accounts_checked, posts_found, "
+                             "errors, stats) VALUES (?, ?, ?, ?, ?, ?)",
+                             ('session_reportcache', datetime.now(timezone.utc).isoformat(), '[]', 1, '[]', '{}'))
+            latencies = request_reports(requests)
+            results['after_cycle'] = {'first_ms': round(latencies[0] * 1000, 2),
+                                      'repeat_p50_ms': round(sorted(latencies[1:])[len(latencies) // 2] * 1000, 2),
+                                      'files': report_files()}
+            served = json.loads(urlopen(base_url + '/api/report?hours=24').read())
+            dashboard.shutdown()
+            dashboard.server_close()
+
+            for hours in range(1, MONITORING_CONFIG["report_cache"]["max_entries"] + 3):
+                cache.get(hours)
+            results['cached_reports'] = len(cache.reports)
+            results['files_after_lru'] = report_files()
+
+            # A CLI run: its own cache, the same database and reports
+            other = ReportCache(db_path)
+            started = time.perf_counter()
+            reused = other.get(24)
+            results['other_process_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            results['other_process_files'] = report_files()
+
+            unsaved = ReportCache(db_path, {**MONITORING_CONFIG["report_cache"], "persist": False})
+            unsaved.get(48)
+            results['unsaved_files'] = report_files()
+
+            # Writes that add no post: an engagement update, a compliance sweep and a retention run
+            # over posts imported from past the window. Each must give a new version and report.
+            report = cache.get(24)
+            stale = []
+            username = next(iter(accounts.values())).username
+            old = int(time.time()) - (MONITORING_CONFIG["data_retention_days"] + 2) * 86400
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("INSERT INTO posts (id, username, content, timestamp, post_type) VALUES (?, ?, ?, ?, ?)",
+                             ('reportcache_imported', username, 'Imported', old, 'original'))
+
+            def update_engagement():
+                with sqlite3.connect(db_path) as conn:
+                    conn.execute("UPDATE posts SET likes = likes + 1 WHERE id = 'reportcache_1'")
+
+            for label, write in (('engagement update', update_engagement),
+                                 ('compliance sweep', lambda: ScheduleAnalyzer(db_path).sweep_compliance(1)),
+                                 ('retention run', lambda: enforce_retention(cache.storage))):
+                write()
+                updated = cache.get(24)
+                if updated is report:
+                    stale.append(label)
+                report = updated
+            results['stale_after'] = stale
+        finally:
+            analyzer.REPORTS_DIR = saved_reports_dir
+
+    if results['between_cycles']['files'] != 1:
+        results['failures'].append(f"{requests} requests between cycles saved {results['between_cycles']['files']} "
+                                   f"reports, expected 1")
+    if results['after_cycle']['files'] != 2:
+        results['failures'].append(f"a new data version left {results['after_cycle']['files']} reports, expected 2")
+    if results['between_cycles']['repeat_p50_ms'] * 5 > results['between_cycles']['first_ms']:
+        results['failures'].append("repeated requests were not much faster than the first")
+    if results['cached_reports'] != MONITORING_CONFIG["report_cache"]["max_entries"]:
+        results['failures'].append(f"{results['cached_reports']} reports in memory, "
+                                   f"expected max_entries {MONITORING_CONFIG['report_cache']['max_entries']}")
+    if results['other_process_files'] != results['files_after_lru'] or reused != served:
+        results['failures'].append("another process's cache did not reuse the saved report")
+    if results['unsaved_files'] != results['other_process_files']:
+        results['failures'].append("a cache without persist saved a report")
+    for label in results['stale_after']:
+        results['failures'].append(f"the cache served the same report after a {label}")
+    results['accounts'] = account_count
+    results['requests'] = requests
+    return results
+
+def benchmark_sweep(account_count: int = 50, days: int = 90, hourly_days: int = 30,
+                    sample_every: int = 37) -> Dict[str, Any]:
+    """
+    Sweep daily compliance over `days` days and hourly sliding windows over
+    `hourly_days`, against checking each daily window from its raw posts.
+    Every daily window and every `sample_every`th hourly one must match the
+    check from raw posts; then read the history back through /api/compliance
+    and a long report.
+    """
+    accounts = synthetic_accounts(account_count)
+    results = {'failures': []}
+    with tempfile.TemporaryDirectory() as tmp_dir, override_config(accounts):
+        db_path = os.path.join(tmp_dir, "sweep.db")
+        results['load'] = bulk_load(db_path, accounts, days)
+        schedule_analyzer = ScheduleAnalyzer(db_path=db_path)
+
+        def naive(config, window_end: int) -> Dict[str, Any]:
+            """The window's check from its raw posts, in the shape get_compliance_history returns"""
+            with schedule_analyzer.storage.reader() as conn:
+                rows = conn.execute('SELECT timestamp, post_type FROM posts '
+                                    'WHERE username = ? AND timestamp >= ? AND timestamp < ?',
+                                    (config.username, window_end - 86400, window_end)).fetchall()
+            posts = [{'timestamp': from_epoch(timestamp), 'post_type': post_type} for timestamp, post_type in rows]
+            activity = schedule_analyzer._activity_from_posts(posts)
+            analysis = schedule_analyzer._check_schedule(config, 24, activity, [])
+            return {
+                'window_end': from_epoch(window_end).isoformat(),
+                'compliance_score': analysis['compliance_score'],
+                'posts_found': activity['posts_found'],
+                'original_posts': activity['original_posts'],
+                'reply_posts': activity['reply_posts'],
+                'active_hours_compliance': analysis.get('active_hours_compliance'),
+                'average_interval_minutes': analysis.get('average_interval_minutes'),
+                'issues': analysis['issues'],
+                **{key: value for key, value in analysis.items() if key not in analyzer.ANALYSIS_FIELDS}
+            }
+
+        results['daily'] = schedule_analyzer.sweep_compliance(days, step_hours=24)
+        started = time.perf_counter()
+        mismatched = 0
+        for config in accounts.values():
+            history = schedule_analyzer.get_compliance_history(config.username, days, 24)
+            for window in history:
+                if window != naive(config, to_epoch(window['window_end'])):
+                    mismatched += 1
+        results['naive_daily_seconds'] = round(time.perf_counter() - started, 3)  # Includes reading the history
+        if mismatched:
+            results['failures'].append(f"{mismatched} daily windows differ from checks of their raw posts")
+        if results['daily']['windows'] != account_count * days:
+            results['failures'].append(f"daily sweep stored {results['daily']['windows']} windows, "
+                                       f"expected {account_count * days}")
+
+        results['hourly'] = schedule_analyzer.sweep_compliance(hourly_days, step_hours=1)
+        checked = mismatched = 0
+        naive_seconds = 0.0
+        for config in accounts.values():
+            history = schedule_analyzer.get_compliance_history(config.username, hourly_days, 1)
+            for window in history[::sample_every]:
+                checked += 1
+                started = time.perf_counter()
+                expected = naive(config, to_epoch(window['window_end']))
+                naive_seconds += time.perf_counter() - started
+                if window != expected:
+                    mismatched += 1
+        results['hourly_checked'] = checked
+        # Overlapping windows read each post 24 times over when checked one by one
+        results['naive_hourly_seconds'] = round(naive_seconds / checked * results['hourly']['windows'], 3)
+        if mismatched:
+            results['failures'].append(f"{mismatched} of {checked} sampled hourly windows differ from checks of "
+                                       f"their raw posts")
+
+        # Read back: the dashboard route and a week-long report's day-by-day scores
+        handler = type('BenchmarkDashboard', (MonitoringDashboard,), {'db_path': db_path,
+                                                                      'log_message': lambda *args: None})
+        dashboard = HTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=dashboard.serve_forever, daemon=True).start()
+        username = next(iter(accounts.values())).username
+        started = time.perf_counter()
+        served = json.loads(urlopen(f"http://127.0.0.1:{dashboard.server_address[1]}"
+                                    f"/api/compliance?username={username}&days={days}&step=24").read())
+        results['api_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        dashboard.shutdown()
+        dashboard.server_close()
+        if served != schedule_analyzer.get_compliance_history(username, days, 24) or len(served) != days:
+            results['failures'].append(f"/api/compliance served {len(served)} windows, not the {days} swept")
+        report = schedule_analyzer.generate_report(24 * 7, save=False)
+        if any(len(analysis.get('daily_compliance', [])) != 7 for analysis in report['accounts'].values()):
+            results['failures'].append("a week-long report is missing days of swept compliance")
+        schedule_analyzer.storage.close()
+
+    results['accounts'] = account_count
+    results['days'] = days
+    results['hourly_days'] = hourly_days
+    return results
+
+def benchmark_workload(account_count: int = 500, days: int = 90) -> Dict[str, Any]:
+    """
+    Bulk-load months of seeded synthetic posts, then check the streams are
+    reproducible, the engagement history adds up to each post's counts, and
+    a 30-day report runs over the result
+    """
+    accounts = synthetic_accounts(account_count)
+    now = time.time()
+    results = {'failures': []}
+
+    def fingerprint(seed: int) -> List[Any]:
+        return [generate_day(config, int(now) // 86400 * 86400 - day * 86400, now, seed=seed)
+                for config in list(accounts.values())[:5] for day in range(days)]
+    seed = MONITORING_CONFIG["synthetic_workload"]["seed"]
+    if fingerprint(seed) != fingerprint(seed):
+        results['failures'].append("the same seed produced different posts")
+    if fingerprint(seed) == fingerprint(seed + 1):
+        results['failures'].append("different seeds produced the same posts")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "workload.db")
+        results['load'] = bulk_load(db_path, accounts, days, now=now)
+
+        with sqlite3.connect(db_path) as conn:
+            mismatched = conn.execute('''
+                SELECT COUNT(*) FROM posts
+                LEFT JOIN (SELECT post_id, SUM(likes) AS likes, SUM(retweets) AS retweets,
+                                  SUM(replies) AS replies, SUM(quotes) AS quotes
+                           FROM post_metrics_history GROUP BY post_id) AS history
+                ON history.post_id = posts.id
+                WHERE posts.likes != COALESCE(history.likes, 0) OR posts.retweets != COALESCE(history.retweets, 0)
+                   OR posts.replies != COALESCE(history.replies, 0) OR posts.quotes != COALESCE(history.quotes, 0)
+            ''').fetchone()[0]
+        if mismatched:
+            results['failures'].append(f"{mismatched} posts whose history doesn't add up to their counts")
+
+        # generate_report saves every report it builds, so keep this one out of reports/
+        saved_reports_dir = analyzer.REPORTS_DIR
+        analyzer.REPORTS_DIR = tmp_dir
+        try:
+            with override_config(accounts):
+                schedule_analyzer = ScheduleAnalyzer(db_path=db_path)
+                started = time.perf_counter()
+                report = schedule_analyzer.generate_report(24 * 30)
+                results['report_30d'] = {'wall_seconds': round(time.perf_counter() - started, 3),
+                                         'issues': report['summary']['total_issues']}
+                schedule_analyzer.storage.close()
+        finally:
+            analyzer.REPORTS_DIR = saved_reports_dir
+
+        # Retention, then half of one purged day stored again, as a partial backfill would:
+        # the rollups must still count the deleted posts
+        storage = get_storage(db_path)
+        cutoff = int(retention_cutoff().timestamp())
+        rollups_sql = ('SELECT * FROM post_rollups_hourly ORDER BY username, hour_start',
+                       'SELECT * FROM post_rollups_daily ORDER BY username, day_start')
+        with storage.reader() as conn:
+            rollups = [conn.execute(sql).fetchall() for sql in rollups_sql]
+            replayed = conn.execute('''
+                SELECT id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes
+                FROM posts WHERE timestamp >= ? AND timestamp < ?
+            ''', (cutoff - 86400, cutoff)).fetchall()[::2]
+        started = time.perf_counter()
+        deleted = enforce_retention(storage)['posts_deleted']
+        results['retention'] = {'posts_deleted': deleted, 'seconds': round(time.perf_counter() - started, 3),
+                                'replayed': len(replayed)}
+        with storage.writer() as conn:
+            conn.executemany('INSERT OR IGNORE INTO posts (id, username, content, timestamp, post_type, reply_to, '
+                             'likes, retweets, replies, quotes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', replayed)
+            refresh_rollups(conn, [(row[1], row[3]) for row in replayed])
+        with storage.reader() as conn:
+            if [conn.execute(sql).fetchall() for sql in rollups_sql] != rollups:
+                results['failures'].append("rollups changed after retention and a partial backfill of a purged day")
+        storage.close()
+    return results
+
+PIPELINE_STAGES = ('fetch', 'parse', 'store_posts', 'get_posts_in_timeframe', 'analyze_posting_schedule',
+                   'analyze_posting_schedule_7d', 'generate_report', 'api_status', 'api_posts', 'api_report',
+                   'dashboard_html')
+
+def pipeline_posts(usernames: List[str], count: int, batch_size: int, newest: datetime, days: int):
+    """
+    Yield batches of `count` posts spread evenly over the last `days` days,
+    round-robin across accounts, newest first: 1 in 5 a reply, 1 in 10 a retweet
+    """
+    spacing = days * 86400 * len(usernames) / count
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            post_type = 'retweet' if i % 10 == 0 else 'reply' if i % 5 == 0 else 'original'
+            batch.append({
+                'id': str(1960000000000000000 + count - i),
+                'username': usernames[i % len(usernames)],
+                'content': f"Synthetic post {i} " + "lorem ipsum " * 8,
+                'timestamp': (newest - timedelta(seconds=(i // len(usernames)) * spacing)).isoformat(),
+                'post_type': post_type,
+                'reply_to': 'someone' if post_type == 'reply' else None,
+                'metrics': {'likes': i % 500, 'retweets': i % 50, 'replies': i % 20, 'quotes': 0}
+            })
+        yield batch
+
+class StageTimer:
+    """Collects per-call durations and the process's peak RSS after each stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.wall: Dict[str, float] = {}
+        self.peak_rss_kb: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        self.samples[name] = []
+        started = time.perf_counter()
+        try:
+            yield self.samples[name]
+        finally:
+            self.wall[name] = time.perf_counter() - started
+            self.peak_rss_kb[name] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    @staticmethod
+    def timed(samples: List[float], call, *args, **kwargs):
+        started = time.perf_counter()
+        result = call(*args, **kwargs)
+        samples.append((time.perf_counter() - started) * 1000)
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        stages = {}
+        for name, samples in self.samples.items():
+            stages[name] = {
+                'calls': len(samples),
+                **{f"{key}_ms": round(value, 3) if value is not None else None
+                   for key, value in percentiles(samples).items()},
+                'mean_ms': round(sum(samples) / len(samples), 3) if samples else None,
+                'wall_seconds': round(self.wall[name], 3),
+                'peak_rss_mb': round(self.peak_rss_kb[name] / 1024, 1)
+            }
+        return stages
+
+def _pipeline_worker(post_count: int, account_count: int, samples: int, batch_size: int, results):
+    """Build one dataset in a fresh interpreter and time every stage against it"""
+    logging.getLogger().setLevel(logging.ERROR)
+    timer = StageTimer()
+    accounts = synthetic_accounts(account_count)
+    usernames = [config.username for config in accounts.values()]
+    keys = list(accounts)
+    newest = datetime.now(timezone.utc)
+    days = MONITORING_CONFIG["data_retention_days"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+         FakeNitterServer(timelines=generated_timelines(60)) as nitter, \
+         override_config(accounts, nitter_instances=[nitter.base_url], rate_limits=NO_RATE_LIMITS):
+        db_path = os.path.join(tmp_dir, "bench.db")
+        scraper = TwitterScraper(db_path=db_path)
+
+        with timer.stage('fetch') as stage:
+            for i in range(samples):
+                timer.timed(stage, scraper.scrape_nitter_posts, usernames[i % len(usernames)])
+
+        page = nitter.timeline_page(usernames[0])
+        cutoff = newest - timedelta(hours=MONITORING_CONFIG["lookback_hours"])
+        with timer.stage('parse') as stage:
+            for _ in range(samples):
+                timer.timed(stage, parse_timeline, iter([page]), usernames[0], cutoff)
+
+        with timer.stage('store_posts') as stage:
+            for batch in pipeline_posts(usernames, post_count, batch_size, newest, days):
+                timer.timed(stage, scraper.store_posts, batch)
+
+        schedule_analyzer = ScheduleAnalyzer(db_path=db_path)
+        with timer.stage('get_posts_in_timeframe') as stage:
+            for i in range(samples):
+                timer.timed(stage, schedule_analyzer.get_posts_in_timeframe, usernames[i % len(usernames)], 24)
+        with timer.stage('analyze_posting_schedule') as stage:
+            for i in range(samples):
+                timer.timed(stage, schedule_analyzer.analyze_posting_schedule, keys[i % len(keys)], 24)
+        with timer.stage('analyze_posting_schedule_7d') as stage:
+            for i in range(samples):
+                timer.timed(stage, schedule_analyzer.analyze_posting_schedule, keys[i % len(keys)], 24 * 7)
+
+        # generate_report saves every report it builds, so keep those out of reports/
+        saved_reports_dir = analyzer.REPORTS_DIR
+        analyzer.REPORTS_DIR = tmp_dir
+        try:
+            report_samples = max(1, samples // 10)
+            with timer.stage('generate_report') as stage:
+                for _ in range(report_samples):
+                    timer.timed(stage, schedule_analyzer.generate_report, 24)
+
+            handler = type('BenchmarkDashboard', (MonitoringDashboard,), {'db_path': db_path,
+                                                                          'log_message': lambda *args: None})
+            dashboard = HTTPServer(('127.0.0.1', 0), handler)
+            threading.Thread(target=dashboard.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{dashboard.server_address[1]}"
+            fetch_url = lambda path: urlopen(base_url + path).read()
+            endpoints = {
+                'api_status': lambda i: '/api/status',
+                'api_posts': lambda i: f"/api/posts?username={usernames[i % len(usernames)]}&hours=24",
+                'api_report': lambda i: '/api/report?hours=24',
+                'dashboard_html': lambda i: '/',
+            }
+            for name, path in endpoints.items():
+                calls = report_samples if name == 'api_report' else samples
+                with timer.stage(name) as stage:
+                    for i in range(calls):
+                        timer.timed(stage, fetch_url, path(i))
+            dashboard.shutdown()
+            dashboard.server_close()
+        finally:
+            analyzer.REPORTS_DIR = saved_reports_dir
+        scraper.storage.close()
+
+    summary = timer.summary()
+    summary['store_posts']['posts_per_second'] = round(post_count / summary['store_posts']['wall_seconds'])
+    results.put(summary)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchmark_pipeline(post_counts: List[int], account_count: int = 20, samples: int = 200,
+                       batch_size: int = 200) -> Dict[str, Any]:
+    """
+    Time every monitoring stage against synthetic datasets of each size in
+    `post_counts`, each in its own process so peak RSS is per dataset:
+    fetch and parse from a local stand-in, store_posts, the analyzer's
+    queries and report, and the dashboard endpoints
+    """
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'accounts': account_count,
+            'samples': samples,
+            'batch_size': batch_size
+        },
+        'datasets': {}
+    }
+    context = multiprocessing.get_context('spawn')
+    for post_count in post_counts:
+        queue = context.Queue()
+        worker = context.Process(target=_pipeline_worker,
+                                 args=(post_count, account_count, samples, batch_size, queue))
+        worker.start()
+        results['datasets'][str(post_count)] = {'posts': post_count, 'stages': queue.get()}
+        worker.join()
+    return results
+
+def compare_pipeline(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+                     min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Stages whose p95 got more than `threshold` slower than in the baseline
+    run; sub-millisecond stages are too noisy to flag on ratio alone
+    """
+    regressions = []
+    for size, dataset in current['datasets'].items():
+        old_stages = baseline['datasets'].get(size, {}).get('stages', {})
+        for name, stage in dataset['stages'].items():
+            old = old_stages.get(name, {}).get('p95_ms')
+            new = stage['p95_ms']
+            if old and new and new > old * (1 + threshold) and new - old >= min_delta_ms:
+                regressions.append(f"{size} posts / {name}: p95 {old:.2f}ms -> {new:.2f}ms")
+    return regressions
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Monitoring system benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    cycle_parser = subparsers.add_parser('cycle', help='Sequential vs concurrent monitoring cycle')
+    cycle_parser.add_argument('--accounts', type=int, default=6, help='Number of synthetic accounts (default: 6)')
+    cycle_parser.add_argument('--timeout', type=float, default=2.0, help='Per-request timeout in seconds (default: 2)')
+    cycle_parser.add_argument('--slow-latency', type=float, default=0.5,
+                              help='Latency of the slow instance in seconds (default: 0.5)')
+
+    parse_parser = subparsers.add_parser('parse', help='Nitter timeline parse throughput and peak RSS')
+    parse_parser.add_argument('--items', type=int, default=200, help='Items on the large synthetic page (default: 200)')
+    parse_parser.add_argument('--duration', type=float, default=3.0, help='Seconds per scenario (default: 3)')
+
+    ingest_parser = subparsers.add_parser('ingest', help='Per-row vs batched post storage throughput')
+    ingest_parser.add_argument('--posts', type=int, default=1_000_000, help='Posts per pass (default: 1000000)')
+    ingest_parser.add_argument('--batch', type=int, default=200, help='Posts per store call (default: 200)')
+
+    accounts_parser = subparsers.add_parser('accounts', help='Account registry, cycle and analysis at scale')
+    accounts_parser.add_argument('--accounts', type=int, default=500, help='Synthetic characters (default: 500)')
+
+    schedule_parser = subparsers.add_parser('schedule', help='Fixed vs scheduled polling over a simulated day')
+    schedule_parser.add_argument('--accounts', type=int, default=0,
+                                 help='Pad the configured accounts with clones up to this many')
+    schedule_parser.add_argument('--off-schedule-every', type=int, default=5,
+                                 help='One post outside active hours every N hours (0 for none, default: 5)')
+
+    rate_parser = subparsers.add_parser('ratelimit', help='Shared per-host rate limit and Retry-After handling')
+    rate_parser.add_argument('--processes', type=int, default=2, help='Sending processes (default: 2)')
+    rate_parser.add_argument('--threads', type=int, default=8, help='Threads per process (default: 8)')
+    rate_parser.add_argument('--duration', type=float, default=10.0, help='Seconds to send for (default: 10)')
+    rate_parser.add_argument('--rpm', type=int, default=120, help='Requests per minute allowed (default: 120)')
+
+    replay_parser = subparsers.add_parser('replay', help='Scrape fixtures and generated timelines from a local instance')
+    replay_parser.add_argument('--accounts', type=int, default=20, help='Accounts, fixtures first (default: 20)')
+    replay_parser.add_argument('--rounds', type=int, default=3, help='Times to scrape every account (default: 3)')
+    replay_parser.add_argument('--latency', type=float, default=0.02, help='Base latency in seconds (default: 0.02)')
+    replay_parser.add_argument('--jitter', type=float, default=0.1, help='Extra latency up to this (default: 0.1)')
+    replay_parser.add_argument('--error-rate', type=float, default=0.05, help='Share of 503s (default: 0.05)')
+    replay_parser.add_argument('--seed', type=int, default=0, help='Seed for latency and errors (default: 0)')
+
+    pipeline_parser = subparsers.add_parser('pipeline', help='Every monitoring stage on synthetic datasets, as JSON')
+    pipeline_parser.add_argument('--posts', type=int, nargs='+', default=[1_000, 100_000],
+                                 help='Dataset sizes in posts, e.g. 1000 100000 10000000 (default: 1000 100000)')
+    pipeline_parser.add_argument('--accounts', type=int, default=20, help='Accounts the posts are spread over (default: 20)')
+    pipeline_parser.add_argument('--samples', type=int, default=200, help='Calls per timed stage (default: 200)')
+    pipeline_parser.add_argument('--batch', type=int, default=200, help='Posts per store_posts call (default: 200)')
+    pipeline_parser.add_argument('--output', help='Results file (default: data/benchmarks/pipeline_<commit>_<time>.json)')
+    pipeline_parser.add_argument('--compare', metavar='BASELINE_JSON', help='Flag stages whose p95 regressed against this run')
+    pipeline_parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p95 slowdown for --compare (default: 0.2)')
+
+    pool_parser = subparsers.add_parser('parsepool', help='Parsing on fetch threads vs in a process pool')
+    pool_parser.add_argument('--accounts', type=int, default=200, help='Accounts in the cycle (default: 200)')
+    pool_parser.add_argument('--posts', type=int, default=200, help='Posts per timeline page (default: 200)')
+    pool_parser.add_argument('--workers', type=int, default=0, help='Parser processes (default: one per CPU)')
+
+    seen_parser = subparsers.add_parser('seenfilter', help='Re-scraped posts stored with and without the seen-post filter')
+    seen_parser.add_argument('--accounts', type=int, default=200, help='Accounts re-scraped (default: 200)')
+    seen_parser.add_argument('--rounds', type=int, default=6, help='Re-scrapes, ten simulated minutes apart (default: 6)')
+    seen_parser.add_argument('--hours', type=int, default=72, help='Hours of posts in each scrape (default: 72)')
+
+    archive_parser = subparsers.add_parser('archive', help='Streaming tweet archive import: throughput and memory')
+    archive_parser.add_argument('--tweets', type=int, nargs='+', default=[50_000, 500_000],
+                                help='Tweets per generated archive (default: 50000 500000)')
+    archive_parser.add_argument('--accounts', type=int, default=50, help='Authors in each archive (default: 50)')
+
+    metrics_parser = subparsers.add_parser('metrics', help='Stage timings: overhead, session stats and /api/metrics')
+    metrics_parser.add_argument('--accounts', type=int, default=50, help='Accounts per cycle (default: 50)')
+    metrics_parser.add_argument('--cycles', type=int, default=3, help='Cycles run by the scraper process (default: 3)')
+
+    logging_parser = subparsers.add_parser('logging', help='Direct vs queued logging to a slow disk, sampling and the ring')
+    logging_parser.add_argument('--records', type=int, default=5000, help='Records logged per run (default: 5000)')
+    logging_parser.add_argument('--threads', type=int, default=8, help='Logging threads (default: 8)')
+    logging_parser.add_argument('--write-delay-ms', type=float, default=1.0,
+                                help='Added time per log file write (default: 1.0)')
+
+    rolling_parser = subparsers.add_parser('rolling', help='Standard-window analysis from rolling windows vs from posts')
+    rolling_parser.add_argument('--accounts', type=int, default=200, help='Accounts analyzed (default: 200)')
+    rolling_parser.add_argument('--days', type=int, default=3, help='Days of bulk-loaded posts (default: 3)')
+    rolling_parser.add_argument('--rounds', type=int, default=5, help='Rounds of newly stored posts (default: 5)')
+
+    cache_parser = subparsers.add_parser('reportcache', help='Repeated /api/report requests with the report cache')
+    cache_parser.add_argument('--accounts', type=int, default=200, help='Accounts reported on (default: 200)')
+    cache_parser.add_argument('--days', type=int, default=3, help='Days of bulk-loaded posts (default: 3)')
+    cache_parser.add_argument('--requests', type=int, default=50, help='Requests per data version (default: 50)')
+
+    sweep_parser = subparsers.add_parser('sweep', help='Historical compliance sweep vs checking each window from posts')
+    sweep_parser.add_argument('--accounts', type=int, default=50, help='Accounts swept (default: 50)')
+    sweep_parser.add_argument('--days', type=int, default=90, help='Days loaded and swept daily (default: 90)')
+    sweep_parser.add_argument('--hourly-days', type=int, default=30,
+                              help='Days swept with an hourly step (default: 30)')
+
+    workload_parser = subparsers.add_parser('workload', help='Bulk-load seeded synthetic posts and report over them')
+    workload_parser.add_argument('--accounts', type=int, default=500,
+                                 help='Pad the configured accounts with clones up to this many (default: 500)')
+    workload_parser.add_argument('--days', type=int, default=90, help='Days of posts per account (default: 90)')
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    if args.benchmark == 'cycle':
+        results = benchmark_cycle(args.accounts, args.timeout, args.slow_latency)
+        print(f"\n⏱️  Monitoring cycle: {args.accounts} accounts, dead + slow + healthy instance")
+        for mode in ('sequential', 'concurrent'):
+            print(f"   {mode:<11} {results[mode]['wall_seconds']:>8.3f}s  "
+                  f"({results[mode]['posts_found']} posts, {results[mode]['errors']} errors)")
+        print(f"   speedup     {results['speedup']:>8.2f}x")
+    elif args.benchmark == 'parse':
+        results = benchmark_parse(args.items, args.duration)
+        print(f"\n📄 Timeline parsing ({args.items}-item synthetic page)")
+        for name, result in results.items():
+            print(f"   {name:<24} {result['pages_per_second']:>9.1f} pages/s  "
+                  f"{result['posts_per_page']:>6.1f} posts/page  "
+                  f"peak RSS {result['peak_rss_kb'] / 1024:>6.1f} MB (+{result['rss_growth_kb'] / 1024:.1f} MB)")
+    elif args.benchmark == 'ingest':
+        results = benchmark_ingest(args.posts, args.batch)
+        print(f"\n💾 Post ingest: {args.posts:,} posts per pass, {args.batch} per store call")
+        for name in results['batched']:
+            per_row = results['per_row'][name]
+            batched = results['batched'][name]
+            print(f"   {name:<24} per-row {per_row['posts_per_second']:>9,} posts/s  "
+                  f"batched {batched['posts_per_second']:>9,} posts/s  "
+                  f"({batched['inserted']:,} new, {batched['updated']:,} updated, {batched['unchanged']:,} unchanged)")
+
+    elif args.benchmark == 'accounts':
+        results = benchmark_accounts(args.accounts)
+        print(f"\n🎭 Account scale: {results['accounts']} accounts ({results['cue_accounts']} with a daily cue)")
+        for name in ('load_cold', 'load_cached', 'cycle', 'analyze'):
+            print(f"   {name:<12} {results[name]['wall_seconds']:>8.3f}s")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'schedule':
+        results = benchmark_schedule(args.accounts, args.off_schedule_every)
+        print(f"\n📅 Polling over one simulated day: {results['accounts']} accounts")
+        for mode in ('fixed', 'scheduled'):
+            print(f"   {mode:<10} {results[mode]['polls']:>8,} fetches  "
+                  f"posts seen within {results[mode]['max_detection_minutes']:>5.1f} min  "
+                  f"at most {results[mode]['max_posts_per_poll']} posts per poll")
+        print(f"   fetches saved {results['fetch_reduction']:.1%}")
+
+    elif args.benchmark == 'ratelimit':
+        results = benchmark_rate_limit(args.processes, args.threads, args.duration, args.rpm)
+        shared = results['shared_limit']
+        retry = results['retry_after']
+        print(f"\n🚦 Rate limiting: {shared['senders']} senders over {args.duration:.0f}s at {args.rpm}/min")
+        print(f"   requests sent {shared['requests']:>5} (allowed {shared['allowed']})  "
+              f"{'✅' if shared['within_limit'] else '❌'}")
+        print(f"   Retry-After {retry['asked_seconds']}s, next request after {retry['waited_seconds']}s  "
+              f"{'✅' if retry['honored'] else '❌'}")
+        if not (shared['within_limit'] and retry['honored']):
+            raise SystemExit(1)
+
+    elif args.benchmark == 'replay':
+        results = benchmark_replay(args.accounts, args.rounds, args.latency, args.jitter, args.error_rate, args.seed)
+        print(f"\n🔁 Replay: {results['accounts']} accounts ({results['fixture_accounts']} from "
+              f"{results['fixtures']} fixtures), "
+              f"{args.error_rate:.0%} errors, seed {args.seed}")
+        for number, result in enumerate(results['rounds'], 1):
+            latency = result['latency_ms']
+            print(f"   round {number}  p50 {latency['p50']:>6.1f}ms  p95 {latency['p95']:>6.1f}ms  "
+                  f"p99 {latency['p99']:>6.1f}ms  {result['changed']} read, {result['not_modified']} not modified, "
+                  f"{result['errors']} errors")
+            for username in result['fixture_mismatches']:
+                print(f"   ❌ @{username}: post count differs from its fixture")
+        refresh = results['engagement_refresh']
+        print(f"   refresh  {refresh['refreshed']} of {refresh['recent_posts']} posts from the last "
+              f"{refresh['hours']}h updated, {refresh['older_refreshed']} older")
+        stale_refresh = refresh['refreshed'] != refresh['recent_posts'] or refresh['older_refreshed']
+        if stale_refresh:
+            print("   ❌ a re-scrape did not refresh engagement inside the window only")
+        if any(result['fixture_mismatches'] for result in results['rounds']) or stale_refresh:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'parsepool':
+        results = benchmark_parse_pool(args.accounts, args.posts, args.workers)
+        print(f"\n🏭 Parse stage: {results['accounts']} accounts x {args.posts} posts, "
+              f"{results['workers']} parser processes")
+        for mode in ('threads', 'process_pool'):
+            result = results[mode]
+            print(f"   {mode:<13} {result['wall_seconds']:>8.3f}s  {result['posts_per_second']:>8,} posts/s  "
+                  f"({result['posts_stored']:,} stored, {result['errors']} errors)")
+        for stage, depth in results['process_pool']['stages'].items():
+            print(f"   {stage} queue   max depth {depth['max_depth']:>3}  mean {depth['mean_depth']:>6.2f}  "
+                  f"producers blocked {depth['blocked_seconds']:.3f}s")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'seenfilter':
+        results = benchmark_seen_filter(args.accounts, args.rounds, args.hours)
+        print(f"\n🔁 Seen-post filter: {results['accounts']} accounts re-scraped {args.rounds} times")
+        for number, result in enumerate(results['rounds'], 1):
+            false_positive_rate = result['false_positive_rate']
+            print(f"   round {number}  {result['posts']:>7,} posts  unfiltered {result['unfiltered_ms']:>8.1f}ms  "
+                  f"filtered {result['filtered_ms']:>8.1f}ms  skipped {result['skip_ratio']:>6.1%}  "
+                  f"bloom false positives {'-' if false_positive_rate is None else f'{false_positive_rate:.1%}'}")
+        restart = results['restart']
+        print(f"   restart  loaded {restart['bloom_entries']:,} fingerprints in {restart['load_seconds']:.3f}s, "
+              f"skipped {restart['skip_ratio']:.1%}, {restart['verified']:,} verified, "
+              f"{restart['false_positives']} false positives")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'archive':
+        results = benchmark_archive(args.tweets, args.accounts)
+        print(f"\n📥 Archive import: {args.accounts} authors")
+        for count, result in results['imports'].items():
+            print(f"   {int(count):>9,} tweets  {result['file_mb']:>7.1f} MB  {result['seconds']:>7.1f}s  "
+                  f"{result['items_per_second']:>8,} tweets/s  peak RSS reading "
+                  f"+{result['read_rss_growth_kb'] / 1024:.1f} MB, importing +{result['rss_growth_kb'] / 1024:.1f} MB")
+        reimport = results['reimport']
+        print(f"   re-import   {reimport['already_stored']:,} already stored, {reimport['imported']} imported  "
+              f"{reimport['seconds']:>7.1f}s")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'metrics':
+        results = benchmark_metrics(args.accounts, args.cycles)
+        print(f"\n⏲️  Stage metrics: {results['accounts']} accounts, {results['observation_ns']}ns per timed block")
+        for number, cycle in enumerate(results['cycles'], 1):
+            print(f"   cycle {number}  {cycle['seconds']:>7.3f}s  {cycle['observations']:>5} observations  "
+                  f"overhead {cycle['overhead']:.4%}")
+        for series, timing in results.get('session_timings', {}).items():
+            p95 = '-' if timing['p95_seconds'] is None else f"{timing['p95_seconds'] * 1000:g}ms"
+            print(f"   {series:<60} {timing['count']:>5}  total {timing['total_seconds']:>8.3f}s  p95 <= {p95}")
+        print(f"   /api/metrics served {results['exposition_lines']} lines")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'logging':
+        results = benchmark_logging(args.records, args.threads, args.write_delay_ms)
+        print(f"\n📝 Logging: {results['records']:,} records from {results['threads']} threads, "
+              f"+{results['write_delay_ms']}ms per file write")
+        for mode in ('direct', 'queued', 'queued_small'):
+            run = results[mode]
+            drained = f"  drained in {run['drain_seconds']:.2f}s, {run['dropped']:,} dropped" if 'drain_seconds' in run else ''
+            print(f"   {mode:<13} callers {run['caller_seconds']:>7.3f}s  p50 {run['p50_us']:>8.1f}us  "
+                  f"p99 {run['p99_us']:>8.1f}us  max {run['max_ms']:>7.2f}ms{drained}")
+        sampling = results['sampling']
+        print(f"   sampling      {sampling['written']} of 1001 kept, {sampling['sampled_out']} sampled out")
+        print(f"   rotation      {results['rotation']['files']} files, largest {results['rotation']['largest_kb']} KB")
+        ring = results['ring']
+        print(f"   ring          {ring['held']} held of {ring['last']}, {ring['from_child']} from a forked process, "
+              f"which saw {ring['child_saw']}")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'rolling':
+        results = benchmark_rolling(args.accounts, args.days, args.rounds)
+        print(f"\n🪟 Rolling windows: {results['accounts']} accounts, {results['load']['posts']:,} posts loaded, "
+              f"{results['window_posts']:,} in the window")
+        initial = results['initial']
+        print(f"   initial   analyze all  full {initial['full_seconds']:>7.3f}s  rolling {initial['rolling_seconds']:>7.3f}s")
+        for number, result in enumerate(results['rounds'], 1):
+            print(f"   round {number}   {result['stored']:>5} stored, refresh read {result['read']:>5} in "
+                  f"{result['refresh_ms']:>6.2f}ms  analyze all  full {result['full_seconds']:>7.3f}s  "
+                  f"rolling {result['rolling_seconds']:>7.3f}s")
+        result = results['after_retention']
+        print(f"   retention refresh read {result['read']:>5}  analyze all  full {result['full_seconds']:>7.3f}s  "
+              f"rolling {result['rolling_seconds']:>7.3f}s")
+        print(f"   restart   reload saved windows {results['reload_seconds']:.3f}s, "
+              f"build from posts {results['rebuild_seconds']:.3f}s")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'reportcache':
+        results = benchmark_reportcache(args.accounts, args.days, args.requests)
+        print(f"\n🗃️  Report cache: {results['accounts']} accounts, {results['requests']} /api/report requests "
+              f"per data version")
+        for label in ('between_cycles', 'after_cycle'):
+            run = results[label]
+            print(f"   {label:<15} first {run['first_ms']:>8.2f}ms  repeats p50 {run['repeat_p50_ms']:>6.2f}ms  "
+                  f"{run['files']} reports saved")
+        print(f"   cache hit       {results['hit_us']}us")
+        print(f"   LRU             {results['cached_reports']} reports in memory")
+        print(f"   other process   {results['other_process_ms']:.2f}ms, reused the saved report")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'sweep':
+        results = benchmark_sweep(args.accounts, args.days, args.hourly_days)
+        daily, hourly = results['daily'], results['hourly']
+        print(f"\n📈 Compliance sweep: {results['accounts']} accounts, {results['load']['posts']:,} posts over "
+              f"{results['days']} days")
+        print(f"   daily  {results['days']:>3}d  {daily['windows']:>7,} windows from {daily['rollup_rows']:>7,} rollups "
+              f"in {daily['seconds']:>7.3f}s  (each window from posts: {results['naive_daily_seconds']:.3f}s)")
+        print(f"   hourly {results['hourly_days']:>3}d  {hourly['windows']:>7,} windows from "
+              f"{hourly['rollup_rows']:>7,} rollups in {hourly['seconds']:>7.3f}s  "
+              f"(each window from posts: ~{results['naive_hourly_seconds']:.3f}s, "
+              f"from {results['hourly_checked']} sampled)")
+        print(f"   /api/compliance {results['days']} days in {results['api_ms']:.2f}ms")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'workload':
+        results = benchmark_workload(args.accounts, args.days)
+        load = results['load']
+        print(f"\n🧪 Synthetic workload: {load['accounts']} accounts over {load['days']} days")
+        print(f"   bulk load    {load['posts']:>11,} posts  {load['history_rows']:>11,} history rows  "
+              f"{load['seconds']:>7.1f}s  ({load['rows_per_minute']:,} rows/min)")
+        print(f"   violations   " + ", ".join(f"{kind} {load['violations'][kind]}"
+                                            for kind in VIOLATIONS if load['violations'].get(kind)))
+        print(f"   30-day report {results['report_30d']['wall_seconds']:>7.3f}s  "
+              f"({results['report_30d']['issues']} issues)")
+        print(f"   retention     {results['retention']['seconds']:>7.3f}s  "
+              f"({results['retention']['posts_deleted']:,} posts deleted, "
+              f"{results['retention']['replayed']} stored again)")
+        for failure in results['failures']:
+            print(f"   ❌ {failure}")
+        if results['failures']:
+            raise SystemExit(1)
+
+    elif args.benchmark == 'pipeline':
+        results = benchmark_pipeline(args.posts, args.accounts, args.samples, args.batch)
+        output = args.output or os.path.join(
+            DATA_DIR, "benchmarks",
+            f"pipeline_{results['meta']['commit'] or 'nogit'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        for size, dataset in results['datasets'].items():
+            print(f"\n🧪 Pipeline: {int(size):,} posts over {args.accounts} accounts")
+            for name, stage in dataset['stages'].items():
+                print(f"   {name:<28} p50 {stage['p50_ms']:>9.3f}ms  p95 {stage['p95_ms']:>9.3f}ms  "
+                      f"p99 {stage['p99_ms']:>9.3f}ms  peak RSS {stage['peak_rss_mb']:>7.1f} MB")
+            print(f"   store_posts throughput       {dataset['stages']['store_posts']['posts_per_second']:,} posts/s")
+        print(f"\n📂 Results written to {output}")
+
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare_pipeline(json.load(f), results, args.threshold)
+            for regression in regressions:
+                print(f"   ❌ {regression}")
+            if regressions:
+                raise SystemExit(1)
+            print(f"   ✅ No stage regressed more than {args.threshold:.0%} at p95")
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,133 @@
 # Twitter Monitoring Configuration
 import os
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Dict
 
-@dataclass
-class AccountConfig:
-    username: str
-    display_name: str
-    schedule_description: str
-    active_hours_utc: List[int]  # Hours when posts are expected
-    max_posts_per_day: int
-    min_interval_minutes: int
-    max_interval_minutes: int
-    reply_window_minutes: int = None  # Expected reply time for mentions
-
-# Account configurations
-ACCOUNTS = {
-    "ladymacbeth": AccountConfig(
-        username="LadyMacbethAI",
-        display_name="Lady Macbeth",
-        schedule_description="Posts 18:00-06:00 UTC, 1-1.5hr intervals, max 10/day, replies within 30min",
-        active_hours_utc=list(range(18, 24)) + list(range(0, 7)),  # 6PM-6AM UTC
-        max_posts_per_day=10,
-        min_interval_minutes=60,
-        max_interval_minutes=90,
-        reply_window_minutes=30
-    ),
-    "bitbard": AccountConfig(
-        username="BitBardOfficial", 
-        display_name="BitBard",
-        schedule_description="Daily 'Cue' at 08:00 Mountain Time (14:00/15:00 UTC), occasional extras",
-        active_hours_utc=[14, 15],  # 8AM Mountain = 2PM/3PM UTC (depending on DST)
-        max_posts_per_day=5,
-        min_interval_minutes=60,
-        max_interval_minutes=1440,  # Up to 24 hours between posts
-        reply_window_minutes=60
-    )
-}
+from accounts import AccountConfig, load_accounts
 
 # Monitoring settings
 MONITORING_CONFIG = {
-    "check_interval_minutes": 5,  # How often to scrape
+    "check_interval_minutes": 5,  # How often to scrape an account during its active hours
+    "poll_scheduling": {
+        "enabled": True,  # False polls every account every check interval around the clock
+        "idle_interval_minutes": 60,  # Poll interval outside an account's active hours
+        "retry_delay_seconds": 60  # Wait after a failed cycle before polling its accounts again
+    },
     "lookback_hours": 24,  # How far back to check for posts
-    "data_retention_days": 30,  # Keep data for analysis
+    "engagement_refresh_hours": 6,  # Stored posts this recent are read again each cycle to update their engagement counts
+    "data_retention_days": 30,  # Raw posts and sessions older than this are deleted; rollups are kept
+    "retention_interval_hours": 24,  # How often the scraper enforces retention
+    "rollup_report_threshold_hours": 48,  # Longer report windows read hourly/daily rollups
+    "compliance_sweep": {
+        "days": 30,  # Period a sweep covers by default; rollups reach back past data_retention_days
+        "window_hours": 24,  # Each result checks this much activity, as a 24-hour report does
+        "step_hours": 24,  # Window ends this far apart: 24 for daily results, 1 for an hourly sliding window
+        "refresh_days": 2  # The scraper re-sweeps this many recent days with each retention run
+    },
+    "report_cache": {
+        "max_entries": 16,  # Reports kept in memory; the least recently used goes first
+        "max_age_seconds": 300,  # Recompute a report this old even without new data, as its window has moved on
+        "persist": True  # Save the first report for each data version to reports/, for other processes to reuse
+    },
+    "rolling_window": {
+        "enabled": True,  # Serve reports over the standard window from counts kept as posts are stored
+        "hours": 24,  # The standard window; reports over other windows query posts or rollups
+        "save_interval_seconds": 300  # How often the scraper saves the windows for other processes to start from
+    },
     "log_level": "INFO",
+    "logging": {
+        "queue_size": 10000,  # Records waiting for the log writer thread; more are dropped instead of blocking
+        "max_bytes": 10 * 1024 * 1024,  # monitor.log rotates at this size
+        "backup_count": 5,  # Rotated files kept: monitor.log.1 to monitor.log.5
+        "sampling": {
+            "levels": ["DEBUG", "INFO"],  # Levels whose chatty lines are sampled; warnings and errors always pass
+            "burst": 20,  # Records from one logging call kept per window before sampling starts
+            "every": 10,  # Then one in this many is kept
+            "window_seconds": 60
+        },
+        "ring_size": 2000,  # Recent records kept in memory for /api/logs
+        "ring_slot_bytes": 1024  # Longer records have their message cut to fit
+    },
+    "nitter_instances": [  # Base URLs; tried fastest-healthy-first at runtime
+        "https://nitter.net",
+        "https://nitter.it",
+        "https://nitter.privacydev.net",
+        "https://nitter.unixfox.eu"
+    ],
+    "instance_routing": {
+        "ewma_alpha": 0.3,  # Weight of the newest sample in latency/error averages
+        "unknown_latency_ms": 2000,  # Assumed latency for instances never tried
+        "failure_threshold": 3,  # Consecutive failures before the circuit opens
+        "cooldown_seconds": 600,  # First wait before probing an open instance again
+        "max_cooldown_seconds": 6 * 3600  # Cooldown doubles per re-open up to this cap
+    },
+    "search_url": "https://www.google.com/search",
+    "request_timeout_seconds": 10,
+    "hedged_fetch": True,  # Start the next source early instead of waiting for a slow one to fail
+    "hedging": {
+        "default_budget_seconds": 3.0,  # Wait this long before hedging until enough latencies are known
+        "budget_percentile": 90,  # Hedge once a source is slower than this percentile of its history
+        "min_samples": 5,
+        "latency_window": 50  # Recent latencies kept per source
+    },
+    "backfill_page_delay_seconds": 2,  # Pause between timeline pages during backfill
+    "backfill_max_wait_seconds": 900,  # Backfill waits this long for a rate-limited host before skipping it
+    "rate_limits": {  # Token bucket per host, shared by every process using the same database
+        "default": {"requests_per_minute": 30, "burst": 5},
+        "hosts": {  # Per-host overrides, keyed by host[:port]
+            "www.google.com": {"requests_per_minute": 6, "burst": 2}
+        },
+        "max_wait_seconds": 10,  # A cycle skips a host whose next token is further off than this
+        "default_retry_after_seconds": 300  # Back-off after a 429 that has no Retry-After
+    },
+    "concurrent_cycles": True,  # Scrape all accounts at once instead of one by one
+    "max_concurrent_accounts": 8,
+    "cycle_deadline_seconds": 120,  # Accounts still running after this are reported as errors
+    "parse_pipeline": {  # For large account sets: parse pages in worker processes, store through one writer
+        "enabled": False,  # Implies concurrent cycles; pages are read whole rather than streamed
+        "parse_workers": 0,  # Parser processes; 0 means one per CPU
+        "max_pending_pages": 0,  # Pages queued or being parsed before fetchers wait; 0 means 2 per worker
+        "start_method": "spawn",  # Fresh interpreters, as forking the threaded scraper is unsafe
+        "write_queue_size": 64,  # Accounts' posts waiting for the writer before fetchers wait
+        "write_batch_posts": 2000,  # Posts per store_posts call
+        "write_max_delay_seconds": 0.5  # Longest a partial batch waits for more posts
+    },
+    "seen_filter": {  # Skip writing re-scraped posts that are already stored unchanged
+        "enabled": True,
+        "capacity": 1_000_000,  # Posts the bloom filter is sized for; it grows to twice the stored posts on rebuild
+        "false_positive_rate": 0.01,  # Bloom hits that turn out not to be stored; each costs a verification read
+        "recent_per_account": 1000,  # Newest posts per account matched exactly, without the bloom filter
+        "save_interval_seconds": 300  # How often the filter is saved to the database between cycles
+    },
+    "archive_import": {  # archive_import.py, for loading JSON tweet exports
+        "batch_size": 20000,  # Posts per transaction
+        "read_chunk_chars": 1 << 20  # Characters read from the file at a time
+    },
+    "synthetic_workload": {  # Generated posts for the scraper's last-resort fallback and for load tests
+        "seed": 1337,  # Each account-day's stream is seeded from this, the username and the day
+        "violation_rate": 0.05,  # Share of account-days given one injected schedule violation
+        "reply_burst_probability": 0.3,  # Chance an original is followed by a burst of replies
+        "reply_burst_mean_size": 3,
+        "reply_gap_seconds": 90,  # Mean gap between replies in a burst
+        "median_likes": 12,  # Final likes per original are log-normal around this
+        "likes_sigma": 1.0,
+        "reply_engagement_factor": 0.1,  # Replies draw this fraction of an original's engagement
+        "engagement_time_constant_minutes": 180,  # Engagement reaches 63% of its final value by this age
+        "snapshot_minutes": [5, 30, 120, 720, 2880],  # Post ages at which bulk-loaded history is sampled
+        "bulk_batch_size": 50000  # Posts per transaction when bulk loading
+    },
+    "metrics": {  # Stage timings, saved with each session and served at /api/metrics
+        "enabled": True,
+        # Histogram bucket bounds; fixed, so every process's series can be added together
+        "latency_buckets_seconds": [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    },
+    "storage": {
+        "reader_connections": 4,  # Read-only connections per process; the writer is always one
+        "synchronous": "NORMAL",  # Safe with WAL: a crash can lose the last commits, never corrupt
+        "mmap_size_mb": 256,
+        "cache_size_mb": 64,  # Page cache per connection
+        "busy_timeout_ms": 5000,
+        "cached_statements": 256  # Prepared statements kept per connection
+    },
     "alerts_enabled": True,
     "alert_thresholds": {
         "no_posts_hours": 6,  # Alert if no posts for X hours during active time
@@ -52,11 +136,28 @@ MONITORING_CONFIG = {
     }
 }
 
+# Point the scraper at other Nitter instances or a search endpoint, e.g. a local
+# fake_nitter.py: MONITORING_NITTER_URLS=http://127.0.0.1:8090 python scraper.py
+if os.environ.get("MONITORING_NITTER_URLS"):
+    MONITORING_CONFIG["nitter_instances"] = [url.strip().rstrip('/') for url in
+                                             os.environ["MONITORING_NITTER_URLS"].split(',') if url.strip()]
+if os.environ.get("MONITORING_SEARCH_URL"):
+    MONITORING_CONFIG["search_url"] = os.environ["MONITORING_SEARCH_URL"]
+
 # File paths
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 LOGS_DIR = os.path.join(os.path.dirname(__file__), "logs")
 REPORTS_DIR = os.path.join(os.path.dirname(__file__), "reports")
 
+CHARACTERS_DIR = os.path.join(os.path.dirname(__file__), "..", "characters")
+ACCOUNT_SCHEDULES_FILE = os.path.join(os.path.dirname(__file__), "accounts.schedule.json")
+
 # Ensure directories exist
 for dir_path in [DATA_DIR, LOGS_DIR, REPORTS_DIR]:
-    os.makedirs(dir_path, exist_ok=True) 
\ No newline at end of file
+    os.makedirs(dir_path, exist_ok=True)
+
+# Account configurations: every character with a Twitter handle, with the
+# monitoring schedule taken from the character file and accounts.schedule.json
+ACCOUNTS: Dict[str, AccountConfig] = load_accounts(
+    CHARACTERS_DIR, ACCOUNT_SCHEDULES_FILE, os.path.join(DATA_DIR, "accounts_cache.json")
+)
@@ -3,26 +3,54 @@ Simple Web Dashboard for Twitter Monitoring
 View real-time posting schedules and compliance reports
 """
 
-import os
 import json
-import sqlite3
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any
+from typing import Dict
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import urllib.parse
-import threading
-import time
+import logging
 
-from config import ACCOUNTS, DATA_DIR, REPORTS_DIR
 from analyzer import ScheduleAnalyzer
+from metrics import METRICS, MetricsStore, render_prometheus
+from log_pipeline import setup_logging, get_pipeline
+from report_cache import DATA_VERSION_SQL, get_report_cache
+
+LATEST_SESSION_SQL = '''
+    SELECT session_id, started_at, posts_found, errors, stats
+    FROM monitoring_sessions 
+    ORDER BY started_at DESC 
+    LIMIT 1
+'''
+
+# Paths timed under their own label; anything else is counted as "other"
+ROUTES = {'/', '/api/status', '/api/report', '/api/posts', '/api/engagement', '/api/metrics', '/api/logs', '/api/compliance'}
+
+# Every query the handlers run directly, with sample parameters for query plan checks
+QUERIES = {
+    'latest_session': (LATEST_SESSION_SQL, ()),
+    'data_version': (DATA_VERSION_SQL, ()),
+}
 
 class MonitoringDashboard(BaseHTTPRequestHandler):
+    db_path = None  # Monitoring database to serve; None for the default one
+    
     def __init__(self, *args, **kwargs):
-        self.analyzer = ScheduleAnalyzer()
+        self.analyzer = ScheduleAnalyzer(self.db_path)
         super().__init__(*args, **kwargs)
     
     def do_GET(self):
         """Handle GET requests"""
+        route = urllib.parse.urlparse(self.path).path
+        route = route if route in ROUTES else 'other'
+        self.response_status = None
+        with METRICS.timer('monitoring_http_request_seconds', path=route):
+            self.route_request()
+        METRICS.inc('monitoring_http_requests_total', path=route, status=str(self.response_status))
+    
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def route_request(self):
         parsed_path = urllib.parse.urlparse(self.path)
         
         if parsed_path.path == '/':
@@ -36,6 +64,24 @@ class MonitoringDashboard(BaseHTTPRequestHandler):
             username = urllib.parse.parse_qs(parsed_path.query).get('username', [''])[0]
             hours = int(urllib.parse.parse_qs(parsed_path.query).get('hours', ['24'])[0])
             self.serve_posts_api(username, hours)
+        elif parsed_path.path == '/api/engagement':
+            username = urllib.parse.parse_qs(parsed_path.query).get('username', [''])[0]
+            hours = int(urllib.parse.parse_qs(parsed_path.query).get('hours', ['24'])[0])
+            self.serve_engagement_api(username, hours)
+        elif parsed_path.path == '/api/compliance':
+            query = urllib.parse.parse_qs(parsed_path.query)
+            username = query.get('username', [''])[0]
+            days = int(query.get('days', ['30'])[0])
+            step = int(query.get('step', ['24'])[0])
+            self.serve_compliance_api(username, days, step)
+        elif parsed_path.path == '/api/metrics':
+            self.serve_metrics_api()
+        elif parsed_path.path == '/api/logs':
+            query = urllib.parse.parse_qs(parsed_path.query)
+            after = int(query.get('after', ['0'])[0])
+            level = query.get('level', ['DEBUG'])[0].upper()
+            limit = int(query.get('limit', ['200'])[0])
+            self.serve_logs_api(after, level, limit)
         else:
             self.send_error(404)
     
@@ -52,43 +98,35 @@ class MonitoringDashboard(BaseHTTPRequestHandler):
         """Serve current monitoring status"""
         try:
             # Get latest monitoring session
-            conn = sqlite3.connect(f"{DATA_DIR}/twitter_monitoring.db")
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT session_id, started_at, posts_found, errors
-                FROM monitoring_sessions 
-                ORDER BY started_at DESC 
-                LIMIT 1
-            ''')
+            with self.analyzer.storage.reader() as conn:
+                row = conn.execute(LATEST_SESSION_SQL).fetchone()
             
-            row = cursor.fetchone()
             if row:
                 status = {
                     'last_check': row[1],
                     'posts_found': row[2],
                     'errors': json.loads(row[3]) if row[3] else [],
-                    'status': 'active' if not json.loads(row[3]) else 'warning'
+                    'status': 'active' if not json.loads(row[3]) else 'warning',
+                    'stats': json.loads(row[4]) if row[4] else {}
                 }
             else:
                 status = {
                     'last_check': None,
                     'posts_found': 0,
                     'errors': [],
-                    'status': 'unknown'
+                    'status': 'unknown',
+                    'stats': {}
                 }
             
-            conn.close()
-            
             self.send_json_response(status)
             
         except Exception as e:
             self.send_json_response({'error': str(e)}, 500)
     
     def serve_report_api(self, hours: int):
-        """Serve analysis report"""
+        """Serve analysis report, recomputed only when new data has come in since it was last served"""
         try:
-            report = self.analyzer.generate_report(hours)
+            report = get_report_cache(self.analyzer.db_path).get(hours)
             self.send_json_response(report)
         except Exception as e:
             self.send_json_response({'error': str(e)}, 500)
@@ -105,6 +143,47 @@ class MonitoringDashboard(BaseHTTPRequestHandler):
         except Exception as e:
             self.send_json_response({'error': str(e)}, 500)
     
+    def serve_engagement_api(self, username: str, hours: int):
+        """Serve the engagement a user's posts gained in each hour"""
+        try:
+            self.send_json_response(self.analyzer.get_engagement_by_hour(username, hours))
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+    
+    def serve_compliance_api(self, username: str, days: int, step_hours: int):
+        """Serve a user's swept compliance, one 24-hour window per step_hours over the last `days` days"""
+        try:
+            self.send_json_response(self.analyzer.get_compliance_history(username, days, step_hours))
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+    
+    def serve_metrics_api(self):
+        """Serve this process's metrics and the latest ones the scraper saved, in Prometheus text format"""
+        try:
+            snapshots = MetricsStore(self.analyzer.db_path).load()
+            snapshots['dashboard'] = METRICS.snapshot()
+            body = render_prometheus(snapshots).encode()
+        except Exception as e:
+            self.send_json_response({'error': str(e)}, 500)
+            return
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def serve_logs_api(self, after: int, level: str, limit: int):
+        """Serve recent log records from the log pipeline's ring, newer than record number `after`"""
+        pipeline = get_pipeline()
+        if pipeline is None:
+            self.send_json_response({'error': 'Logging is not set up through log_pipeline'}, 503)
+            return
+        min_level = logging.getLevelName(level)
+        if not isinstance(min_level, int):
+            self.send_json_response({'error': f'Unknown log level: {level}'}, 400)
+            return
+        records, last = pipeline.ring.records(after, min_level, limit)
+        self.send_json_response({'records': records, 'last': last, 'stats': pipeline.stats()})
+    
     def send_json_response(self, data: Dict, status_code: int = 200):
         """Send JSON response"""
         self.send_response(status_code)
@@ -310,4 +389,5 @@ def run_dashboard_server(port: int = 8080):
         server.shutdown()
 
 if __name__ == "__main__":
+    setup_logging()
     run_dashboard_server() 
\ No newline at end of file
@@ -0,0 +1,390 @@
+"""
+Local Nitter Stand-in Server
+Serves timeline pages on localhost so the scraper can be exercised offline
+"""
+
+import os
+import time
+import glob
+import json
+import html
+import zlib
+import random
+import hashlib
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, List, Dict, Any, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Pages saved from a live instance with --record
+RECORDED_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "nitter")
+# Pages rendered with TIMELINE_ITEM_HTML below, with made-up ids; they only check
+# the parser against markup written to match it
+SYNTHETIC_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "nitter_synthetic")
+# Recorded pages when there are any, else the synthetic ones
+FIXTURES_DIR = (RECORDED_FIXTURES_DIR if glob.glob(os.path.join(RECORDED_FIXTURES_DIR, "*.html"))
+                else SYNTHETIC_FIXTURES_DIR)
+
+EMPTY_TIMELINE_HTML = '''<!DOCTYPE html>
+<html>
+<head><title>{username} | nitter</title></head>
+<body>
+<div class="timeline">
+</div>
+</body>
+</html>
+'''
+
+TIMELINE_PAGE_HTML = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{display_name} (@{username}) | nitter</title>
+<link rel="stylesheet" type="text/css" href="/css/style.css">
+</head>
+<body>
+<nav><div class="inner-nav"><div class="nav-item"><a class="site-name" href="/">nitter</a></div></div></nav>
+<div class="container">
+<div class="profile-tabs">
+<div class="profile-card"><div class="profile-card-info"><a class="profile-card-fullname" href="/{username}" title="{display_name}">{display_name}</a><a class="profile-card-username" href="/{username}" title="@{username}">@{username}</a></div></div>
+<div class="timeline-container">
+<div class="timeline">
+{items}
+</div>
+</div>
+</div>
+</div>
+</body>
+</html>
+'''
+
+TIMELINE_ITEM_HTML = '''<div class="timeline-item " data-username="{author}">
+<a class="tweet-link" href="/{author}/status/{id}#m"></a>
+<div class="tweet-body">
+<div>
+{header_extra}<div class="tweet-header">
+<a class="tweet-avatar" href="/{author}"><img class="avatar round" src="/pic/profile_images%2F{author}_bigger.jpg" alt="" loading="lazy"></a>
+<div class="tweet-name-row">
+<div class="fullname-and-username">
+<a class="fullname" href="/{author}" title="{author}">{author}</a>
+<a class="username" href="/{author}" title="@{author}">@{author}</a>
+</div>
+<span class="tweet-date"><a href="/{author}/status/{id}#m" title="{date_title}">{date_short}</a></span>
+</div>
+</div>
+</div>
+{replying_to}<div class="tweet-content media-body" dir="auto">{content}</div>
+{quote}<div class="tweet-stats">
+<span class="tweet-stat"><div class="icon-container"><span class="icon-comment" title=""></span> {replies}</div></span>
+<span class="tweet-stat"><div class="icon-container"><span class="icon-retweet" title=""></span> {retweets}</div></span>
+<span class="tweet-stat"><div class="icon-container"><span class="icon-quote" title=""></span> {quotes}</div></span>
+<span class="tweet-stat"><div class="icon-container"><span class="icon-heart" title=""></span> {likes}</div></span>
+</div>
+</div>
+</div>
+'''
+
+SHOW_MORE_HTML = '''<div class="show-more">
+<a href="?cursor={cursor}">Load more</a>
+</div>
+'''
+
+def _stat(value: int) -> str:
+    # Nitter leaves zero counts blank and groups thousands with commas
+    return f"{value:,}" if value else ""
+
+def render_timeline_item(post: Dict[str, Any], username: str) -> str:
+    """Render one post in Nitter's timeline-item markup"""
+    timestamp = post['timestamp']
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    metrics = post.get('metrics') or {}
+    if isinstance(metrics, str):
+        metrics = json.loads(metrics)
+    post_type = post.get('post_type', 'original')
+
+    header_extra = ''
+    if post.get('pinned'):
+        header_extra += ('<div class="pinned"><span><span class="icon-pin" title=""></span> '
+                         'Pinned Tweet</span></div>\n')
+    author = username
+    if post_type == 'retweet':
+        header_extra += (f'<div class="retweet-header"><span><div class="icon-container">'
+                         f'<span class="icon-retweet" title=""></span> {username} retweeted</div></span></div>\n')
+        author = post.get('author') or 'someone'
+
+    replying_to = ''
+    if post_type == 'reply' and post.get('reply_to'):
+        replying_to = (f'<div class="replying-to">Replying to '
+                       f'<a href="/{post["reply_to"]}">@{post["reply_to"]}</a></div>\n')
+
+    quote = ''
+    if post_type == 'quote':
+        quote = ('<div class="quote quote-big"><a class="quote-link" href="/someone/status/1#m"></a>'
+                 '<div class="tweet-name-row"><span class="tweet-date"><a href="/someone/status/1#m" '
+                 'title="Jan 1, 2020 · 12:00 AM UTC">Jan 1, 2020</a></span></div>'
+                 '<div class="quote-text" dir="auto">Quoted text</div></div>\n')
+
+    return TIMELINE_ITEM_HTML.format(
+        author=author,
+        id=post['id'],
+        header_extra=header_extra,
+        date_title=timestamp.strftime('%b %-d, %Y · %-I:%M %p UTC'),
+        date_short=timestamp.strftime('%b %-d'),
+        replying_to=replying_to,
+        content=html.escape(post.get('content') or '').replace('\n', '<br>'),
+        quote=quote,
+        replies=_stat(metrics.get('replies', 0)),
+        retweets=_stat(metrics.get('retweets', 0)),
+        quotes=_stat(metrics.get('quotes', 0)),
+        likes=_stat(metrics.get('likes', 0))
+    )
+
+def render_timeline(username: str, posts: List[Dict[str, Any]], cursor: Optional[str] = None,
+                    display_name: Optional[str] = None) -> str:
+    """Render a full Nitter timeline page; posts should be newest first"""
+    items = ''.join(render_timeline_item(post, username) for post in posts)
+    if cursor:
+        items += SHOW_MORE_HTML.format(cursor=cursor)
+    return TIMELINE_PAGE_HTML.format(username=username, display_name=display_name or username, items=items)
+
+def fixture_path(fixtures_dir: str, username: str, cursor: Optional[str] = None) -> str:
+    """Where a recorded timeline page lives: <username>.html, later pages by cursor"""
+    if cursor:
+        return os.path.join(fixtures_dir, f"{username}.cursor-{quote(cursor, safe='')}.html")
+    return os.path.join(fixtures_dir, f"{username}.html")
+
+def generated_timelines(posts_per_account: int, interval_minutes: int = 60,
+                        newest: Optional[datetime] = None) -> Callable[[str], List[Dict[str, Any]]]:
+    """A timeline source giving every account one original post per interval, newest first"""
+    newest = newest or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    def timeline(username: str) -> List[Dict[str, Any]]:
+        seed = zlib.crc32(username.encode()) % 10 ** 6
+        return [{
+            'id': str(1940000000000000000 + seed * 10 ** 6 + posts_per_account - i),
+            'timestamp': newest - timedelta(minutes=interval_minutes * i),
+            'content': f"Generated post {i} from {username}",
+            'post_type': 'original',
+            'metrics': {'likes': i % 40, 'retweets': i % 7, 'replies': i % 5}
+        } for i in range(posts_per_account)]
+    return timeline
+
+def record_timelines(base_url: str, usernames: List[str], fixtures_dir: str, pages: int = 1,
+                     timeout: float = 15.0) -> List[str]:
+    """
+    Fetch timelines from a real Nitter instance and save each page as a
+    fixture, following "Load more" cursors for up to `pages` pages
+    """
+    import requests
+    from nitter_parser import parse_timeline_html
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    everything = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    saved = []
+    with requests.Session() as session:
+        for username in usernames:
+            cursor = None
+            for _ in range(pages):
+                url = f"{base_url.rstrip('/')}/{username}" + (f"?cursor={cursor}" if cursor else "")
+                response = session.get(url, timeout=timeout)
+                response.raise_for_status()
+                if 'charset' not in response.headers.get('Content-Type', '').lower():
+                    response.encoding = 'utf-8'
+                path = fixture_path(fixtures_dir, username, cursor)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+                saved.append(path)
+                cursor = parse_timeline_html(response.text, username, everything).cursor
+                if not cursor:
+                    break
+    return saved
+
+class FakeNitterHandler(BaseHTTPRequestHandler):
+    # Headers and body go out in separate writes; with Nagle on, the body can
+    # wait on the client's delayed ACK and add tens of milliseconds of noise
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """Serve a timeline page after the configured delay"""
+        server = self.server
+        with server.lock:
+            server.request_times.append(time.time())
+            throttle = server.throttle_requests > 0
+            server.throttle_requests -= throttle
+            delay = server.latency_seconds + server.random.random() * server.latency_jitter_seconds
+            fail = server.random.random() < server.error_rate
+
+        if server.dead:
+            # Accept the connection but never answer, like a hung instance
+            time.sleep(server.hang_seconds)
+            return
+
+        if delay:
+            time.sleep(delay)
+
+        if throttle:
+            self.send_response(429)
+            if server.retry_after is not None:
+                self.send_header('Retry-After', server.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if fail:
+            self._send_empty(503)
+            return
+
+        url = urlsplit(self.path)
+        username = url.path.strip('/') or 'unknown'
+        cursor = parse_qs(url.query).get('cursor', [None])[0]
+        body = server.timeline_page(username, cursor)
+        if body is None:
+            self._send_empty(404)
+            return
+        body = body.encode()
+
+        etag = f'"{hashlib.sha1(body).hexdigest()}"' if server.etags else None
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        """Route request logs through logging instead of stderr"""
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+class FakeNitterServer:
+    """
+    Threaded stand-in for one Nitter instance, usable as a context manager.
+    Pages come from recorded fixtures when `fixtures_dir` has one for the
+    request, else from the `timelines` source paginated `page_size` items at
+    a time, else an empty timeline. Latency, jitter and the share of 503s
+    are drawn from a seeded generator, so runs repeat exactly.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, dead: bool = False,
+                 hang_seconds: float = 60.0, port: int = 0,
+                 throttle_requests: int = 0, retry_after: Optional[str] = None,
+                 fixtures_dir: Optional[str] = None,
+                 timelines: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+                 page_size: int = 20, etags: bool = False,
+                 latency_jitter_seconds: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), FakeNitterHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency_seconds = latency_seconds
+        self.httpd.latency_jitter_seconds = latency_jitter_seconds  # Up to this much extra, uniformly
+        self.httpd.error_rate = error_rate  # Share of requests answered with 503
+        self.httpd.random = random.Random(seed)
+        self.httpd.dead = dead
+        self.httpd.hang_seconds = hang_seconds
+        self.httpd.throttle_requests = throttle_requests  # Answer this many requests with 429 first
+        self.httpd.retry_after = retry_after
+        self.httpd.etags = etags  # Send ETags and answer matching If-None-Match with 304
+        self.httpd.timeline_page = self.timeline_page
+        self.httpd.request_times: List[float] = []
+        self.httpd.lock = threading.Lock()
+        self.fixtures_dir = fixtures_dir
+        self.timelines = timelines
+        self.page_size = page_size
+        self.thread: Optional[threading.Thread] = None
+
+    def timeline_page(self, username: str, cursor: Optional[str] = None) -> Optional[str]:
+        """The HTML served for one timeline page, None for a cursor past the end"""
+        if self.fixtures_dir:
+            path = fixture_path(self.fixtures_dir, username, cursor)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return f.read()
+        if self.timelines is None:
+            return None if cursor else EMPTY_TIMELINE_HTML.format(username=username)
+
+        # Generated timelines page by offset, like Nitter's opaque cursors
+        posts = self.timelines(username)
+        offset = int(cursor) if cursor and cursor.isdigit() else 0
+        if cursor and not offset:
+            return None
+        page = posts[offset:offset + self.page_size]
+        next_cursor = str(offset + self.page_size) if offset + self.page_size < len(posts) else None
+        return render_timeline(username, page, cursor=next_cursor)
+
+    @property
+    def request_times(self) -> List[float]:
+        with self.httpd.lock:
+            return list(self.httpd.request_times)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeNitterServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeNitterServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local Nitter stand-in server')
+    parser.add_argument('--port', type=int, default=8090, help='Port to listen on (default: 8090)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 503')
+    parser.add_argument('--dead', action='store_true', help='Accept connections but never answer')
+    parser.add_argument('--etags', action='store_true', help='Send ETags and answer repeat requests with 304')
+    parser.add_argument('--fixtures', help='Pages to serve, or where --record saves them (default: fixtures/nitter '
+                                           'when it has recorded pages, else fixtures/nitter_synthetic; '
+                                           'fixtures/nitter for --record)')
+    parser.add_argument('--generate', type=int, default=0, metavar='N',
+                        help='Serve N generated hourly posts for accounts without a fixture')
+    parser.add_argument('--page-size', type=int, default=20, help='Items per generated page (default: 20)')
+    parser.add_argument('--record', metavar='BASE_URL',
+                        help='Instead of serving, save timelines from this Nitter instance into --fixtures')
+    parser.add_argument('--accounts', nargs='+', default=[], help='Usernames to record')
+    parser.add_argument('--pages', type=int, default=1, help='Pages to record per account (default: 1)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.record:
+        for path in record_timelines(args.record, args.accounts, args.fixtures or RECORDED_FIXTURES_DIR, args.pages):
+            print(f"💾 {path}")
+    else:
+        server = FakeNitterServer(latency_seconds=args.latency, dead=args.dead, port=args.port,
+                                  fixtures_dir=args.fixtures or FIXTURES_DIR, etags=args.etags,
+                                  timelines=generated_timelines(args.generate) if args.generate else None,
+                                  page_size=args.page_size, latency_jitter_seconds=args.jitter,
+                                  error_rate=args.error_rate)
+        print(f"🧪 Fake Nitter running at {server.base_url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,140 @@
+"""
+Timeline Fetch Cache
+HTTP validators and body hashes per (instance, username) so unchanged timelines are skipped
+"""
+
+import re
+import hashlib
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Tuple, Optional
+
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Relative ages like "5m" or "2h" change on every fetch without the timeline changing
+RELATIVE_DATE_PATTERN = re.compile(r'(<span class="tweet-date"><a[^>]*>)[^<]*(</a>)')
+
+def timeline_body_hash(body: str) -> str:
+    """Hash a timeline page, ignoring the parts that change even when no post does"""
+    normalized = RELATIVE_DATE_PATTERN.sub(r'\1\2', body)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class ValidatorCache:
+    """
+    Remembers ETag/Last-Modified headers and the last body hash seen for each
+    timeline. Held in memory during a cycle and written back with flush().
+    Validators for a page with posts are held until release() says the posts
+    were stored; until then the next fetch reads the page again.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        self.lock = threading.Lock()
+        self.setup_table()
+        self.entries: Dict[Tuple[str, str], Dict[str, Optional[str]]] = self._load()
+        self.dirty = set()
+        self.held: Dict[str, Tuple[str, Dict[str, Optional[str]]]] = {}
+
+    def setup_table(self):
+        """Create the validator table if needed"""
+        with self.storage.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fetch_validators (
+                    instance TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,  -- SHA-256 of the normalized page, for servers without validators
+                    updated_at DATETIME,
+                    PRIMARY KEY (instance, username)
+                )
+            ''')
+
+    def _load(self) -> Dict[Tuple[str, str], Dict[str, Optional[str]]]:
+        with self.storage.reader() as conn:
+            rows = conn.execute(
+                'SELECT instance, username, etag, last_modified, body_hash FROM fetch_validators'
+            ).fetchall()
+        return {
+            (instance, username): {'etag': etag, 'last_modified': last_modified, 'body_hash': body_hash}
+            for instance, username, etag, last_modified, body_hash in rows
+        }
+
+    def request_headers(self, instance: str, username: str) -> Dict[str, str]:
+        """Conditional request headers for the last version of this timeline we saw"""
+        with self.lock:
+            entry = self.entries.get((instance, username))
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def body_unchanged(self, instance: str, username: str, body_hash: str) -> bool:
+        with self.lock:
+            entry = self.entries.get((instance, username))
+        return bool(entry) and entry['body_hash'] == body_hash
+
+    def remember(self, instance: str, username: str, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, body_hash: Optional[str] = None):
+        """Store the validators from a full (200) response"""
+        with self.lock:
+            self.entries[(instance, username)] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body_hash': body_hash
+            }
+            self.dirty.add((instance, username))
+
+    def hold(self, instance: str, username: str, etag: Optional[str] = None,
+             last_modified: Optional[str] = None, body_hash: Optional[str] = None):
+        """Keep the validators from a full response until its posts are stored"""
+        with self.lock:
+            self.held[username] = (instance, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body_hash': body_hash
+            })
+
+    def release(self, usernames: Iterable[str]):
+        """Remember the held validators for these accounts, whose posts are now stored"""
+        with self.lock:
+            for username in usernames:
+                held = self.held.pop(username, None)
+                if held is not None:
+                    instance, entry = held
+                    self.entries[(instance, username)] = entry
+                    self.dirty.add((instance, username))
+
+    def discard(self, usernames: Iterable[str]):
+        """Drop the held validators for these accounts, whose posts failed to store"""
+        with self.lock:
+            for username in usernames:
+                self.held.pop(username, None)
+
+    def flush(self):
+        """Persist changed entries to the database"""
+        with self.lock:
+            rows = [
+                (instance, username, entry['etag'], entry['last_modified'], entry['body_hash'])
+                for (instance, username), entry in self.entries.items()
+                if (instance, username) in self.dirty
+            ]
+            self.dirty.clear()
+
+        if not rows:
+            return
+
+        updated_at = datetime.now(timezone.utc).isoformat()
+        with self.storage.writer() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO fetch_validators
+                (instance, username, etag, last_modified, body_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [row + (updated_at,) for row in rows])
@@ -0,0 +1,183 @@
+"""
+Nitter Instance Router
+Orders Nitter instances by expected latency and skips ones that keep failing
+"""
+
+import sqlite3
+import threading
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+from config import MONITORING_CONFIG
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"  # Once the cooldown has passed an open circuit is half-open: it gets probed again
+
+@dataclass
+class InstanceHealth:
+    instance: str
+    ewma_latency_ms: Optional[float] = None  # None until the first response
+    error_rate: float = 0.0  # EWMA of failures, 0.0 - 1.0
+    last_success: Optional[str] = None
+    last_failure: Optional[str] = None
+    consecutive_failures: int = 0
+    circuit_state: str = CLOSED
+    circuit_opened_at: Optional[str] = None
+    times_opened: int = 0  # Consecutive trips, drives the cooldown backoff
+    total_requests: int = 0
+
+class InstanceRouter:
+    """
+    Keeps per-instance health in the monitoring database. Health is held in
+    memory while a cycle runs and written back with flush().
+    """
+
+    def __init__(self, db_path: str, instances: Optional[List[str]] = None):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        self.instances = instances
+        self.settings = MONITORING_CONFIG["instance_routing"]
+        self.lock = threading.Lock()
+        self.setup_table()
+        self.health: Dict[str, InstanceHealth] = self._load()
+
+    def setup_table(self):
+        """Create the instance health table if needed"""
+        with self.storage.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS instance_health (
+                    instance TEXT PRIMARY KEY,
+                    ewma_latency_ms REAL,
+                    error_rate REAL DEFAULT 0,
+                    last_success DATETIME,
+                    last_failure DATETIME,
+                    consecutive_failures INTEGER DEFAULT 0,
+                    circuit_state TEXT DEFAULT 'closed',  -- 'closed' or 'open'
+                    circuit_opened_at DATETIME,
+                    times_opened INTEGER DEFAULT 0,
+                    total_requests INTEGER DEFAULT 0
+                )
+            ''')
+
+    def _load(self) -> Dict[str, InstanceHealth]:
+        with self.storage.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute('SELECT * FROM instance_health').fetchall()
+        return {row['instance']: InstanceHealth(**dict(row)) for row in rows}
+
+    def _get(self, instance: str) -> InstanceHealth:
+        if instance not in self.health:
+            self.health[instance] = InstanceHealth(instance=instance)
+        return self.health[instance]
+
+    def _cooldown_seconds(self, health: InstanceHealth) -> float:
+        """Cooldown doubles every time the circuit re-opens, up to a cap"""
+        cooldown = self.settings["cooldown_seconds"] * 2 ** max(0, health.times_opened - 1)
+        return min(cooldown, self.settings["max_cooldown_seconds"])
+
+    def expected_cost_ms(self, health: InstanceHealth) -> float:
+        """Expected time spent on an instance: its latency plus a timeout for each likely failure"""
+        latency = health.ewma_latency_ms
+        if latency is None:
+            latency = self.settings["unknown_latency_ms"]
+        timeout_ms = MONITORING_CONFIG["request_timeout_seconds"] * 1000
+        return latency + health.error_rate * timeout_ms
+
+    def _is_cooling_down(self, health: InstanceHealth) -> bool:
+        if health.circuit_state != OPEN:
+            return False
+        opened_at = datetime.fromisoformat(health.circuit_opened_at)
+        elapsed = (datetime.now(timezone.utc) - opened_at).total_seconds()
+        return elapsed < self._cooldown_seconds(health)
+
+    def ordered_instances(self) -> List[str]:
+        """Instances worth trying this time, cheapest first; open circuits are skipped"""
+        candidates = []
+
+        with self.lock:
+            for instance in self.instances or MONITORING_CONFIG["nitter_instances"]:
+                health = self._get(instance)
+                if self._is_cooling_down(health):
+                    continue
+                candidates.append(health)
+
+        candidates.sort(key=self.expected_cost_ms)
+        return [health.instance for health in candidates]
+
+    def record_success(self, instance: str, latency_seconds: float):
+        """Record a successful response from an instance"""
+        alpha = self.settings["ewma_alpha"]
+        latency_ms = latency_seconds * 1000
+
+        with self.lock:
+            health = self._get(instance)
+            if health.ewma_latency_ms is None:
+                health.ewma_latency_ms = latency_ms
+            else:
+                health.ewma_latency_ms = alpha * latency_ms + (1 - alpha) * health.ewma_latency_ms
+            health.error_rate = (1 - alpha) * health.error_rate
+            health.last_success = datetime.now(timezone.utc).isoformat()
+            health.consecutive_failures = 0
+            health.total_requests += 1
+
+            if health.circuit_state != CLOSED:
+                logger.info(f"Circuit closed for {instance}")
+            health.circuit_state = CLOSED
+            health.circuit_opened_at = None
+            health.times_opened = 0
+
+    def record_failure(self, instance: str, latency_seconds: float):
+        """Record a failed request (error, timeout or bad status) to an instance"""
+        alpha = self.settings["ewma_alpha"]
+        latency_ms = latency_seconds * 1000
+
+        with self.lock:
+            health = self._get(instance)
+            # Failures still tell us how long the instance made us wait
+            if health.ewma_latency_ms is None:
+                health.ewma_latency_ms = latency_ms
+            else:
+                health.ewma_latency_ms = alpha * latency_ms + (1 - alpha) * health.ewma_latency_ms
+            health.error_rate = alpha + (1 - alpha) * health.error_rate
+            health.last_failure = datetime.now(timezone.utc).isoformat()
+            health.consecutive_failures += 1
+            health.total_requests += 1
+
+            if health.circuit_state == OPEN:
+                # A failed half-open probe re-opens the circuit with a longer cooldown;
+                # failures from requests that started before it opened change nothing
+                if not self._is_cooling_down(health):
+                    self._open_circuit(health)
+            elif health.consecutive_failures >= self.settings["failure_threshold"]:
+                self._open_circuit(health)
+
+    def _open_circuit(self, health: InstanceHealth):
+        health.circuit_state = OPEN
+        health.circuit_opened_at = health.last_failure
+        health.times_opened += 1
+        logger.warning(f"Circuit opened for {health.instance} after "
+                       f"{health.consecutive_failures} consecutive failures "
+                       f"(retry in {self._cooldown_seconds(health):.0f}s)")
+
+    def flush(self):
+        """Persist in-memory health to the database"""
+        with self.lock:
+            rows = [asdict(health) for health in self.health.values()]
+
+        if not rows:
+            return
+
+        with self.storage.writer() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO instance_health
+                (instance, ewma_latency_ms, error_rate, last_success, last_failure,
+                 consecutive_failures, circuit_state, circuit_opened_at, times_opened, total_requests)
+                VALUES (:instance, :ewma_latency_ms, :error_rate, :last_success, :last_failure,
+                        :consecutive_failures, :circuit_state, :circuit_opened_at, :times_opened, :total_requests)
+            ''', rows)
@@ -0,0 +1,227 @@
+"""
+Log Pipeline
+Queued logging off the hot path: a rotating log file, sampled chatty lines, and a ring of recent records
+"""
+
+import os
+import json
+import queue
+import atexit
+import ctypes
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import MONITORING_CONFIG, LOGS_DIR
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class LogRing:
+    """
+    The most recent records, as JSON in fixed-size slots of shared memory.
+    The listener appends to it; any process forked after it was created,
+    like the dashboard under start_monitoring.py, can read it.
+    """
+
+    def __init__(self, capacity: int, slot_bytes: int):
+        self.capacity = capacity
+        self.slot_bytes = slot_bytes
+        self.data = multiprocessing.RawArray(ctypes.c_char, capacity * slot_bytes)
+        self.lengths = multiprocessing.RawArray(ctypes.c_int32, capacity)
+        # Records written, dropped on a full queue, and left out by sampling, across all processes
+        self.counts = multiprocessing.RawArray(ctypes.c_int64, 3)
+        self.lock = multiprocessing.Lock()
+
+    def _encode(self, entry: Dict[str, Any]) -> bytes:
+        data = json.dumps(entry).encode('ascii')
+        while len(data) > self.slot_bytes:
+            # Shorten the message by the overflow; escapes can make that fall short, so repeat
+            message = entry['message']
+            entry = {**entry, 'message': message[:max(0, len(message) - (len(data) - self.slot_bytes) - 3)] + '...'}
+            data = json.dumps(entry).encode('ascii')
+        return data
+
+    def append(self, entry: Dict[str, Any]):
+        data = self._encode(entry)
+        with self.lock:
+            slot = self.counts[0] % self.capacity
+            offset = slot * self.slot_bytes
+            self.data[offset:offset + len(data)] = data
+            self.lengths[slot] = len(data)
+            self.counts[0] += 1
+
+    def count(self, index: int, amount: int = 1):
+        with self.lock:
+            self.counts[index] += amount
+
+    def records(self, after: int = 0, min_level: int = logging.NOTSET, limit: int = 200) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Records numbered above `after` at `min_level` or higher, oldest
+        first and at most `limit` of the newest, with the number of the last
+        record written to pass as `after` next time
+        """
+        with self.lock:
+            written = self.counts[0]
+            raw = []
+            for seq in range(max(after, written - self.capacity), written):
+                offset = (seq % self.capacity) * self.slot_bytes
+                raw.append((seq + 1, self.data[offset:offset + self.lengths[seq % self.capacity]]))
+        records = []
+        for seq, data in raw:
+            entry = json.loads(data)
+            if entry['levelno'] >= min_level:
+                records.append({'seq': seq, **entry})
+        return records[-limit:] if limit else records, written
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'written': self.counts[0], 'dropped': self.counts[1], 'sampled_out': self.counts[2]}
+
+class RingHandler(logging.Handler):
+    """Appends each record the listener hands it to a LogRing"""
+
+    def __init__(self, ring: LogRing):
+        super().__init__()
+        self.ring = ring
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.ring.append({
+                'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                'level': record.levelname,
+                'levelno': record.levelno,
+                'logger': record.name,
+                'message': record.getMessage()
+            })
+        except Exception:
+            self.handleError(record)
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes the first `burst` records from each logging call at the sampled
+    levels in every window, then one in `every`. Other levels always pass.
+    """
+
+    def __init__(self, settings: Dict[str, Any], ring: Optional[LogRing] = None):
+        super().__init__()
+        self.levels = {logging.getLevelName(level) for level in settings["levels"]}
+        self.burst = settings["burst"]
+        self.every = settings["every"]
+        self.window_seconds = settings["window_seconds"]
+        self.ring = ring
+        self.lock = threading.Lock()
+        self.sites: Dict[Tuple[str, int], List] = {}  # (logger, line) -> [window start, records in window]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno not in self.levels:
+            return True
+        key = (record.name, record.lineno)
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or record.created - site[0] >= self.window_seconds:
+                site = self.sites[key] = [record.created, 0]
+            site[1] += 1
+            seen = site[1]
+        if seen <= self.burst or (seen - self.burst) % self.every == 0:
+            return True
+        if self.ring is not None:
+            self.ring.count(2)
+        return False
+
+class DroppingQueueHandler(QueueHandler):
+    """A QueueHandler that drops records when the queue is full instead of blocking or raising"""
+
+    def __init__(self, log_queue, ring: Optional[LogRing] = None):
+        super().__init__(log_queue)
+        self.ring = ring
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.ring is not None:
+                self.ring.count(1)
+
+class DrainingQueueListener(QueueListener):
+    """A QueueListener whose stop waits for room behind a full queue, so queued records are still written"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+class LogPipeline:
+    """
+    Every logging call only formats its record and puts it on a bounded
+    queue; one listener thread writes the file and the console and fills
+    the ring. The queue is a multiprocessing one, so forked processes log
+    through the same listener and file.
+    """
+
+    def __init__(self, log_file: str, level: str, settings: Dict[str, Any]):
+        self.settings = settings
+        self.ring = LogRing(settings["ring_size"], settings["ring_slot_bytes"])
+        self.queue = multiprocessing.Queue(settings["queue_size"])
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        self.handlers: List[logging.Handler] = [RingHandler(self.ring), logging.StreamHandler()]
+        if log_file:
+            self.handlers.append(RotatingFileHandler(log_file, maxBytes=settings["max_bytes"],
+                                                     backupCount=settings["backup_count"], encoding='utf-8'))
+        for handler in self.handlers:
+            handler.setFormatter(formatter)
+
+        self.queue_handler = DroppingQueueHandler(self.queue, self.ring)
+        self.queue_handler.addFilter(SamplingFilter(settings["sampling"], self.ring))
+        self.listener = DrainingQueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.owner_pid = os.getpid()
+        self.level = getattr(logging, level)
+
+    def start(self):
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(self.level)
+        self.listener.start()
+
+    def stop(self):
+        """Write out what is queued and stop the listener; only the process that started it can"""
+        if os.getpid() != self.owner_pid or self.listener._thread is None:
+            return
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.ring.stats(), 'queued': self.queue.qsize()}
+
+_pipeline: Optional[LogPipeline] = None
+
+def setup_logging(log_file: Optional[str] = f"{LOGS_DIR}/monitor.log", level: Optional[str] = None,
+                  settings: Optional[Dict[str, Any]] = None) -> LogPipeline:
+    """
+    Route the root logger through the log pipeline. Only the first call in
+    a process sets it up; later ones return the same pipeline.
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline(log_file, level or MONITORING_CONFIG["log_level"],
+                                settings or MONITORING_CONFIG["logging"])
+        _pipeline.start()
+        atexit.register(_pipeline.stop)
+    return _pipeline
+
+def get_pipeline() -> Optional[LogPipeline]:
+    """This process's log pipeline, set up here or inherited through a fork; None if logging isn't routed through one"""
+    return _pipeline
+
+def _after_fork_in_child():
+    # The child logs through the parent's listener; only its sampling lock needs replacing,
+    # in case a parent thread held it at the fork
+    if _pipeline is not None:
+        for log_filter in _pipeline.queue_handler.filters:
+            log_filter.lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,233 @@
+"""
+Monitoring Metrics
+Fixed-bucket latency histograms and counters for each stage, rendered in the Prometheus text format
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from config import MONITORING_CONFIG
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Help text for every metric; anything observed must be listed here
+METRIC_HELP = {
+    'monitoring_fetch_seconds': "Time to a Nitter instance's response headers, by instance and outcome",
+    'monitoring_parse_seconds': "Time to parse a timeline page; streamed pages include reading the body",
+    'monitoring_source_seconds': "Time for a scrape source to answer for one account",
+    'monitoring_store_seconds': "Time to store one batch of posts",
+    'monitoring_cycle_seconds': "Time for a whole monitoring cycle",
+    'monitoring_analyzer_query_seconds': "Time for one analyzer database read, by query",
+    'monitoring_analyzer_compute_seconds': "Time to check one account's activity against its schedule",
+    'monitoring_report_seconds': "Time to generate a compliance report",
+    'monitoring_report_write_seconds': "Time to write a compliance report to disk",
+    'monitoring_http_request_seconds': "Time to serve a dashboard request, by path",
+    'monitoring_posts_stored_total': "Posts passed to storage, by whether they were inserted, updated or unchanged",
+    'monitoring_http_requests_total': "Dashboard requests served, by path and status",
+    'monitoring_report_cache_total': "Reports requested from the report cache, by whether they were in memory, on disk or computed",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Observation counts per bucket (not cumulative; the last bucket is +Inf), and their sum"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class MetricsRegistry:
+    """
+    The process's histograms and counters, keyed by name and labels. Each
+    observation is a bisect and two additions under one lock, cheap enough
+    to leave on; with metrics disabled, timers do nothing at all.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or MONITORING_CONFIG["metrics"]
+        self.bounds = sorted(self.settings["latency_buckets_seconds"])
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+            self.counters: Dict[Tuple[str, LabelKey], float] = {}
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        if not self.settings["enabled"]:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.bounds)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        if not self.settings["enabled"]:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[Dict[str, str]]:
+        """
+        Time the block into histogram `name`. The block may add labels to
+        the yielded dict, e.g. an outcome known only at the end.
+        """
+        if not self.settings["enabled"]:
+            yield labels
+            return
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every series so far, as JSON-serializable data"""
+        with self.lock:
+            return {
+                'bounds': list(self.bounds),
+                'histograms': [{'name': name, 'labels': dict(labels), 'counts': list(histogram.counts),
+                                'sum': histogram.sum}
+                               for (name, labels), histogram in self.histograms.items()],
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in self.counters.items()]
+            }
+
+    def since(self, earlier: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Per-series totals for what was observed after the `earlier`
+        snapshot: count, total and an upper bound on the 95th percentile
+        for histograms, the increase for counters
+        """
+        def key(series: Dict[str, Any]) -> str:
+            return series['name'] + ''.join(f",{label}={value}" for label, value in sorted(series['labels'].items()))
+
+        before = {key(series): series for series in earlier['histograms']}
+        current = self.snapshot()
+        timings = {}
+        for series in current['histograms']:
+            old = before.get(key(series))
+            counts = [count - (old['counts'][i] if old else 0) for i, count in enumerate(series['counts'])]
+            observed = sum(counts)
+            if not observed:
+                continue
+            seen, rank = 0, observed * 0.95
+            for i, count in enumerate(counts):
+                seen += count
+                if seen >= rank:
+                    break
+            timings[key(series)] = {
+                'count': observed,
+                'total_seconds': round(series['sum'] - (old['sum'] if old else 0.0), 6),
+                'p95_seconds': current['bounds'][i] if i < len(current['bounds']) else None  # None: past the last bucket
+            }
+
+        before = {key(series): series['value'] for series in earlier['counters']}
+        counters = {key(series): series['value'] - before.get(key(series), 0) for series in current['counters']}
+        return {'timings': timings, 'counters': {name: value for name, value in counters.items() if value}}
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{label}="{value}"' for label, value in zip(labels, escaped)) + '}'
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def render_prometheus(snapshots: Dict[str, Dict[str, Any]]) -> str:
+    """
+    The Prometheus text exposition of one or more processes' snapshots,
+    each series labelled with the process it came from
+    """
+    families: Dict[str, List[str]] = {}
+    kinds: Dict[str, str] = {}
+    for process, snapshot in snapshots.items():
+        bounds = [_format_number(bound) for bound in snapshot['bounds']] + ['+Inf']
+        for series in snapshot['histograms']:
+            name, labels = series['name'], {'process': process, **series['labels']}
+            kinds[name] = 'histogram'
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(bounds, series['counts']):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(series['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for series in snapshot['counters']:
+            name = series['name']
+            kinds[name] = 'counter'
+            families.setdefault(name, []).append(
+                f"{name}{_format_labels({'process': process, **series['labels']})} {_format_number(series['value'])}")
+
+    output = []
+    for name in sorted(families):
+        output.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+        output.append(f"# TYPE {name} {kinds[name]}")
+        output.extend(families[name])
+    return '\n'.join(output) + '\n'
+
+class MetricsStore:
+    """
+    Each process's latest snapshot, kept in the monitoring database so the
+    dashboard can serve the scraper's metrics alongside its own
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        self.setup_table()
+
+    def setup_table(self):
+        """Create the snapshot table if needed"""
+        with self.storage.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_snapshots (
+                    process TEXT PRIMARY KEY,
+                    snapshot TEXT NOT NULL,  -- JSON from MetricsRegistry.snapshot(); totals since the process started
+                    updated_at DATETIME
+                )
+            ''')
+
+    def save(self, process: str, snapshot: Dict[str, Any]):
+        with self.storage.writer() as conn:
+            conn.execute('INSERT OR REPLACE INTO metrics_snapshots (process, snapshot, updated_at) VALUES (?, ?, ?)',
+                         (process, json.dumps({**snapshot, 'pid': os.getpid()}),
+                          datetime.now(timezone.utc).isoformat()))
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Other processes' snapshots; this process's own registry is always more current"""
+        with self.storage.reader() as conn:
+            rows = conn.execute('SELECT process, snapshot FROM metrics_snapshots').fetchall()
+        snapshots = {process: json.loads(snapshot) for process, snapshot in rows}
+        return {process: snapshot for process, snapshot in snapshots.items() if snapshot.get('pid') != os.getpid()}
+
+# The process's registry; every module records into this one
+METRICS = MetricsRegistry()
+
+def _after_fork_in_child():
+    # A forked child, like the dashboard under start_monitoring.py, reports only
+    # its own series; the parent's are served from its saved snapshot. The lock
+    # is replaced in case a parent thread held it at the fork.
+    METRICS.lock = threading.Lock()
+    METRICS.reset()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
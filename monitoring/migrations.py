@@ -0,0 +1,419 @@
+"""
+Schema Migrations
+Versioned, in-place upgrades of twitter_monitoring.db, tracked with PRAGMA user_version
+"""
+
+import json
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+def to_epoch(timestamp: Union[str, datetime, int]) -> int:
+    """Unix epoch seconds for an ISO timestamp or datetime; naive values are taken as UTC"""
+    if isinstance(timestamp, int):
+        return timestamp
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+ENGAGEMENT_COLUMNS = ('likes', 'retweets', 'replies', 'quotes')
+
+def engagement_counts(metrics: Union[str, Dict[str, Any], None]) -> Tuple[int, int, int, int]:
+    """(likes, retweets, replies, quotes) from a metrics dict, or the JSON string older scrapers produced"""
+    if isinstance(metrics, str):
+        metrics = json.loads(metrics) if metrics else {}
+    metrics = metrics or {}
+    return tuple(int(metrics.get(column) or 0) for column in ENGAGEMENT_COLUMNS)
+
+def _baseline(conn: sqlite3.Connection):
+    """The schema as it was before migrations existed; a no-op on older databases"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            content TEXT,
+            timestamp DATETIME NOT NULL,
+            post_type TEXT,  -- 'original', 'reply', 'retweet', 'quote'
+            reply_to TEXT,
+            metrics TEXT,  -- JSON string with likes, retweets, etc.
+            scraped_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(id, username)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS monitoring_sessions (
+            session_id TEXT PRIMARY KEY,
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            ended_at DATETIME,
+            accounts_checked TEXT,  -- JSON array
+            posts_found INTEGER DEFAULT 0,
+            errors TEXT,  -- JSON array of any errors
+            stats TEXT  -- JSON object of per-cycle statistics
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS account_watermarks (
+            username TEXT PRIMARY KEY,
+            last_post_id INTEGER NOT NULL,  -- Newest in-order post id stored so far
+            last_timestamp DATETIME,
+            updated_at DATETIME
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            username TEXT PRIMARY KEY,
+            target_date DATETIME NOT NULL,
+            cursor TEXT,  -- Nitter cursor to resume from, NULL for the first page
+            oldest_timestamp DATETIME,
+            pages_fetched INTEGER DEFAULT 0,
+            posts_stored INTEGER DEFAULT 0,
+            completed INTEGER DEFAULT 0,  -- Reached target_date or the end of the timeline
+            exhausted INTEGER DEFAULT 0,  -- No older pages exist
+            updated_at DATETIME
+        )
+    ''')
+
+    # Databases created before session stats existed
+    session_columns = [row[1] for row in conn.execute("PRAGMA table_info(monitoring_sessions)")]
+    if 'stats' not in session_columns:
+        conn.execute("ALTER TABLE monitoring_sessions ADD COLUMN stats TEXT")
+
+def _epoch_posts(conn: sqlite3.Connection):
+    """
+    Rebuild posts with integer epoch timestamps, derived hour/weekday columns
+    and an index that covers the analyzer's per-account range queries
+    """
+    conn.execute('''
+        CREATE TABLE posts_new (
+            id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            content TEXT,
+            timestamp INTEGER NOT NULL,  -- Unix epoch seconds, UTC
+            post_type TEXT,  -- 'original', 'reply', 'retweet', 'quote'
+            reply_to TEXT,
+            metrics TEXT,  -- JSON string with likes, retweets, etc.
+            scraped_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            hour_utc INTEGER GENERATED ALWAYS AS ((timestamp % 86400) / 3600) VIRTUAL,
+            weekday INTEGER GENERATED ALWAYS AS ((timestamp / 86400 + 3) % 7) VIRTUAL  -- Monday is 0
+        )
+    ''')
+
+    # strftime('%s') understands the ISO offsets the scrapers wrote; rows it
+    # cannot read fall back to when they were scraped rather than being lost
+    conn.execute('''
+        INSERT INTO posts_new (id, username, content, timestamp, post_type, reply_to, metrics, scraped_at)
+        SELECT id, username, content,
+               COALESCE(CAST(strftime('%s', timestamp) AS INTEGER),
+                        CAST(strftime('%s', scraped_at) AS INTEGER), 0),
+               post_type, reply_to, metrics,
+               CAST(strftime('%s', scraped_at) AS INTEGER)
+        FROM posts
+        ORDER BY rowid
+    ''')
+    conn.execute('DROP TABLE posts')
+    conn.execute('ALTER TABLE posts_new RENAME TO posts')
+
+    conn.execute('''
+        CREATE INDEX idx_posts_username_timestamp
+        ON posts (username, timestamp, post_type, hour_utc, weekday)
+    ''')
+    conn.execute('CREATE INDEX idx_sessions_started_at ON monitoring_sessions (started_at)')
+
+def _rollups(conn: sqlite3.Connection):
+    """Hourly and daily post aggregates, filled from the posts already stored"""
+    for table, bucket in (('post_rollups_hourly', 'hour_start'), ('post_rollups_daily', 'day_start')):
+        conn.execute(f'''
+            CREATE TABLE {table} (
+                username TEXT NOT NULL,
+                {bucket} INTEGER NOT NULL,  -- Epoch seconds, UTC
+                total_posts INTEGER NOT NULL,
+                original_posts INTEGER NOT NULL,
+                reply_posts INTEGER NOT NULL,
+                retweet_posts INTEGER NOT NULL,
+                quote_posts INTEGER NOT NULL,
+                first_original INTEGER,  -- Timestamps of the earliest and latest original post
+                last_original INTEGER,
+                likes INTEGER NOT NULL,  -- Engagement summed over the bucket's posts
+                retweets INTEGER NOT NULL,
+                replies INTEGER NOT NULL,
+                quotes INTEGER NOT NULL,
+                PRIMARY KEY (username, {bucket})
+            ) WITHOUT ROWID
+        ''')
+
+    conn.execute('''
+        INSERT INTO post_rollups_hourly
+        SELECT username, timestamp / 3600 * 3600, COUNT(*),
+               SUM(post_type = 'original'), SUM(post_type = 'reply'),
+               SUM(post_type = 'retweet'), SUM(post_type = 'quote'),
+               MIN(CASE WHEN post_type = 'original' THEN timestamp END),
+               MAX(CASE WHEN post_type = 'original' THEN timestamp END),
+               COALESCE(SUM(json_extract(metrics, '$.likes')), 0),
+               COALESCE(SUM(json_extract(metrics, '$.retweets')), 0),
+               COALESCE(SUM(json_extract(metrics, '$.replies')), 0),
+               COALESCE(SUM(json_extract(metrics, '$.quotes')), 0)
+        FROM posts
+        GROUP BY username, timestamp / 3600 * 3600
+    ''')
+    conn.execute('''
+        INSERT INTO post_rollups_daily
+        SELECT username, hour_start / 86400 * 86400, SUM(total_posts),
+               SUM(original_posts), SUM(reply_posts), SUM(retweet_posts), SUM(quote_posts),
+               MIN(first_original), MAX(last_original),
+               SUM(likes), SUM(retweets), SUM(replies), SUM(quotes)
+        FROM post_rollups_hourly
+        GROUP BY username, hour_start / 86400 * 86400
+    ''')
+
+def _engagement_columns(conn: sqlite3.Connection):
+    """
+    Move engagement out of the metrics JSON into integer columns, and keep
+    every change to them in post_metrics_history as deltas per scrape
+    """
+    for column in ENGAGEMENT_COLUMNS:
+        conn.execute(f'ALTER TABLE posts ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+    conn.execute('''
+        UPDATE posts SET
+            likes = COALESCE(json_extract(metrics, '$.likes'), 0),
+            retweets = COALESCE(json_extract(metrics, '$.retweets'), 0),
+            replies = COALESCE(json_extract(metrics, '$.replies'), 0),
+            quotes = COALESCE(json_extract(metrics, '$.quotes'), 0)
+        WHERE json_valid(metrics)
+    ''')
+    conn.execute('ALTER TABLE posts DROP COLUMN metrics')
+
+    conn.execute('''
+        CREATE TABLE post_metrics_history (
+            post_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            scraped_at INTEGER NOT NULL,  -- Epoch seconds of the scrape that saw the change
+            likes INTEGER NOT NULL,  -- Change since the post's previous snapshot; the first one holds the full counts
+            retweets INTEGER NOT NULL,
+            replies INTEGER NOT NULL,
+            quotes INTEGER NOT NULL,
+            PRIMARY KEY (post_id, scraped_at)
+        ) WITHOUT ROWID
+    ''')
+    # By hour, so per-account engagement by hour groups straight off the index
+    conn.execute('CREATE INDEX idx_metrics_history_username_hour ON post_metrics_history (username, scraped_at / 3600)')
+    conn.execute('''
+        INSERT INTO post_metrics_history
+        SELECT id, username, COALESCE(scraped_at, timestamp), likes, retweets, replies, quotes
+        FROM posts
+        WHERE likes OR retweets OR replies OR quotes
+    ''')
+
+    # Snapshots are written by triggers, so every path that stores posts keeps the history.
+    # Two changes to one post within the same second fold into one snapshot.
+    conn.execute('''
+        CREATE TRIGGER posts_metrics_inserted AFTER INSERT ON posts
+        WHEN NEW.likes OR NEW.retweets OR NEW.replies OR NEW.quotes
+        BEGIN
+            INSERT INTO post_metrics_history
+            VALUES (NEW.id, NEW.username, NEW.scraped_at, NEW.likes, NEW.retweets, NEW.replies, NEW.quotes)
+            ON CONFLICT (post_id, scraped_at) DO UPDATE SET
+                likes = likes + excluded.likes, retweets = retweets + excluded.retweets,
+                replies = replies + excluded.replies, quotes = quotes + excluded.quotes;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER posts_metrics_updated AFTER UPDATE OF likes, retweets, replies, quotes ON posts
+        WHEN OLD.likes IS NOT NEW.likes OR OLD.retweets IS NOT NEW.retweets
+          OR OLD.replies IS NOT NEW.replies OR OLD.quotes IS NOT NEW.quotes
+        BEGIN
+            INSERT INTO post_metrics_history
+            VALUES (NEW.id, NEW.username, NEW.scraped_at, NEW.likes - OLD.likes, NEW.retweets - OLD.retweets,
+                    NEW.replies - OLD.replies, NEW.quotes - OLD.quotes)
+            ON CONFLICT (post_id, scraped_at) DO UPDATE SET
+                likes = likes + excluded.likes, retweets = retweets + excluded.retweets,
+                replies = replies + excluded.replies, quotes = quotes + excluded.quotes;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER posts_metrics_deleted AFTER DELETE ON posts
+        BEGIN
+            DELETE FROM post_metrics_history WHERE post_id = OLD.id;
+        END
+    ''')
+
+def _compliance_history(conn: sqlite3.Connection):
+    """Compliance results per account and window, written by ScheduleAnalyzer.sweep_compliance"""
+    conn.execute('''
+        CREATE TABLE compliance_history (
+            username TEXT NOT NULL,
+            window_hours INTEGER NOT NULL,
+            window_end INTEGER NOT NULL,  -- Epoch seconds, UTC; the window is the window_hours before it
+            compliance_score REAL NOT NULL,
+            posts_found INTEGER NOT NULL,
+            original_posts INTEGER NOT NULL,
+            reply_posts INTEGER NOT NULL,
+            active_hours_compliance REAL,  -- NULL without original posts
+            average_interval_minutes REAL,  -- NULL with fewer than two
+            issues TEXT NOT NULL,  -- JSON list
+            checks TEXT NOT NULL,  -- JSON: results of the account's own schedule checks
+            swept_at INTEGER NOT NULL,
+            PRIMARY KEY (username, window_hours, window_end)
+        ) WITHOUT ROWID
+    ''')
+
+def _ingest_sequence(conn: sqlite3.Connection):
+    """
+    Number posts in the order they were stored. Readers that pick up newly
+    stored posts key on ingest_seq: rowids can be renumbered by VACUUM and
+    handed out again once the newest rows are deleted, but the counter in
+    `sequences` only goes up.
+    """
+    conn.execute('''
+        CREATE TABLE sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL  -- The last number handed out
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('ALTER TABLE posts ADD COLUMN ingest_seq INTEGER')
+    # Existing rowids are still in storage order, so state saved against them stays valid
+    conn.execute('UPDATE posts SET ingest_seq = rowid')
+    conn.execute("INSERT INTO sequences VALUES ('post_ingest', (SELECT COALESCE(MAX(ingest_seq), 0) FROM posts))")
+    conn.execute('CREATE INDEX idx_posts_ingest_seq ON posts (ingest_seq)')
+    # Upserts that update an existing post keep its number
+    conn.execute('''
+        CREATE TRIGGER posts_ingest_seq AFTER INSERT ON posts
+        BEGIN
+            UPDATE sequences SET value = value + 1 WHERE name = 'post_ingest';
+            UPDATE posts SET ingest_seq = (SELECT value FROM sequences WHERE name = 'post_ingest')
+            WHERE rowid = NEW.rowid;
+        END
+    ''')
+
+def _data_version(conn: sqlite3.Connection):
+    """
+    A counter bumped by every write to what reports are computed from:
+    posts (and with them the rollups, written in the same transactions) and
+    compliance_history. Inserts, engagement updates, retention deletes and
+    sweeps all move it, from any process.
+    """
+    conn.execute("INSERT INTO sequences VALUES ('data_version', 0)")
+    # Setting ingest_seq on a new post is part of its insert, not another change
+    posts_columns = 'id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes'
+    for table, update in (('posts', f'UPDATE OF {posts_columns}'), ('compliance_history', 'UPDATE')):
+        for event in ('INSERT', update, 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER {table}_{event.split()[0].lower()}_data_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE sequences SET value = value + 1 WHERE name = 'data_version';
+                END
+            ''')
+
+def last_ingest_seq(conn: sqlite3.Connection) -> int:
+    """The ingest_seq of the last post stored; every post stored later gets a higher one"""
+    return conn.execute("SELECT value FROM sequences WHERE name = 'post_ingest'").fetchone()[0]
+
+# (version, description, upgrade); append new migrations, never edit released ones
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "epoch timestamps, hour/weekday columns and range indexes on posts", _epoch_posts),
+    (3, "hourly and daily post rollups", _rollups),
+    (4, "typed engagement columns and delta-encoded metrics history", _engagement_columns),
+    (5, "materialized compliance history", _compliance_history),
+    (6, "monotonic ingest sequence on posts", _ingest_sequence),
+    (7, "data version counter for cached reports", _data_version),
+]
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(storage: Storage) -> int:
+    """
+    Bring the database up to the latest schema version. Each migration runs
+    in its own transaction together with the version bump, so a failed
+    upgrade leaves the database at the previous version.
+    """
+    if storage.schema_version == MIGRATIONS[-1][0]:
+        return storage.schema_version
+
+    with storage.writer() as conn:
+        version = schema_version(conn)
+        for target, description, upgrade in MIGRATIONS:
+            if target <= version:
+                continue
+            logger.info(f"Migrating {storage.db_path} to schema version {target}: {description}")
+            conn.execute('BEGIN')
+            try:
+                upgrade(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"Migration {target} failed; database left at version {version}")
+                raise
+            version = target
+
+    storage.schema_version = version
+    return version
+
+def _plan_problems(plan: List[str]) -> List[str]:
+    """Steps that read a whole table or sort outside an index"""
+    # Scanning a CTE's own rows reads no table
+    ctes = {detail.split()[1] for detail in plan if detail.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    problems = []
+    for detail in plan:
+        if detail.startswith('SCAN ') and 'USING' not in detail and detail != 'SCAN CONSTANT ROW' \
+                and detail.split()[1] not in ctes:
+            problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+    return problems
+
+def check_query_plans(storage: Storage) -> List[Tuple[str, List[str], List[str]]]:
+    """
+    EXPLAIN QUERY PLAN every analyzer, dashboard and retention query against
+    the migrated schema. Returns (name, plan, problems) for each query.
+    """
+    # Imported here: these modules import storage, and the scraper imports us
+    from analyzer import QUERIES as ANALYZER_QUERIES
+    from dashboard import QUERIES as DASHBOARD_QUERIES
+    from retention import QUERIES as RETENTION_QUERIES
+
+    migrate(storage)
+    results = []
+    with storage.reader() as conn:
+        for name, (sql, params) in {**ANALYZER_QUERIES, **DASHBOARD_QUERIES, **RETENTION_QUERIES}.items():
+            plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            results.append((name, plan, _plan_problems(plan)))
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from config import DATA_DIR
+    from storage import get_storage
+
+    parser = argparse.ArgumentParser(description='Migrate the monitoring database and check query plans')
+    parser.add_argument('--db', default=f"{DATA_DIR}/twitter_monitoring.db", help='Database file')
+    parser.add_argument('--check-plans', action='store_true',
+                        help='Fail if any analyzer, dashboard or retention query scans a whole table')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    storage = get_storage(args.db)
+    print(f"🗄️  Schema version {migrate(storage)} ({args.db})")
+
+    if args.check_plans:
+        failures = 0
+        for name, plan, problems in check_query_plans(storage):
+            print(f"{'❌' if problems else '✅'} {name}: {' | '.join(plan)}")
+            failures += bool(problems)
+        sys.exit(1 if failures else 0)
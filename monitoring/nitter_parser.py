@@ -0,0 +1,266 @@
+"""
+Nitter Timeline Parser
+Event-driven parser for Nitter timeline pages that stops at the lookback cutoff
+"""
+
+import re
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+STATUS_ID_PATTERN = re.compile(r'/status/(\d+)')
+# The separator between date and time varies ('·' or mis-decoded bytes), so match around it
+DATE_TITLE_PATTERN = re.compile(r'([A-Z][a-z]{2}) (\d{1,2}), (\d{4})\D+(\d{1,2}:\d{2}) ([AP]M)')
+STAT_ICONS = {
+    'icon-comment': 'replies',
+    'icon-retweet': 'retweets',
+    'icon-quote': 'quotes',
+    'icon-heart': 'likes'
+}
+
+@dataclass
+class TimelinePage:
+    posts: List[Dict[str, Any]] = field(default_factory=list)
+    cursor: Optional[str] = None  # "Load more" cursor, None when not reached or absent
+    stopped_early: bool = False  # True when parsing stopped at the cutoff
+    items_seen: int = 0
+    timeline_found: bool = False  # False for error, captcha or rate-limit pages
+
+def parse_nitter_date(title: str) -> Optional[datetime]:
+    """Parse a tweet-date title such as 'Jun 12, 2025 · 9:13 AM UTC'"""
+    match = DATE_TITLE_PATTERN.search(title)
+    if not match:
+        return None
+    try:
+        parsed = datetime.strptime(' '.join(match.groups()), '%b %d %Y %I:%M %p')
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc)
+
+def _classes(attrs) -> List[str]:
+    for name, value in attrs:
+        if name == 'class' and value:
+            return value.split()
+    return []
+
+class NitterTimelineParser(HTMLParser):
+    """
+    Extracts timeline items as the page streams in. Only the current item is
+    held in memory, and feeding can stop as soon as `done` is set.
+    """
+
+    def __init__(self, username: str, cutoff_time: datetime, since_id: Optional[int] = None,
+                 refresh_after: Optional[datetime] = None):
+        super().__init__(convert_charrefs=True)
+        self.username = username
+        self.cutoff_time = cutoff_time
+        self.since_id = since_id
+        self.refresh_after = refresh_after
+        self.page = TimelinePage()
+        self.done = False
+
+        self.div_depth = 0
+        self.item = None
+        self.item_depth = None
+        self.quote_depth = None
+        self.content_depth = None
+        self.replying_depth = None
+        self.stats_depth = None
+        self.show_more_depth = None
+        self.in_date = False
+        self.current_stat = None
+
+    def _new_item(self) -> Dict[str, Any]:
+        return {
+            'id': None,
+            'timestamp': None,
+            'content': [],
+            'pinned': False,
+            'retweet': False,
+            'quote': False,
+            'reply_to': None,
+            'metrics': {}
+        }
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+
+        classes = _classes(attrs)
+
+        if tag == 'div':
+            self.div_depth += 1
+
+            if 'timeline' in classes:
+                self.page.timeline_found = True
+            if 'show-more' in classes and self.item is None:
+                # "Load more" at the bottom carries the cursor; "Load newest" at the top does not
+                self.show_more_depth = self.div_depth
+                return
+            if 'timeline-item' in classes:
+                self.item = self._new_item()
+                self.item_depth = self.div_depth
+                return
+            if self.item is None:
+                return
+
+            if self.quote_depth is not None:
+                return  # Ignore everything inside an embedded quoted tweet
+            if 'quote' in classes:
+                self.item['quote'] = True
+                self.quote_depth = self.div_depth
+            elif 'pinned' in classes:
+                self.item['pinned'] = True
+            elif 'retweet-header' in classes:
+                self.item['retweet'] = True
+            elif 'replying-to' in classes:
+                self.replying_depth = self.div_depth
+            elif 'tweet-content' in classes:
+                self.content_depth = self.div_depth
+            elif 'tweet-stats' in classes:
+                self.stats_depth = self.div_depth
+            return
+
+        if self.show_more_depth is not None and tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if 'cursor=' in href:
+                self.page.cursor = href.split('cursor=', 1)[1].split('&', 1)[0]
+            return
+
+        if self.item is None or self.quote_depth is not None:
+            return
+
+        if tag == 'a':
+            attr_map = dict(attrs)
+            if 'tweet-link' in classes and self.item['id'] is None:
+                match = STATUS_ID_PATTERN.search(attr_map.get('href') or '')
+                if match:
+                    self.item['id'] = match.group(1)
+            elif self.in_date:
+                self.item['timestamp'] = parse_nitter_date(attr_map.get('title') or '')
+                if self.item['id'] is None:
+                    match = STATUS_ID_PATTERN.search(attr_map.get('href') or '')
+                    if match:
+                        self.item['id'] = match.group(1)
+            elif self.replying_depth is not None and self.item['reply_to'] is None:
+                self.item['reply_to'] = (attr_map.get('href') or '').strip('/').split('/')[0] or None
+        elif tag == 'span':
+            if 'tweet-date' in classes:
+                self.in_date = True
+            elif self.stats_depth is not None:
+                for css_class in classes:
+                    if css_class in STAT_ICONS:
+                        self.current_stat = STAT_ICONS[css_class]
+        elif tag == 'br' and self.content_depth is not None:
+            self.item['content'].append('\n')
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+
+        if tag == 'span':
+            self.in_date = False
+            return
+        if tag != 'div':
+            return
+
+        depth = self.div_depth
+        self.div_depth -= 1
+
+        if self.show_more_depth == depth:
+            self.show_more_depth = None
+        elif self.quote_depth == depth:
+            self.quote_depth = None
+        elif self.content_depth == depth:
+            self.content_depth = None
+        elif self.replying_depth == depth:
+            self.replying_depth = None
+        elif self.stats_depth == depth:
+            self.stats_depth = None
+            self.current_stat = None
+        elif self.item_depth == depth:
+            self._finish_item()
+
+    def handle_data(self, data):
+        if self.done or self.item is None or self.quote_depth is not None:
+            return
+
+        if self.content_depth is not None:
+            self.item['content'].append(data)
+        elif self.current_stat is not None:
+            digits = data.strip().replace(',', '')
+            if digits:
+                self.item['metrics'][self.current_stat] = int(digits) if digits.isdigit() else 0
+                self.current_stat = None
+
+    def _finish_item(self):
+        item = self.item
+        self.item = None
+        self.item_depth = None
+        self.page.items_seen += 1
+
+        if item['id'] is None or item['timestamp'] is None:
+            logger.debug("Skipping timeline item without id or date")
+            return
+
+        # Pinned tweets and retweets are out of order (a retweet shows the original
+        # tweet's id and date); anything else this old means the rest of the page is older too
+        in_order = not item['pinned'] and not item['retweet']
+        # Stored posts newer than refresh_after are read again for their engagement counts
+        already_seen = (self.since_id is not None and not item['retweet']
+                        and int(item['id']) <= self.since_id
+                        and (self.refresh_after is None or item['timestamp'] < self.refresh_after))
+
+        if item['timestamp'] < self.cutoff_time or already_seen:
+            if in_order:
+                self.page.stopped_early = True
+                self.done = True
+            return
+
+        if item['retweet']:
+            post_type = 'retweet'
+        elif item['reply_to']:
+            post_type = 'reply'
+        elif item['quote']:
+            post_type = 'quote'
+        else:
+            post_type = 'original'
+
+        metrics = {stat: item['metrics'].get(stat, 0) for stat in ('likes', 'retweets', 'replies', 'quotes')}
+
+        self.page.posts.append({
+            'id': item['id'],
+            'username': self.username,
+            'content': ''.join(item['content']).strip(),
+            'timestamp': item['timestamp'].isoformat(),
+            'post_type': post_type,
+            'reply_to': item['reply_to'],
+            'metrics': metrics
+        })
+
+def parse_timeline(chunks: Iterable[str], username: str, cutoff_time: datetime,
+                   since_id: Optional[int] = None,
+                   refresh_after: Optional[datetime] = None) -> TimelinePage:
+    """
+    Parse a timeline page from an iterable of text chunks, stopping as soon as
+    a post older than `cutoff_time`, or with an id at or below `since_id` and
+    older than `refresh_after`, is reached. Unread chunks are never consumed.
+    """
+    parser = NitterTimelineParser(username, cutoff_time, since_id, refresh_after)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    if not parser.done:
+        parser.close()
+    return parser.page
+
+def parse_timeline_html(html: str, username: str, cutoff_time: datetime,
+                        since_id: Optional[int] = None,
+                        refresh_after: Optional[datetime] = None) -> TimelinePage:
+    """Parse a timeline page that is already in memory"""
+    return parse_timeline([html], username, cutoff_time, since_id, refresh_after)
@@ -0,0 +1,183 @@
+"""
+Parse Pipeline
+Timeline pages parsed in a process pool and stored by a single batching writer, with bounded stages between
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional
+
+from nitter_parser import TimelinePage, parse_timeline_html
+
+logger = logging.getLogger(__name__)
+
+class StageGauge:
+    """How full one pipeline stage is, sampled each time an item enters it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.depth = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.items = 0
+            self.depth_total = 0
+            self.max_depth = 0
+            self.blocked_seconds = 0.0
+
+    def entered(self, waited: float):
+        """An item got in after waiting `waited` seconds for room"""
+        with self.lock:
+            self.depth += 1
+            self.items += 1
+            self.depth_total += self.depth
+            self.max_depth = max(self.max_depth, self.depth)
+            self.blocked_seconds += waited
+
+    def left(self):
+        with self.lock:
+            self.depth -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'items': self.items,
+                'max_depth': self.max_depth,
+                'mean_depth': round(self.depth_total / self.items, 2) if self.items else 0.0,
+                'blocked_seconds': round(self.blocked_seconds, 3)  # Time producers waited for room
+            }
+
+class ParsePool:
+    """
+    Parses timeline pages in worker processes, off the fetch threads and
+    the GIL. At most `max_pending` pages are queued or being parsed; a
+    fetcher with a page beyond that waits for a slot, so fetching slows to
+    the pace of parsing.
+    """
+
+    def __init__(self, workers: int = 0, max_pending: int = 0, start_method: str = "spawn"):
+        self.workers = workers or os.cpu_count() or 1
+        self.context = multiprocessing.get_context(start_method)
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        self.gauge = StageGauge()
+        self.lock = threading.Lock()
+        self.executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self.context)
+
+    def parse(self, html: str, username: str, cutoff_time: datetime,
+              since_id: Optional[int] = None, refresh_after: Optional[datetime] = None) -> TimelinePage:
+        """parse_timeline_html in a worker process, waiting for a slot first"""
+        started = time.monotonic()
+        self.slots.acquire()
+        self.gauge.entered(time.monotonic() - started)
+        try:
+            executor = self.executor
+            try:
+                return executor.submit(parse_timeline_html, html, username, cutoff_time, since_id,
+                                       refresh_after).result()
+            except BrokenProcessPool:
+                # A crashed worker takes the pool with it; parsing here keeps the page from
+                # being blamed on the instance that served it
+                logger.error(f"Parse pool broke while parsing {username}'s timeline; restarting it")
+                with self.lock:
+                    if self.executor is executor:
+                        self.executor = self._new_executor()
+                return parse_timeline_html(html, username, cutoff_time, since_id, refresh_after)
+        finally:
+            self.gauge.left()
+            self.slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Marks the end of the writer's queue
+_CLOSE = object()
+
+class BatchWriter:
+    """
+    The one thread that stores posts during a pipelined cycle. Fetchers
+    hand it each account's posts through a bounded queue, and wait when it
+    is full; it stores them in batches of up to `batch_posts` posts, and
+    never holds a partial batch longer than `max_delay_seconds`.
+    """
+
+    def __init__(self, store: Callable[[List[Dict[str, Any]]], Any], batch_posts: int = 2000,
+                 max_delay_seconds: float = 0.5, queue_size: int = 64):
+        self.store = store
+        self.batch_posts = batch_posts
+        self.max_delay_seconds = max_delay_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.gauge = StageGauge()
+        self.batches = 0
+        self.dropped = 0
+        self.errors: List[str] = []
+        self.closed = False
+        # Held from the closed check to the enqueue, so nothing can be queued behind _CLOSE
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="post-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, posts: List[Dict[str, Any]]):
+        with self.lock:
+            if self.closed:
+                # A fetch that outlived its cycle; the next cycle will find these posts again
+                logger.warning(f"Dropping {len(posts)} posts that arrived after the writer closed")
+                self.dropped += len(posts)
+                return
+            # The writer thread keeps draining while we wait here, so close() only waits this long too
+            started = time.monotonic()
+            self.queue.put(posts)
+            self.gauge.entered(time.monotonic() - started)
+
+    def _run(self):
+        batch = []
+        flush_at = None
+        while True:
+            timeout = max(0.0, flush_at - time.monotonic()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # The partial batch has waited long enough
+            if item is _CLOSE:
+                self._flush(batch)
+                return
+            if item is not None:
+                self.gauge.left()
+                if not batch:
+                    flush_at = time.monotonic() + self.max_delay_seconds
+                batch.extend(item)
+            if batch and (item is None or len(batch) >= self.batch_posts):
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        try:
+            self.store(batch)
+            self.batches += 1
+        except Exception as e:
+            error_msg = f"Failed to store {len(batch)} posts: {e}"
+            logger.error(error_msg)
+            self.errors.append(error_msg)
+
+    def close(self) -> List[str]:
+        """Store whatever is still queued, stop the thread and return any storage errors"""
+        with self.lock:
+            self.closed = True
+            self.queue.put(_CLOSE)
+        self.thread.join()
+        return self.errors
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.gauge.stats(), 'batches': self.batches, 'dropped_posts': self.dropped}
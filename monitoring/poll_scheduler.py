@@ -0,0 +1,88 @@
+"""
+Poll Scheduler
+Decides when each account is polled next, from its active hours and recent posts
+"""
+
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
+
+from accounts import AccountConfig
+from config import MONITORING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+def next_poll_at(config: AccountConfig, now: float, last_post_at: Optional[float] = None,
+                 settings: Optional[Dict] = None) -> float:
+    """
+    Epoch seconds of an account's next poll after one finishing at `now`.
+    Inside its active hours an account is polled every check interval, except
+    right after a post, when the next one is not due for min_interval_minutes.
+    Outside them it is polled every idle interval, or at the start of its next
+    active hour if that comes sooner. An account that posted within the last
+    idle interval is polled densely whatever the hour, so off-schedule bursts
+    are picked up as they happen.
+    """
+    settings = settings or MONITORING_CONFIG["poll_scheduling"]
+    dense = MONITORING_CONFIG["check_interval_minutes"] * 60
+    if not settings["enabled"]:
+        return now + dense
+    idle = settings["idle_interval_minutes"] * 60
+
+    if config.is_active_hour(datetime.fromtimestamp(now, timezone.utc).hour):
+        due = now + dense
+        if last_post_at is not None:
+            next_expected = last_post_at + config.min_interval_minutes * 60
+            due = max(due, min(next_expected, now + idle))
+        return due
+
+    if last_post_at is not None and now - last_post_at < idle:
+        return now + dense
+
+    hour_start = now - now % 3600
+    for hours_ahead in range(1, 25):
+        window_start = hour_start + hours_ahead * 3600
+        if window_start >= now + idle:
+            break
+        if config.is_active_hour(datetime.fromtimestamp(window_start, timezone.utc).hour):
+            return window_start
+    return now + idle
+
+class PollScheduler:
+    """
+    Min-heap of (due_at, account_key), one entry per account. Every account
+    is due at start-up; after each poll the caller reschedules it.
+    """
+
+    def __init__(self, accounts: Dict[str, AccountConfig], now: float,
+                 settings: Optional[Dict] = None):
+        self.accounts = accounts
+        self.settings = settings or MONITORING_CONFIG["poll_scheduling"]
+        self.heap: List[Tuple[float, str]] = [(now, key) for key in accounts]
+        heapq.heapify(self.heap)
+
+    def pop_due(self, now: float) -> List[str]:
+        """Remove and return every account due at `now`, earliest first"""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, key = heapq.heappop(self.heap)
+            if key in self.accounts:  # Accounts dropped from the registry fall out here
+                due.append(key)
+        return due
+
+    def reschedule(self, key: str, now: float, last_post_at: Optional[float] = None) -> float:
+        due_at = next_poll_at(self.accounts[key], now, last_post_at, self.settings)
+        heapq.heappush(self.heap, (due_at, key))
+        return due_at
+
+    def retry(self, key: str, now: float) -> float:
+        """Put an account back after a failed poll, without waiting a full interval"""
+        due_at = now + self.settings["retry_delay_seconds"]
+        heapq.heappush(self.heap, (due_at, key))
+        return due_at
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - now)
@@ -0,0 +1,157 @@
+"""
+Request Rate Limiter
+Token buckets per scrape target host, shared through the monitoring database
+"""
+
+import time
+import threading
+import logging
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from config import MONITORING_CONFIG
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+class RateLimited(Exception):
+    """A host's budget would not allow a request within the caller's wait limit"""
+
+    def __init__(self, host: str, wait_seconds: float):
+        super().__init__(f"{host} is rate limited for another {wait_seconds:.0f}s")
+        self.host = host
+        self.wait_seconds = wait_seconds
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header: either delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - (now or time.time()))
+
+class RateLimiter:
+    """
+    One token bucket per host, kept in the monitoring database so the
+    scraper's threads, a backfill run and any other process using the same
+    database draw from the same budget. Each take is a single conditional
+    UPDATE, which SQLite applies atomically across processes.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        self.settings = MONITORING_CONFIG["rate_limits"]
+        self.known_hosts = set()
+        self.lock = threading.Lock()
+        self.setup_table()
+
+    def setup_table(self):
+        """Create the rate limit table if needed"""
+        with self.storage.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    host TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,  -- Epoch seconds of the last refill
+                    blocked_until REAL NOT NULL DEFAULT 0  -- Set from 429/Retry-After responses
+                )
+            ''')
+
+    def limits_for(self, host: str) -> Dict[str, float]:
+        """Requests per minute and burst size for a host, falling back to the defaults"""
+        return {**self.settings["default"], **self.settings["hosts"].get(host, {})}
+
+    def _ensure_host(self, host: str, burst: float):
+        with self.lock:
+            if host in self.known_hosts:
+                return
+            self.known_hosts.add(host)
+        with self.storage.writer() as conn:
+            conn.execute('INSERT OR IGNORE INTO rate_limits (host, tokens, updated_at) VALUES (?, ?, ?)',
+                         (host, burst, time.time()))
+
+    def _try_take(self, host: str, rate: float, burst: float) -> float:
+        """Take a token if one is available; otherwise return how long until one is"""
+        now = time.time()
+        with self.storage.writer() as conn:
+            taken = conn.execute('''
+                UPDATE rate_limits
+                SET tokens = MIN(:burst, tokens + (:now - updated_at) * :rate) - 1,
+                    updated_at = :now
+                WHERE host = :host AND blocked_until <= :now
+                  AND MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1
+            ''', {'host': host, 'now': now, 'rate': rate, 'burst': burst}).rowcount
+            if taken:
+                return 0.0
+            tokens, updated_at, blocked_until = conn.execute(
+                'SELECT tokens, updated_at, blocked_until FROM rate_limits WHERE host = ?', (host,)
+            ).fetchone()
+        available = min(burst, tokens + (now - updated_at) * rate)
+        return max(blocked_until - now, (1 - available) / rate, 0.001)
+
+    def acquire(self, url: str, max_wait: Optional[float] = None,
+                cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Block until the URL's host may be sent another request and return
+        True. Raises RateLimited instead when that is further off than
+        `max_wait` seconds, and returns False, without a token, if
+        `cancel_event` is set while waiting.
+        """
+        host = urlsplit(url).netloc
+        limits = self.limits_for(host)
+        rate = limits["requests_per_minute"] / 60
+        burst = limits["burst"]
+        max_wait = self.settings["max_wait_seconds"] if max_wait is None else max_wait
+        self._ensure_host(host, burst)
+
+        waited = 0.0
+        while True:
+            wait = self._try_take(host, rate, burst)
+            if not wait:
+                if waited:
+                    logger.debug(f"Waited {waited:.2f}s for the {host} rate limit")
+                return True
+            if waited + wait > max_wait:
+                raise RateLimited(host, wait)
+            if cancel_event:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+            waited += wait
+
+    def throttled(self, url: str, response) -> bool:
+        """
+        Whether a response asks us to slow down: any 429, or a 503 with
+        Retry-After. If so the host is blocked for the time it asked for.
+        """
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if response.status_code == 429:
+            self.block(url, self.settings["default_retry_after_seconds"] if retry_after is None else retry_after)
+            return True
+        if response.status_code == 503 and retry_after is not None:
+            self.block(url, retry_after)
+            return True
+        return False
+
+    def block(self, url: str, seconds: float):
+        """Hold off every request to the URL's host for `seconds`, e.g. after a 429"""
+        host = urlsplit(url).netloc
+        self._ensure_host(host, self.limits_for(host)["burst"])
+        now = time.time()
+        with self.storage.writer() as conn:
+            conn.execute('''
+                UPDATE rate_limits SET tokens = 0, updated_at = ?, blocked_until = MAX(blocked_until, ?)
+                WHERE host = ?
+            ''', (now, now + seconds, host))
+        logger.warning(f"{host} asked us to back off; pausing requests to it for {seconds:.0f}s")
@@ -0,0 +1,134 @@
+"""
+Report Cache
+Compliance reports memoized on the data they were computed from, in memory and optionally on disk
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from config import MONITORING_CONFIG
+from storage import get_storage
+from migrations import migrate
+from metrics import METRICS
+from analyzer import ScheduleAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Bumped by triggers on every write to posts and compliance_history (migration 7)
+DATA_VERSION_SQL = "SELECT value FROM sequences WHERE name = 'data_version'"
+
+class ReportCache:
+    """
+    Reports keyed on (hours_back, data version), least recently used
+    evicted past max_entries. A report is reused until the data version
+    changes or it is max_age_seconds old, since its window moves on even
+    when no new posts arrive.
+
+    With `persist`, the first report computed for each data version is
+    written to reports/ and listed in the report_files table. Other
+    processes, like a CLI run, load it while it is young instead of
+    recomputing, and no version is written twice. Cached reports are
+    shared; callers must not modify them.
+    """
+
+    def __init__(self, db_path: str, settings: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        migrate(self.storage)
+        self.settings = settings or MONITORING_CONFIG["report_cache"]
+        self.lock = threading.Lock()
+        self.reports: OrderedDict = OrderedDict()  # (hours_back, version) -> (report, computed at)
+        self.setup_table()
+
+    def setup_table(self):
+        """Create the report file table if needed"""
+        with self.storage.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_files (
+                    hours_back INTEGER NOT NULL,
+                    data_version TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    generated_at INTEGER NOT NULL,  -- Unix epoch seconds
+                    PRIMARY KEY (hours_back, data_version)
+                )
+            ''')
+
+    def data_version(self) -> str:
+        with self.storage.reader() as conn:
+            return str(conn.execute(DATA_VERSION_SQL).fetchone()[0])
+
+    def get(self, hours_back: int = 24) -> Dict[str, Any]:
+        """The report over the last `hours_back` hours, computed only if the data changed or it got too old"""
+        key = (hours_back, self.data_version())
+        now = time.time()
+        with self.lock:
+            entry = self.reports.get(key)
+            if entry is not None and now - entry[1] < self.settings["max_age_seconds"]:
+                self.reports.move_to_end(key)
+                METRICS.inc('monitoring_report_cache_total', outcome='hit')
+                return entry[0]
+
+        report, computed_at, saved = self._load(key, now) if self.settings["persist"] else (None, now, True)
+        if report is not None:
+            METRICS.inc('monitoring_report_cache_total', outcome='file')
+        else:
+            report, computed_at = self._compute(key, save=not saved), now
+            METRICS.inc('monitoring_report_cache_total', outcome='miss')
+
+        with self.lock:
+            self.reports[key] = (report, computed_at)
+            self.reports.move_to_end(key)
+            while len(self.reports) > self.settings["max_entries"]:
+                self.reports.popitem(last=False)
+        return report
+
+    def _load(self, key: Tuple[int, str], now: float) -> Tuple[Optional[Dict[str, Any]], float, bool]:
+        """
+        The report saved for the same data, if it is young enough, with
+        whether a readable copy is on disk at all
+        """
+        with self.storage.reader() as conn:
+            row = conn.execute('SELECT path, generated_at FROM report_files WHERE hours_back = ? AND data_version = ?',
+                               key).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None, now, False
+        if now - row[1] >= self.settings["max_age_seconds"]:
+            return None, now, True
+        try:
+            with open(row[0]) as f:
+                return json.load(f), row[1], True
+        except (OSError, ValueError) as e:
+            logger.info(f"Saved report {row[0]} is unreadable ({e}); recomputing")
+            return None, now, False
+
+    def _compute(self, key: Tuple[int, str], save: bool) -> Dict[str, Any]:
+        """Generate the report, saving it only if no copy for the same data is on disk"""
+        hours_back, version = key
+        analyzer = ScheduleAnalyzer(self.db_path)
+        report = analyzer.generate_report(hours_back, save=False)
+        report['data_version'] = version
+        if save:
+            path = analyzer.save_report(report)
+            with self.storage.writer() as conn:
+                conn.execute('INSERT OR REPLACE INTO report_files (hours_back, data_version, path, generated_at) '
+                             'VALUES (?, ?, ?, ?)', (hours_back, version, path,
+                                                     int(datetime.now(timezone.utc).timestamp())))
+        return report
+
+_registry: Dict[Tuple[str, int], ReportCache] = {}
+_registry_lock = threading.Lock()
+
+def get_report_cache(db_path: str) -> ReportCache:
+    """The shared ReportCache for a database file, created on first use in each process"""
+    key = (os.path.abspath(db_path), os.getpid())
+    with _registry_lock:
+        cache = _registry.get(key)
+        if cache is None:
+            cache = _registry[key] = ReportCache(db_path)
+        return cache
@@ -0,0 +1,165 @@
+"""
+Retention and Rollups
+Hourly/daily post aggregates, and the job that drops raw rows past the retention window
+"""
+
+import sqlite3
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import MONITORING_CONFIG
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+
+HOURLY_ROLLUP_SQL = '''
+    INSERT INTO post_rollups_hourly
+    (username, hour_start, total_posts, original_posts, reply_posts, retweet_posts, quote_posts,
+     first_original, last_original, likes, retweets, replies, quotes)
+    SELECT username, timestamp / 3600 * 3600, COUNT(*),
+           SUM(post_type = 'original'), SUM(post_type = 'reply'),
+           SUM(post_type = 'retweet'), SUM(post_type = 'quote'),
+           MIN(CASE WHEN post_type = 'original' THEN timestamp END),
+           MAX(CASE WHEN post_type = 'original' THEN timestamp END),
+           SUM(likes), SUM(retweets), SUM(replies), SUM(quotes)
+    FROM posts
+    WHERE username = ? AND timestamp >= ? AND timestamp < ?
+    GROUP BY username, timestamp / 3600 * 3600
+'''
+
+DAILY_ROLLUP_SQL = '''
+    INSERT INTO post_rollups_daily
+    (username, day_start, total_posts, original_posts, reply_posts, retweet_posts, quote_posts,
+     first_original, last_original, likes, retweets, replies, quotes)
+    SELECT username, hour_start / 86400 * 86400, SUM(total_posts),
+           SUM(original_posts), SUM(reply_posts), SUM(retweet_posts), SUM(quote_posts),
+           MIN(first_original), MAX(last_original),
+           SUM(likes), SUM(retweets), SUM(replies), SUM(quotes)
+    FROM post_rollups_hourly
+    WHERE username = ? AND hour_start >= ? AND hour_start < ?
+    GROUP BY username, hour_start / 86400 * 86400
+'''
+
+# For hours whose raw posts retention may have deleted: the posts still stored replace the
+# rollup only if there are at least as many of them as it counts, i.e. none were deleted
+PURGED_HOURLY_ROLLUP_SQL = HOURLY_ROLLUP_SQL + '''
+    ON CONFLICT (username, hour_start) DO UPDATE SET
+        total_posts = excluded.total_posts, original_posts = excluded.original_posts,
+        reply_posts = excluded.reply_posts, retweet_posts = excluded.retweet_posts,
+        quote_posts = excluded.quote_posts, first_original = excluded.first_original,
+        last_original = excluded.last_original, likes = excluded.likes, retweets = excluded.retweets,
+        replies = excluded.replies, quotes = excluded.quotes
+    WHERE excluded.total_posts >= post_rollups_hourly.total_posts
+'''
+
+# Accounts with stored posts, one index seek each: retention deletes each account's old
+# posts off idx_posts_username_timestamp, which a cutoff on timestamp alone can't use
+ACCOUNTS_SQL = '''
+    WITH RECURSIVE accounts (username) AS (
+        SELECT MIN(username) FROM posts
+        UNION ALL
+        SELECT (SELECT MIN(username) FROM posts WHERE username > accounts.username)
+        FROM accounts WHERE username IS NOT NULL
+    )
+    SELECT username FROM accounts WHERE username IS NOT NULL
+'''
+DELETE_POSTS_SQL = 'DELETE FROM posts WHERE username = ? AND timestamp < ?'
+DELETE_SESSIONS_SQL = 'DELETE FROM monitoring_sessions WHERE started_at < ?'
+
+# Every query the retention job runs, with sample parameters for query plan checks
+QUERIES = {
+    'retention_accounts': (ACCOUNTS_SQL, ()),
+    'retention_delete_posts': (DELETE_POSTS_SQL, ('LadyMacbethAI', 0)),
+    'retention_delete_sessions': (DELETE_SESSIONS_SQL, ('1970-01-01 00:00:00',)),
+}
+
+def retention_cutoff(retention_days: Optional[int] = None) -> datetime:
+    """
+    Where the retention window starts. It is cut on a day boundary, so no
+    hour or day is left half-rolled-up and half-raw.
+    """
+    retention_days = retention_days or MONITORING_CONFIG["data_retention_days"]
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) \
+        - timedelta(days=retention_days)
+
+def refresh_rollups(conn: sqlite3.Connection, buckets: Iterable[Tuple[str, int]]):
+    """
+    Recompute the hourly and daily rollups holding these (username, epoch
+    timestamp) pairs from the posts table, inside the caller's transaction.
+
+    Hours before the retention cutoff may have had their posts deleted
+    while their rollups were kept. A backfill, archive import or late post
+    in such an hour recomputes it only if the posts stored cover at least
+    the count the rollup already holds. Otherwise the rollup is kept as it
+    is: a post new to a purged hour goes uncounted rather than the hour
+    losing its deleted posts. Daily rollups are summed from hourly ones,
+    which are never deleted, so they are always recomputed.
+    """
+    cutoff = int(retention_cutoff().timestamp())
+    hours = {(username, timestamp // HOUR * HOUR) for username, timestamp in buckets}
+    days = {(username, hour_start // DAY * DAY) for username, hour_start in hours}
+    recent = [(username, start) for username, start in hours if start >= cutoff]
+    purged = [(username, start, start + HOUR) for username, start in hours if start < cutoff]
+
+    conn.executemany('DELETE FROM post_rollups_hourly WHERE username = ? AND hour_start = ?', recent)
+    conn.executemany(HOURLY_ROLLUP_SQL, [(username, start, start + HOUR) for username, start in recent])
+    conn.executemany(PURGED_HOURLY_ROLLUP_SQL, purged)
+    conn.executemany('DELETE FROM post_rollups_daily WHERE username = ? AND day_start = ?', days)
+    conn.executemany(DAILY_ROLLUP_SQL, [(username, start, start + DAY) for username, start in days])
+
+def enforce_retention(storage: Storage, retention_days: Optional[int] = None) -> Dict[str, int]:
+    """
+    Delete raw posts, with their metrics history, and monitoring sessions
+    older than the retention window, then hand the freed pages back to the
+    filesystem. Rollups are kept, so long-window reports still cover the
+    deleted posts.
+    """
+    retention_days = retention_days or MONITORING_CONFIG["data_retention_days"]
+    cutoff = retention_cutoff(retention_days)
+
+    with storage.writer() as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Databases created before incremental vacuum need one full VACUUM to switch modes
+            logger.info(f"Enabling incremental vacuum on {storage.db_path}")
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+
+    with storage.writer() as conn:
+        usernames = [row[0] for row in conn.execute(ACCOUNTS_SQL)]
+        posts_deleted = sum(conn.execute(DELETE_POSTS_SQL, (username, int(cutoff.timestamp()))).rowcount
+                            for username in usernames)
+        # started_at is written by CURRENT_TIMESTAMP, so compare in the same format
+        sessions_deleted = conn.execute(DELETE_SESSIONS_SQL, (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)).rowcount
+
+    with storage.writer() as conn:
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute('PRAGMA incremental_vacuum').fetchall()
+
+    result = {'posts_deleted': posts_deleted, 'sessions_deleted': sessions_deleted, 'pages_freed': free_pages}
+    logger.info(f"Retention ({retention_days} days): deleted {posts_deleted} posts and "
+                f"{sessions_deleted} sessions, freed {free_pages} pages")
+    return result
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import DATA_DIR
+    from storage import get_storage
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description='Enforce data retention on the monitoring database')
+    parser.add_argument('--db', default=f"{DATA_DIR}/twitter_monitoring.db", help='Database file')
+    parser.add_argument('--days', type=int, default=None,
+                        help=f"Retention in days (default: {MONITORING_CONFIG['data_retention_days']})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    storage = get_storage(args.db)
+    migrate(storage)
+    result = enforce_retention(storage, args.days)
+    print(f"🧹 Deleted {result['posts_deleted']} posts and {result['sessions_deleted']} sessions, "
+          f"freed {result['pages_freed']} pages")
@@ -0,0 +1,233 @@
+"""
+Rolling Activity Windows
+Each account's post counts over the standard report window, updated from newly stored posts
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from config import MONITORING_CONFIG
+from migrations import migrate, from_epoch, last_ingest_seq
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Posts stored since the last refresh, off idx_posts_ingest_seq
+NEW_POSTS_SQL = '''
+    SELECT ingest_seq, id, username, timestamp, post_type
+    FROM posts
+    WHERE ingest_seq > ?
+    ORDER BY ingest_seq
+'''
+
+# One account's posts in the window, off idx_posts_username_timestamp
+ACCOUNT_POSTS_SQL = '''
+    SELECT id, timestamp, post_type
+    FROM posts
+    WHERE username = ? AND timestamp > ?
+'''
+
+def _decrement(counter: Counter, key: Any):
+    counter[key] -= 1
+    if not counter[key]:
+        del counter[key]
+
+class AccountWindow:
+    """
+    One account's posts in the window, oldest first, with the counts the
+    schedule checks read kept up to date as posts come and go
+    """
+
+    def __init__(self):
+        self.posts: Dict[str, Tuple[int, str]] = {}  # post id -> (timestamp, post type)
+        self.order: List[Tuple[int, str]] = []  # (timestamp, post id), sorted
+        self.originals: List[Tuple[int, str]] = []  # The same, originals only
+        self.types = Counter()
+        self.posts_by_hour = Counter()
+        self.originals_by_hour = Counter()
+
+    def add(self, post_id: str, timestamp: int, post_type: str):
+        """Count a post; a post already counted is replaced"""
+        if self.posts.get(post_id) == (timestamp, post_type):
+            return
+        if post_id in self.posts:
+            self.remove(post_id)
+        self.posts[post_id] = (timestamp, post_type)
+        bisect.insort(self.order, (timestamp, post_id))
+        hour = timestamp % 86400 // 3600
+        self.types[post_type] += 1
+        self.posts_by_hour[hour] += 1
+        if post_type == 'original':
+            bisect.insort(self.originals, (timestamp, post_id))
+            self.originals_by_hour[hour] += 1
+
+    def remove(self, post_id: str):
+        timestamp, post_type = self.posts.pop(post_id)
+        del self.order[bisect.bisect_left(self.order, (timestamp, post_id))]
+        hour = timestamp % 86400 // 3600
+        _decrement(self.types, post_type)
+        _decrement(self.posts_by_hour, hour)
+        if post_type == 'original':
+            del self.originals[bisect.bisect_left(self.originals, (timestamp, post_id))]
+            _decrement(self.originals_by_hour, hour)
+
+    def expire(self, cutoff: int):
+        """Drop posts from at or before `cutoff`"""
+        while self.order and self.order[0][0] <= cutoff:
+            self.remove(self.order[0][1])
+
+    def activity(self) -> Dict[str, Any]:
+        """The counts in the shape ScheduleAnalyzer's checks read"""
+        return {
+            'posts_found': len(self.posts),
+            'original_posts': len(self.originals),
+            'reply_posts': self.types['reply'],
+            'posts_by_hour': Counter(self.posts_by_hour),
+            'originals_by_hour': Counter(self.originals_by_hour),
+            'first_original': from_epoch(self.originals[0][0]) if self.originals else None,
+            'last_original': from_epoch(self.originals[-1][0]) if self.originals else None,
+            # The window is one day at most, so it is checked as a whole against the daily limit
+            'daily_originals': len(self.originals)
+        }
+
+class RollingWindows:
+    """
+    The last `hours` of activity for every account asked about, kept in
+    memory. Each refresh reads only the posts stored since the previous
+    one, by ingest_seq, and posts leave an account's window as it is read, so
+    keeping up costs O(new posts) rather than a query over the window.
+
+    The scraper saves the windows to the activity_windows table every
+    save_interval_seconds and on shutdown; other processes start from the
+    saved copy, topped up with posts stored after it. Rows updated in place
+    keep their ingest_seq, so a post whose type changes is only recounted
+    when its account's window is rebuilt; scrapes don't change a post's type.
+    """
+
+    def __init__(self, db_path: str, settings: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        migrate(self.storage)
+        self.settings = settings or MONITORING_CONFIG["rolling_window"]
+        self.hours = self.settings["hours"]
+        self.lock = threading.Lock()
+        self.windows: Dict[str, AccountWindow] = {}
+        self.setup_table()
+        self._load()
+
+    def setup_table(self):
+        """Create the window table if needed"""
+        with self.storage.writer() as conn:
+            # Windows saved against rowids, before ingest_seq; they are rebuilt from posts
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(activity_windows)")]
+            if 'max_rowid' in columns:
+                conn.execute('DROP TABLE activity_windows')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS activity_windows (
+                    window_hours INTEGER PRIMARY KEY,
+                    max_ingest_seq INTEGER NOT NULL,  -- posts.ingest_seq covered when the windows were saved
+                    windows TEXT NOT NULL,  -- JSON: username -> [[post id, timestamp, post type], ...]
+                    updated_at DATETIME
+                )
+            ''')
+
+    def _load(self):
+        with self.storage.reader() as conn:
+            saved = conn.execute('SELECT max_ingest_seq, windows FROM activity_windows WHERE window_hours = ?',
+                                 (self.hours,)).fetchone()
+            if saved is None:
+                # Accounts are built from their own posts when first asked about
+                self.max_ingest_seq = last_ingest_seq(conn)
+        if saved is not None:
+            self.max_ingest_seq = saved[0]
+            for username, posts in json.loads(saved[1]).items():
+                window = self.windows[username] = AccountWindow()
+                for post in posts:
+                    window.add(*post)
+        added = self.refresh()
+        logger.info(f"Rolling {self.hours}h windows loaded: {len(self.windows)} accounts, "
+                    f"{added} posts stored since last save")
+        self.saved_at = datetime.now(timezone.utc)
+
+    def _cutoff(self, now: Optional[float] = None) -> int:
+        return int(time.time() if now is None else now) - self.hours * 3600
+
+    def _build(self, username: str, cutoff: int) -> AccountWindow:
+        window = AccountWindow()
+        with self.storage.reader() as conn:
+            for post in conn.execute(ACCOUNT_POSTS_SQL, (username, cutoff)):
+                window.add(*post)
+        return window
+
+    def track(self, usernames: Iterable[str]):
+        """Keep windows for these accounts from now on, building any not loaded"""
+        cutoff = self._cutoff()
+        with self.lock:
+            for username in usernames:
+                if username not in self.windows:
+                    self.windows[username] = self._build(username, cutoff)
+
+    def refresh(self) -> int:
+        """Count posts stored since the last refresh into their accounts' windows; returns how many were read"""
+        cutoff = self._cutoff()
+        with self.lock:
+            with self.storage.reader() as conn:
+                rows = conn.execute(NEW_POSTS_SQL, (self.max_ingest_seq,)).fetchall()
+            for ingest_seq, post_id, username, timestamp, post_type in rows:
+                window = self.windows.get(username)
+                if window is not None and timestamp > cutoff:
+                    window.add(post_id, timestamp, post_type)
+            if rows:
+                self.max_ingest_seq = rows[-1][0]
+        return len(rows)
+
+    def activity(self, username: str) -> Dict[str, Any]:
+        """An account's activity over the window ending now"""
+        self.refresh()
+        cutoff = self._cutoff()
+        with self.lock:
+            window = self.windows.get(username)
+            if window is None:
+                window = self.windows[username] = self._build(username, cutoff)
+            window.expire(cutoff)
+            return window.activity()
+
+    def maybe_save(self):
+        """Save the windows if save_interval_seconds have passed since they were last saved"""
+        if (datetime.now(timezone.utc) - self.saved_at).total_seconds() >= self.settings["save_interval_seconds"]:
+            self.save()
+
+    def save(self):
+        cutoff = self._cutoff()
+        with self.lock:
+            windows = {}
+            for username, window in self.windows.items():
+                window.expire(cutoff)
+                windows[username] = [[post_id, timestamp, post_type]
+                                     for post_id, (timestamp, post_type) in window.posts.items()]
+            max_ingest_seq = self.max_ingest_seq
+        with self.storage.writer() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO activity_windows (window_hours, max_ingest_seq, windows, updated_at)
+                VALUES (?, ?, ?, ?)
+            ''', (self.hours, max_ingest_seq, json.dumps(windows), datetime.now(timezone.utc).isoformat()))
+        self.saved_at = datetime.now(timezone.utc)
+
+_registry: Dict[Tuple[str, int], RollingWindows] = {}
+_registry_lock = threading.Lock()
+
+def get_windows(db_path: str) -> RollingWindows:
+    """The shared RollingWindows for a database file, loaded on first use in each process"""
+    key = (os.path.abspath(db_path), os.getpid())
+    with _registry_lock:
+        windows = _registry.get(key)
+        if windows is None:
+            windows = _registry[key] = RollingWindows(db_path)
+        return windows
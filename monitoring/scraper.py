@@ -3,138 +3,242 @@ Twitter Post Scraper - Free web scraping approach
 Monitors posting schedules for AI agents without interfering with their operation
 """
 
+import asyncio
 import requests
 import json
 import time
 import sqlite3
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Any
 import logging
-from dataclasses import asdict
-import re
 from urllib.parse import quote
 
 from config import ACCOUNTS, MONITORING_CONFIG, DATA_DIR, LOGS_DIR
+from instance_router import InstanceRouter
+from nitter_parser import TimelinePage, parse_timeline, parse_timeline_html
+from parse_pipeline import ParsePool, BatchWriter
+from fetch_cache import ValidatorCache, timeline_body_hash
+from storage import get_storage
+from migrations import migrate, to_epoch, engagement_counts
+from poll_scheduler import PollScheduler
+from rate_limiter import RateLimiter, RateLimited
+from retention import refresh_rollups, enforce_retention
+from seen_filter import SeenPosts
+from rolling_windows import get_windows
+from analyzer import ScheduleAnalyzer
+from metrics import METRICS, MetricsStore
+from log_pipeline import setup_logging
+from workload import recent_posts
 
-# Setup logging
-logging.basicConfig(
-    level=getattr(logging, MONITORING_CONFIG["log_level"]),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f"{LOGS_DIR}/monitor.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class TwitterScraper:
-    def __init__(self):
-        self.db_path = f"{DATA_DIR}/twitter_monitoring.db"
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or f"{DATA_DIR}/twitter_monitoring.db"
+        self.storage = get_storage(self.db_path)
         self.setup_database()
+        self.router = InstanceRouter(self.db_path)
+        self.validators = ValidatorCache(self.db_path)
+        self.rate_limiter = RateLimiter(self.db_path)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
+        # Concurrent cycles share this session, so size its pool to match
+        pool_size = max(10, MONITORING_CONFIG["max_concurrent_accounts"])
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Real sources in preference order; synthetic data is only used when all of them come up empty
+        self.sources = [
+            ("nitter", self.scrape_nitter_posts),
+            ("search", self.scrape_via_search)
+        ]
+        hedging = MONITORING_CONFIG["hedging"]
+        self.source_latencies = defaultdict(lambda: deque(maxlen=hedging["latency_window"]))
+        self.hedge_executor = ThreadPoolExecutor(
+            max_workers=MONITORING_CONFIG["max_concurrent_accounts"] * len(self.sources),
+            thread_name_prefix="hedge"
+        )
+        self.stats_lock = threading.Lock()
+        self.cycle_stats = self._new_cycle_stats()
+        self.watermarks = self._load_watermarks()
+        self.seen = SeenPosts(self.db_path, [config.username for config in ACCOUNTS.values()])
+        self.windows = get_windows(self.db_path)
+        self.windows.track(config.username for config in ACCOUNTS.values())
+        self.metrics_store = MetricsStore(self.db_path)
+        self.analyzer = ScheduleAnalyzer(self.db_path)  # For the compliance sweep after each retention run
+        self.last_retention_run = 0.0
+        self.parse_pool = None  # Started by the first pipelined cycle
     
     def setup_database(self):
         """Initialize SQLite database for storing post data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                id TEXT PRIMARY KEY,
-                username TEXT NOT NULL,
-                content TEXT,
-                timestamp DATETIME NOT NULL,
-                post_type TEXT,  -- 'original', 'reply', 'retweet', 'quote'
-                reply_to TEXT,
-                metrics TEXT,  -- JSON string with likes, retweets, etc.
-                scraped_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(id, username)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS monitoring_sessions (
-                session_id TEXT PRIMARY KEY,
-                started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                ended_at DATETIME,
-                accounts_checked TEXT,  -- JSON array
-                posts_found INTEGER DEFAULT 0,
-                errors TEXT  -- JSON array of any errors
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        migrate(self.storage)
         logger.info("Database setup completed")
     
-    def scrape_nitter_posts(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
+    def scrape_nitter_posts(self, username: str, hours_back: int = 24,
+                            cancel_event: Optional[threading.Event] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Scrape posts using Nitter (privacy-focused Twitter frontend)
-        Falls back to multiple Nitter instances if needed
+        Falls back to multiple Nitter instances if needed, fastest healthy ones first.
+        Returns None when no instance served a usable timeline; an empty list
+        means the timeline was read and nothing in it is new.
         """
-        nitter_instances = [
-            "nitter.net",
-            "nitter.it", 
-            "nitter.privacydev.net",
-            "nitter.unixfox.eu"
-        ]
-        
-        posts = []
-        
-        for instance in nitter_instances:
+        for instance in self.router.ordered_instances():
+            if cancel_event and cancel_event.is_set():
+                logger.debug(f"Nitter scrape for {username} cancelled, another source won")
+                break
+            url = f"{instance}/{username}"
+            try:
+                if not self.rate_limiter.acquire(url, cancel_event=cancel_event):
+                    break
+            except RateLimited as e:
+                logger.info(f"Skipping Nitter instance {instance}: {e}")
+                continue
+            started = time.monotonic()
+            latency = None
+            outcome = 'error'
             try:
-                url = f"https://{instance}/{username}"
                 logger.debug(f"Trying Nitter instance: {instance}")
                 
-                response = self.session.get(url, timeout=10)
-                if response.status_code == 200:
-                    posts = self._parse_nitter_html(response.text, username, hours_back)
-                    if posts:
-                        logger.info(f"Successfully scraped {len(posts)} posts from {instance}")
-                        break
+                response = self.session.get(url, timeout=MONITORING_CONFIG["request_timeout_seconds"],
+                                            headers=self.validators.request_headers(instance, username),
+                                            stream=True)
+                latency = time.monotonic() - started
+                try:
+                    if self.rate_limiter.throttled(url, response):
+                        # The instance is up, just busy: not a failure for its circuit
+                        outcome = 'throttled'
+                        continue
+                    
+                    if response.status_code == 304:
+                        self.router.record_success(instance, latency)
+                        self._count_fetch("not_modified")
+                        outcome = 'not_modified'
+                        logger.debug(f"Timeline for {username} not modified on {instance}")
+                        return []
+                    
+                    if response.status_code != 200:
+                        self.router.record_failure(instance, latency)
+                        outcome = 'http_error'
+                        logger.warning(f"Nitter instance {instance} returned HTTP {response.status_code}")
+                        continue
+                    
+                    page = self._read_timeline(instance, response, username, hours_back)
+                finally:
+                    # Closing mid-body drops the connection, which is cheaper than
+                    # downloading the rest of a timeline we no longer need
+                    response.close()
+                
+                if page is None:
+                    self.router.record_success(instance, latency)
+                    outcome = 'unchanged'
+                    logger.debug(f"Timeline for {username} unchanged on {instance}")
+                    return []
+                
+                if not page.timeline_found:
+                    self.router.record_failure(instance, latency)
+                    outcome = 'no_timeline'
+                    logger.warning(f"Nitter instance {instance} served a page without a timeline for {username}")
+                    continue
+                
+                self.router.record_success(instance, latency)
+                outcome = 'ok'
+                logger.info(f"Successfully scraped {len(page.posts)} posts from {instance}")
+                return page.posts
                     
             except Exception as e:
+                self.router.record_failure(instance, time.monotonic() - started)
                 logger.warning(f"Failed to scrape from {instance}: {str(e)}")
                 continue
+            finally:
+                # Time to the response headers; the body is timed as parsing
+                METRICS.observe('monitoring_fetch_seconds', time.monotonic() - started if latency is None else latency,
+                                instance=instance, outcome=outcome)
         
-        return posts
+        return None
     
-    def _parse_nitter_html(self, html: str, username: str, hours_back: int) -> List[Dict[str, Any]]:
+    def _read_timeline(self, instance: str, response: requests.Response, username: str,
+                       hours_back: int) -> Optional[TimelinePage]:
         """
-        Parse Nitter HTML to extract post information
-        This is a simplified parser - in production you'd want to use BeautifulSoup
+        Parse a timeline response. Pages with HTTP validators are streamed and
+        read only as far as the lookback cutoff; pages without them are hashed
+        first, and None is returned when the hash matches the previous fetch.
+        In pipelined cycles every page is read whole and parsed in the parse pool.
+        A page's validators are only remembered once its posts are stored.
         """
-        posts = []
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+        now = datetime.now(timezone.utc)
+        cutoff_time = now - timedelta(hours=hours_back)
+        refresh_after = now - timedelta(hours=MONITORING_CONFIG["engagement_refresh_hours"])
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            # requests would fall back to ISO-8859-1 for text/html; Nitter pages are UTF-8
+            response.encoding = 'utf-8'
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
         
-        # Simple regex patterns for basic extraction
-        # Note: This is a basic implementation - BeautifulSoup would be more robust
-        tweet_pattern = r'<div class="tweet-content"[^>]*>(.*?)</div>'
-        time_pattern = r'<span class="tweet-date"[^>]*title="([^"]*)"'
+        since_id = self._since_id(username)
+        pool = self.parse_pool if MONITORING_CONFIG["parse_pipeline"]["enabled"] else None
         
-        # This is a placeholder implementation
-        # In a real implementation, you'd properly parse the HTML structure
-        logger.warning("HTML parsing is simplified - consider using BeautifulSoup for production")
+        if (etag or last_modified) and pool is None:
+            with METRICS.timer('monitoring_parse_seconds', mode='stream'):
+                page = parse_timeline(response.iter_content(chunk_size=16384, decode_unicode=True),
+                                      username, cutoff_time, since_id, refresh_after)
+            validators = {'etag': etag, 'last_modified': last_modified}
+        else:
+            body = response.text
+            if etag or last_modified:
+                validators = {'etag': etag, 'last_modified': last_modified}
+            else:
+                # The server ignores validators, so the whole body is needed to tell if anything changed
+                body_hash = timeline_body_hash(body)
+                if self.validators.body_unchanged(instance, username, body_hash):
+                    self._count_fetch("hash_unchanged")
+                    return None
+                validators = {'body_hash': body_hash}
+            with METRICS.timer('monitoring_parse_seconds', mode='inline' if pool is None else 'pool'):
+                if pool is not None:
+                    page = pool.parse(body, username, cutoff_time, since_id, refresh_after)
+                else:
+                    page = parse_timeline_html(body, username, cutoff_time, since_id, refresh_after)
         
-        return posts
+        if page.timeline_found:
+            if page.posts:
+                self.validators.hold(instance, username, **validators)
+            else:
+                self.validators.remember(instance, username, **validators)
+        self._count_fetch("changed")
+        logger.debug(f"Parsed {page.items_seen} timeline items for {username} "
+                     f"({len(page.posts)} in window, stopped early: {page.stopped_early})")
+        return page
     
-    def scrape_via_search(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
+    def _parse_nitter_html(self, html: str, username: str, hours_back: int) -> List[Dict[str, Any]]:
+        """Parse Nitter HTML that is already in memory to extract post information"""
+        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+        return parse_timeline_html(html, username, cutoff_time).posts
+    
+    def scrape_via_search(self, username: str, hours_back: int = 24,
+                          cancel_event: Optional[threading.Event] = None) -> Optional[List[Dict[str, Any]]]:
         """
         Alternative: Scrape using web search results
-        Search for recent tweets from the account
+        Search for recent tweets from the account; None when nothing usable was found
         """
         posts = []
         
         try:
             # Search for recent tweets from this user
             search_query = f'site:twitter.com "{username}" OR site:x.com "{username}"'
-            search_url = f"https://www.google.com/search?q={quote(search_query)}&tbm=nws&tbs=qdr:d"
+            search_url = f"{MONITORING_CONFIG['search_url']}?q={quote(search_query)}&tbm=nws&tbs=qdr:d"
             
-            response = self.session.get(search_url, timeout=10)
-            if response.status_code == 200:
+            if not self.rate_limiter.acquire(search_url, cancel_event=cancel_event):
+                return None
+            response = self.session.get(search_url, timeout=MONITORING_CONFIG["request_timeout_seconds"])
+            if self.rate_limiter.throttled(search_url, response):
+                logger.info(f"Search for {username} was rate limited")
+            elif response.status_code == 200:
                 # Parse search results for Twitter/X links
                 # This would need proper HTML parsing in production
                 logger.info(f"Search-based scraping attempted for {username}")
@@ -142,113 +246,427 @@ class TwitterScraper:
         except Exception as e:
             logger.error(f"Search-based scraping failed for {username}: {str(e)}")
         
-        return posts
+        # Search results are not parsed into posts yet, so an empty result is not an answer
+        return posts or None
     
-    def mock_scrape_for_demo(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
+    def synthetic_scrape(self, username: str, hours_back: int = 24) -> List[Dict[str, Any]]:
         """
-        Mock scraper for demonstration - generates sample data
-        Replace this with real scraping once you have the method working
+        Seeded synthetic posts following the account's schedule (see
+        workload.py), for demonstrations when no real source answers. Repeat
+        calls return the same posts, with engagement grown since.
         """
-        now = datetime.now(timezone.utc)
-        posts = []
+        config = next((account for account in ACCOUNTS.values()
+                       if account.username.lower() == username.lower()), None)
+        if config is None:
+            return []
         
-        # Generate mock posts based on expected schedules
-        account_key = "ladymacbeth" if "ladymacbeth" in username.lower() else "bitbard"
-        config = ACCOUNTS[account_key]
-        
-        if account_key == "ladymacbeth":
-            # Generate 3-5 posts in the last 24 hours during active hours
-            for i in range(3):
-                post_time = now - timedelta(hours=i*2 + 1)
-                if post_time.hour in config.active_hours_utc:
-                    posts.append({
-                        'id': f"mock_{username}_{int(post_time.timestamp())}",
-                        'username': username,
-                        'content': f"Mock Lady Macbeth post {i+1}",
-                        'timestamp': post_time.isoformat(),
-                        'post_type': 'original',
-                        'metrics': json.dumps({'likes': 15, 'retweets': 3, 'replies': 2})
-                    })
-        
-        elif account_key == "bitbard":
-            # Generate daily cue post
-            cue_time = now.replace(hour=14, minute=0, second=0, microsecond=0)  # 14:00 UTC
-            if cue_time <= now:
-                posts.append({
-                    'id': f"mock_{username}_{int(cue_time.timestamp())}",
-                    'username': username,
-                    'content': "Mock BitBard daily cue post",
-                    'timestamp': cue_time.isoformat(),
-                    'post_type': 'original',
-                    'metrics': json.dumps({'likes': 8, 'retweets': 1, 'replies': 1})
-                })
-        
-        logger.info(f"Mock scraper generated {len(posts)} posts for {username}")
+        posts = recent_posts(config, hours_back)
+        logger.info(f"Synthetic source generated {len(posts)} posts for {username}")
         return posts
     
-    def store_posts(self, posts: List[Dict[str, Any]]):
-        """Store scraped posts in database"""
+    def store_posts(self, posts: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Upsert scraped posts in one transaction. Existing rows are only
+        rewritten when their content or engagement changed; engagement
+        changes are also kept in post_metrics_history (by trigger), and the
+        rollups of the hours touched are refreshed alongside. Returns
+        inserted/updated/unchanged counts.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
         if not posts:
-            return
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+            return counts
         
-        for post in posts:
-            try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO posts 
-                    (id, username, content, timestamp, post_type, reply_to, metrics)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
+        started = time.perf_counter()
+        try:
+            timestamps = [to_epoch(post['timestamp']) for post in posts]
+            with self.storage.writer() as conn:
+                cursor = conn.cursor()
+                # Rows added by this batch get rowids above the current maximum
+                max_rowid = cursor.execute('SELECT COALESCE(MAX(rowid), 0) FROM posts').fetchone()[0]
+                
+                cursor.executemany('''
+                    INSERT INTO posts
+                    (id, username, content, timestamp, post_type, reply_to, likes, retweets, replies, quotes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        content = excluded.content,
+                        post_type = excluded.post_type,
+                        reply_to = excluded.reply_to,
+                        likes = excluded.likes,
+                        retweets = excluded.retweets,
+                        replies = excluded.replies,
+                        quotes = excluded.quotes,
+                        scraped_at = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE posts.content IS NOT excluded.content
+                       OR posts.post_type IS NOT excluded.post_type
+                       OR posts.reply_to IS NOT excluded.reply_to
+                       OR posts.likes != excluded.likes
+                       OR posts.retweets != excluded.retweets
+                       OR posts.replies != excluded.replies
+                       OR posts.quotes != excluded.quotes
+                ''', [(
                     post['id'],
                     post['username'],
                     post['content'],
-                    post['timestamp'],
+                    timestamps[i],
                     post.get('post_type', 'original'),
                     post.get('reply_to'),
-                    post.get('metrics', '{}')
-                ))
-            except sqlite3.Error as e:
-                logger.error(f"Database error storing post {post.get('id', 'unknown')}: {e}")
+                    *engagement_counts(post.get('metrics'))
+                ) for i, post in enumerate(posts)])
+                
+                # rowcount leaves out the metrics history rows the triggers write
+                written = cursor.rowcount
+                counts['inserted'] = cursor.execute('SELECT COUNT(*) FROM posts WHERE rowid > ?',
+                                                    (max_rowid,)).fetchone()[0]
+                counts['updated'] = written - counts['inserted']
+                counts['unchanged'] = len(posts) - written
+                
+                if written:
+                    refresh_rollups(conn, [(post['username'], timestamp)
+                                           for post, timestamp in zip(posts, timestamps)])
+                
+                newest = self._advance_watermarks(cursor, posts)
+        except sqlite3.Error as e:
+            logger.error(f"Database error storing {len(posts)} posts: {e}")
+            raise
         
-        conn.commit()
-        conn.close()
-        logger.info(f"Stored {len(posts)} posts in database")
+        METRICS.observe('monitoring_store_seconds', time.perf_counter() - started)
+        with self.stats_lock:
+            self.watermarks.update(newest)
+            for outcome, count in counts.items():
+                self.cycle_stats['storage'][outcome] += count
+        for outcome, count in counts.items():
+            METRICS.inc('monitoring_posts_stored_total', count, outcome=outcome)
+        logger.info(f"Stored {len(posts)} posts in database: {counts['inserted']} new, "
+                    f"{counts['updated']} updated, {counts['unchanged']} unchanged")
+        return counts
     
-    def scrape_account(self, username: str) -> List[Dict[str, Any]]:
-        """Main method to scrape posts from an account"""
+    def _load_watermarks(self) -> Dict[str, Dict[str, Any]]:
+        with self.storage.reader() as conn:
+            rows = conn.execute('SELECT username, last_post_id, last_timestamp FROM account_watermarks').fetchall()
+        return {
+            username: {'last_post_id': last_post_id, 'last_timestamp': last_timestamp}
+            for username, last_post_id, last_timestamp in rows
+        }
+    
+    def _since_id(self, username: str) -> Optional[int]:
+        """Newest post id already stored for an account; normal cycles stop reading at stored posts past the refresh window"""
+        with self.stats_lock:
+            watermark = self.watermarks.get(username)
+        return watermark['last_post_id'] if watermark else None
+    
+    def _advance_watermarks(self, cursor: sqlite3.Cursor, posts: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Move each account's high-water mark up to the newest stored post, inside
+        the caller's transaction. Retweets carry the original tweet's id and
+        synthetic posts have no numeric id, so neither can move the mark.
+        """
+        with self.stats_lock:
+            known = dict(self.watermarks)
+        
+        newest = {}
+        for post in posts:
+            if post.get('post_type') == 'retweet' or not str(post['id']).isdigit():
+                continue
+            post_id = int(post['id'])
+            current = newest.get(post['username']) or known.get(post['username'])
+            if current is None or post_id > current['last_post_id']:
+                newest[post['username']] = {'last_post_id': post_id, 'last_timestamp': post['timestamp']}
+        
+        updated_at = datetime.now(timezone.utc).isoformat()
+        cursor.executemany('''
+            INSERT INTO account_watermarks (username, last_post_id, last_timestamp, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                last_post_id = excluded.last_post_id,
+                last_timestamp = excluded.last_timestamp,
+                updated_at = excluded.updated_at
+            WHERE excluded.last_post_id > account_watermarks.last_post_id
+        ''', [
+            (username, mark['last_post_id'], mark['last_timestamp'], updated_at)
+            for username, mark in newest.items()
+        ])
+        return newest
+    
+    def backfill_account(self, username: str, until: datetime) -> Dict[str, Any]:
+        """
+        Page back through an account's Nitter timeline to `until`, storing posts
+        as it goes. A checkpoint is saved after every page, so an interrupted
+        backfill resumes from the page it stopped at, and extending a finished
+        one further back picks up from its last page.
+        """
+        until_iso = until.astimezone(timezone.utc).isoformat()
+        checkpoint = self._load_checkpoint(username)
+        
+        if checkpoint and checkpoint['completed'] and (
+                checkpoint['exhausted'] or checkpoint['target_date'] <= until_iso):
+            logger.info(f"Backfill for @{username} already covers {checkpoint['target_date']}")
+            return checkpoint
+        
+        page_cursor = checkpoint['cursor'] if checkpoint else None
+        progress = {
+            'username': username,
+            'target_date': until_iso,
+            'cursor': page_cursor,
+            'oldest_timestamp': checkpoint['oldest_timestamp'] if checkpoint else None,
+            'pages_fetched': checkpoint['pages_fetched'] if checkpoint else 0,
+            'posts_stored': checkpoint['posts_stored'] if checkpoint else 0,
+            'completed': 0,
+            'exhausted': 0
+        }
+        logger.info(f"Backfilling @{username} to {until_iso}"
+                    + (f", resuming from page {progress['pages_fetched'] + 1}" if page_cursor else ""))
+        
+        while True:
+            page = self._fetch_backfill_page(username, page_cursor, until)
+            if page is None:
+                logger.error(f"Backfill for @{username} stopped: no instance served page "
+                             f"{progress['pages_fetched'] + 1}; run it again to resume")
+                break
+            
+            if page.posts:
+                self.store_posts(page.posts)
+                oldest = min(post['timestamp'] for post in page.posts)
+                if progress['oldest_timestamp'] is None or oldest < progress['oldest_timestamp']:
+                    progress['oldest_timestamp'] = oldest
+            progress['pages_fetched'] += 1
+            progress['posts_stored'] += len(page.posts)
+            
+            if page.stopped_early or not page.cursor:
+                # Keep this page's cursor when stopping mid-page, so a later, older
+                # target re-reads the posts on it that were past this target
+                progress['cursor'] = page_cursor if page.stopped_early else None
+                progress['completed'] = 1
+                progress['exhausted'] = 0 if page.stopped_early else 1
+                self._save_checkpoint(progress)
+                break
+            
+            page_cursor = page.cursor
+            progress['cursor'] = page_cursor
+            self._save_checkpoint(progress)
+            time.sleep(MONITORING_CONFIG["backfill_page_delay_seconds"])
+        
+        logger.info(f"Backfill for @{username}: {progress['pages_fetched']} pages, "
+                    f"{progress['posts_stored']} posts, oldest {progress['oldest_timestamp']}")
+        return progress
+    
+    def _fetch_backfill_page(self, username: str, page_cursor: Optional[str],
+                             until: datetime) -> Optional[TimelinePage]:
+        """Fetch one timeline page by cursor from the healthiest instance that serves it"""
+        for instance in self.router.ordered_instances():
+            url = f"{instance}/{username}" + (f"?cursor={page_cursor}" if page_cursor else "")
+            try:
+                # Backfill is in no hurry, so it waits out a longer block than a cycle would
+                self.rate_limiter.acquire(url, max_wait=MONITORING_CONFIG["backfill_max_wait_seconds"])
+            except RateLimited as e:
+                logger.info(f"Skipping Nitter instance {instance} for backfill: {e}")
+                continue
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=MONITORING_CONFIG["request_timeout_seconds"], stream=True)
+                latency = time.monotonic() - started
+                try:
+                    if self.rate_limiter.throttled(url, response):
+                        continue
+                    if response.status_code != 200:
+                        self.router.record_failure(instance, latency)
+                        logger.warning(f"Nitter instance {instance} returned HTTP {response.status_code}")
+                        continue
+                    if 'charset' not in response.headers.get('Content-Type', '').lower():
+                        response.encoding = 'utf-8'
+                    page = parse_timeline(response.iter_content(chunk_size=16384, decode_unicode=True),
+                                          username, until)
+                finally:
+                    response.close()
+                
+                if not page.timeline_found:
+                    self.router.record_failure(instance, latency)
+                    continue
+                self.router.record_success(instance, latency)
+                return page
+            except Exception as e:
+                self.router.record_failure(instance, time.monotonic() - started)
+                logger.warning(f"Failed to fetch backfill page from {instance}: {str(e)}")
+        return None
+    
+    def _load_checkpoint(self, username: str) -> Optional[Dict[str, Any]]:
+        with self.storage.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            row = cursor.execute('SELECT * FROM backfill_checkpoints WHERE username = ?', (username,)).fetchone()
+        return dict(row) if row else None
+    
+    def _save_checkpoint(self, progress: Dict[str, Any]):
+        with self.storage.writer() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO backfill_checkpoints
+                (username, target_date, cursor, oldest_timestamp, pages_fetched,
+                 posts_stored, completed, exhausted, updated_at)
+                VALUES (:username, :target_date, :cursor, :oldest_timestamp, :pages_fetched,
+                        :posts_stored, :completed, :exhausted, :updated_at)
+            ''', {**progress, 'updated_at': datetime.now(timezone.utc).isoformat()})
+        self.router.flush()
+    
+    def fetch_account_posts(self, username: str) -> List[Dict[str, Any]]:
+        """Fetch posts from an account without storing them"""
         logger.info(f"Starting scrape for @{username}")
         
-        # Try different scraping methods
-        posts = []
+        if MONITORING_CONFIG["hedged_fetch"]:
+            posts = self._fetch_hedged(username)
+        else:
+            posts = self._fetch_sequential(username)
         
-        # Method 1: Nitter instances
-        posts = self.scrape_nitter_posts(username, MONITORING_CONFIG["lookback_hours"])
+        # Last resort: synthetic data for demonstration
+        if posts is None:
+            logger.warning(f"Real scraping failed for {username}, using synthetic data")
+            posts = self._run_source("synthetic", self.synthetic_scrape, username)
+            self._count_source("synthetic", "wins")
         
-        # Method 2: Search-based (fallback)
-        if not posts:
-            posts = self.scrape_via_search(username, MONITORING_CONFIG["lookback_hours"])
+        return posts
+    
+    def _fetch_sequential(self, username: str) -> List[Dict[str, Any]]:
+        """Try each source in turn, starting the next only after the previous gives up"""
+        for name, scrape in self.sources:
+            posts = self._run_source(name, scrape, username)
+            if posts is not None:
+                self._count_source(name, "wins")
+                return posts
+        return None
+    
+    def _fetch_hedged(self, username: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Race the sources: whenever the newest attempt outlives its latency
+        budget, start the next source alongside it. The first source to answer
+        wins and the remaining attempts are told to stop.
+        """
+        cancel_event = threading.Event()
+        pending = {}
+        next_source = 0
         
-        # Method 3: Mock data for demonstration
-        if not posts:
-            logger.warning(f"Real scraping failed for {username}, using mock data")
-            posts = self.mock_scrape_for_demo(username, MONITORING_CONFIG["lookback_hours"])
+        def launch():
+            nonlocal next_source
+            name, scrape = self.sources[next_source]
+            next_source += 1
+            future = self.hedge_executor.submit(self._run_source, name, scrape, username, cancel_event)
+            pending[future] = name
+        
+        launch()
+        try:
+            while pending:
+                can_hedge = next_source < len(self.sources)
+                budget = self._latency_budget(self.sources[next_source - 1][0]) if can_hedge else None
+                done, _ = wait(pending, timeout=budget, return_when=FIRST_COMPLETED)
+                
+                if not done:
+                    logger.debug(f"{self.sources[next_source - 1][0]} exceeded its {budget:.2f}s budget "
+                                 f"for {username}, hedging with {self.sources[next_source][0]}")
+                    self._count_source(self.sources[next_source][0], "hedged")
+                    launch()
+                    continue
+                
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        posts = future.result()
+                    except Exception as e:
+                        logger.warning(f"Source {name} failed for {username}: {e}")
+                        posts = None
+                    if posts is not None:
+                        self._count_source(name, "wins")
+                        return posts
+                
+                # Everything in flight gave up: move on without waiting out a budget
+                if not pending and next_source < len(self.sources):
+                    launch()
+            return None
+        finally:
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+    
+    def _run_source(self, name: str, scrape, username: str,
+                    cancel_event: Optional[threading.Event] = None) -> Optional[List[Dict[str, Any]]]:
+        """Run one scrape source, recording the attempt and how long it took to answer"""
+        self._count_source(name, "attempts")
+        started = time.monotonic()
+        if cancel_event is None:
+            posts = scrape(username, MONITORING_CONFIG["lookback_hours"])
+        else:
+            posts = scrape(username, MONITORING_CONFIG["lookback_hours"], cancel_event)
+        latency = time.monotonic() - started
+        with self.stats_lock:
+            self.source_latencies[name].append(latency)
+        METRICS.observe('monitoring_source_seconds', latency, source=name)
+        return posts
+    
+    def _latency_budget(self, name: str) -> float:
+        """How long to wait on a source before hedging: a high percentile of its recent latencies"""
+        hedging = MONITORING_CONFIG["hedging"]
+        with self.stats_lock:
+            latencies = sorted(self.source_latencies[name])
+        if len(latencies) < hedging["min_samples"]:
+            return hedging["default_budget_seconds"]
+        rank = max(0, int(len(latencies) * hedging["budget_percentile"] / 100 + 0.5) - 1)
+        return latencies[rank]
+    
+    def _new_cycle_stats(self) -> Dict[str, Any]:
+        return {
+            'sources': defaultdict(lambda: {'attempts': 0, 'wins': 0, 'hedged': 0}),
+            'fetch_cache': {'not_modified': 0, 'hash_unchanged': 0, 'changed': 0},
+            'storage': {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        }
+    
+    def _count_source(self, name: str, field: str):
+        with self.stats_lock:
+            self.cycle_stats['sources'][name][field] += 1
+    
+    def _count_fetch(self, outcome: str):
+        with self.stats_lock:
+            self.cycle_stats['fetch_cache'][outcome] += 1
+    
+    def scrape_account(self, username: str) -> List[Dict[str, Any]]:
+        """Main method to scrape posts from an account"""
+        posts = self.fetch_account_posts(username)
         
         if posts:
-            self.store_posts(posts)
+            self.store_unseen(posts)
         
         return posts
     
-    def run_monitoring_cycle(self):
-        """Run one complete monitoring cycle for all accounts"""
-        session_id = f"session_{int(time.time())}"
+    def store_unseen(self, posts: List[Dict[str, Any]]):
+        """
+        store_posts for just the posts the seen-post filter has not seen stored
+        as they are now, then remember the validators of the pages they came from
+        """
+        usernames = {post['username'] for post in posts}
+        try:
+            if not MONITORING_CONFIG["seen_filter"]["enabled"]:
+                self.store_posts(posts)
+            else:
+                posts = self.seen.unseen(posts)
+                if posts:
+                    self.store_posts(posts)
+                    self.seen.remember(posts)
+        except Exception:
+            self.validators.discard(usernames)
+            raise
+        self.validators.release(usernames)
+    
+    def run_monitoring_cycle(self, account_keys: Optional[List[str]] = None):
+        """Run one complete monitoring cycle for the given accounts, or all of them"""
+        account_keys = list(ACCOUNTS) if account_keys is None else account_keys
+        if MONITORING_CONFIG["concurrent_cycles"] or MONITORING_CONFIG["parse_pipeline"]["enabled"]:
+            return asyncio.run(self.run_monitoring_cycle_async(account_keys))
+        
+        session_id = f"session_{time.time_ns() // 1_000_000}"  # Milliseconds: scheduled cycles can start within a second
         logger.info(f"Starting monitoring session {session_id}")
+        self._begin_cycle()
         
         total_posts = 0
         errors = []
         
-        for account_key, config in ACCOUNTS.items():
+        for account_key in account_keys:
+            config = ACCOUNTS[account_key]
             try:
                 posts = self.scrape_account(config.username)
                 total_posts += len(posts)
@@ -259,43 +677,226 @@ class TwitterScraper:
                 logger.error(error_msg)
                 errors.append(error_msg)
         
-        # Store session info
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO monitoring_sessions 
-            (session_id, accounts_checked, posts_found, errors)
-            VALUES (?, ?, ?, ?)
-        ''', (
-            session_id,
-            json.dumps(list(ACCOUNTS.keys())),
-            total_posts,
-            json.dumps(errors)
-        ))
-        conn.commit()
-        conn.close()
+        self._record_session(session_id, account_keys, total_posts, errors)
+        self._maybe_enforce_retention()
         
         logger.info(f"Monitoring session {session_id} completed: {total_posts} posts, {len(errors)} errors")
         return total_posts, errors
-
-if __name__ == "__main__":
-    scraper = TwitterScraper()
     
-    while True:
+    async def run_monitoring_cycle_async(self, account_keys: Optional[List[str]] = None,
+                                         max_concurrency: Optional[int] = None,
+                                         deadline_seconds: Optional[float] = None):
+        """
+        Run one monitoring cycle with all accounts fetched at the same time.
+        Fetches run on worker threads; posts are stored one account at a time
+        from the event loop, so the database only ever sees a single writer.
+        With parse_pipeline enabled, pages are parsed in the parse pool and
+        the fetch threads hand posts to a BatchWriter thread instead, which
+        stores several accounts' posts per transaction.
+        """
+        account_keys = list(ACCOUNTS) if account_keys is None else account_keys
+        max_concurrency = max_concurrency or MONITORING_CONFIG["max_concurrent_accounts"]
+        deadline_seconds = deadline_seconds or MONITORING_CONFIG["cycle_deadline_seconds"]
+        
+        session_id = f"session_{time.time_ns() // 1_000_000}"  # Milliseconds: scheduled cycles can start within a second
+        logger.info(f"Starting concurrent monitoring session {session_id} "
+                    f"({len(account_keys)} accounts, concurrency {max_concurrency})")
+        self._begin_cycle()
+        writer = self._start_pipeline() if MONITORING_CONFIG["parse_pipeline"]["enabled"] else None
+        
+        loop = asyncio.get_running_loop()
+        # A private executor lets us abandon fetches stuck past the deadline;
+        # the default executor would make asyncio.run() wait for them.
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="scrape")
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        def fetch_and_queue(username: str) -> List[Dict[str, Any]]:
+            posts = self.fetch_account_posts(username)
+            if posts:
+                writer.put(posts)
+            return posts
+        
+        async def fetch(username: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await loop.run_in_executor(executor, fetch_and_queue if writer else self.fetch_account_posts,
+                                                  username)
+        
+        tasks = {
+            asyncio.create_task(fetch(ACCOUNTS[key].username)): ACCOUNTS[key].username
+            for key in account_keys
+        }
+        
+        total_posts = 0
+        errors = []
+        deadline = loop.time() + deadline_seconds
+        pending = set(tasks)
+        
         try:
-            posts_found, errors = scraper.run_monitoring_cycle()
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    username = tasks[task]
+                    try:
+                        posts = task.result()
+                        if posts and writer is None:
+                            self.store_unseen(posts)
+                        total_posts += len(posts)
+                        logger.info(f"Found {len(posts)} posts for @{username}")
+                    except Exception as e:
+                        error_msg = f"Failed to scrape {username}: {str(e)}"
+                        logger.error(error_msg)
+                        errors.append(error_msg)
             
-            if errors:
-                logger.warning(f"Errors in monitoring cycle: {errors}")
-            
-            # Wait before next cycle
-            sleep_minutes = MONITORING_CONFIG["check_interval_minutes"]
-            logger.info(f"Sleeping for {sleep_minutes} minutes until next check")
-            time.sleep(sleep_minutes * 60)
+            for task in pending:
+                task.cancel()
+                error_msg = f"Failed to scrape {tasks[task]}: cycle deadline of {deadline_seconds}s exceeded"
+                logger.error(error_msg)
+                errors.append(error_msg)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if writer is not None:
+                errors.extend(writer.close())
+                self._finish_pipeline(writer)
+        
+        self._record_session(session_id, account_keys, total_posts, errors)
+        self._maybe_enforce_retention()
+        
+        logger.info(f"Monitoring session {session_id} completed: {total_posts} posts, {len(errors)} errors")
+        return total_posts, errors
+    
+    def _begin_cycle(self):
+        """Reset the per-cycle stats, and note where this cycle's timings start"""
+        self.cycle_stats = self._new_cycle_stats()
+        self.seen.reset_stats()
+        self.cycle_started = time.perf_counter()
+        self.metrics_at_cycle_start = METRICS.snapshot()
+    
+    def _start_pipeline(self) -> BatchWriter:
+        """Start the parse pool if needed and a writer for one pipelined cycle"""
+        settings = MONITORING_CONFIG["parse_pipeline"]
+        if self.parse_pool is None:
+            self.parse_pool = ParsePool(settings["parse_workers"], settings["max_pending_pages"],
+                                        settings["start_method"])
+        self.parse_pool.gauge.reset()
+        return BatchWriter(self.store_unseen, settings["write_batch_posts"],
+                           settings["write_max_delay_seconds"], settings["write_queue_size"])
+    
+    def _finish_pipeline(self, writer: BatchWriter):
+        """Add the cycle's queue depths to its stats"""
+        with self.stats_lock:
+            self.cycle_stats['pipeline'] = {
+                'parse': self.parse_pool.gauge.stats(),
+                'write': writer.stats()
+            }
+    
+    def close(self):
+        """Stop the parse pool's worker processes, if any were started, and save the seen-post filter and windows"""
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+        if MONITORING_CONFIG["seen_filter"]["enabled"]:
+            self.seen.save()
+        if MONITORING_CONFIG["rolling_window"]["enabled"]:
+            self.windows.save()
+    
+    def _record_session(self, session_id: str, account_keys: List[str], total_posts: int, errors: List[str]):
+        """Store session info for a finished monitoring cycle"""
+        self.router.flush()
+        self.validators.flush()
+        if MONITORING_CONFIG["seen_filter"]["enabled"]:
+            self.seen.maybe_save()
+        if MONITORING_CONFIG["rolling_window"]["enabled"]:
+            # Count this cycle's posts now, so the saved windows stay close to the posts table
+            self.windows.refresh()
+            self.windows.maybe_save()
+        METRICS.observe('monitoring_cycle_seconds', time.perf_counter() - self.cycle_started)
+        
+        with self.stats_lock:
+            self.cycle_stats['seen_filter'] = self.seen.cycle_stats()
+            self.cycle_stats['metrics'] = METRICS.since(self.metrics_at_cycle_start)
+            fetch_cache = self.cycle_stats['fetch_cache']
+            fetched = sum(fetch_cache[outcome] for outcome in ('not_modified', 'hash_unchanged', 'changed'))
+            hits = fetch_cache['not_modified'] + fetch_cache['hash_unchanged']
+            fetch_cache['hit_rate'] = round(hits / fetched, 3) if fetched else None
+            stats = json.dumps(self.cycle_stats)
+        
+        with self.storage.writer() as conn:
+            conn.execute('''
+                INSERT INTO monitoring_sessions 
+                (session_id, accounts_checked, posts_found, errors, stats)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                session_id,
+                json.dumps(account_keys),
+                total_posts,
+                json.dumps(errors),
+                stats
+            ))
+        if MONITORING_CONFIG["metrics"]["enabled"]:
+            self.metrics_store.save('scraper', METRICS.snapshot())
+
+    def run_scheduled(self, keep_running=lambda: True):
+        """
+        Poll accounts as they fall due until keep_running() returns False.
+        Accounts due together share one cycle; see poll_scheduler for when
+        each account is due.
+        """
+        scheduler = PollScheduler(ACCOUNTS, time.time())
+        while keep_running():
+            due = scheduler.pop_due(time.time())
+            if due:
+                try:
+                    posts_found, errors = self.run_monitoring_cycle(due)
+                    if errors:
+                        logger.warning(f"Errors in monitoring cycle: {errors}")
+                    now = time.time()
+                    for key in due:
+                        scheduler.reschedule(key, now, self._last_post_epoch(ACCOUNTS[key].username))
+                except Exception as e:
+                    logger.error(f"Unexpected error in monitoring loop: {e}")
+                    now = time.time()
+                    for key in due:
+                        scheduler.retry(key, now)
+                logger.info(f"Next poll in {scheduler.seconds_until_next(time.time()) / 60:.1f} minutes")
             
-        except KeyboardInterrupt:
-            logger.info("Monitoring stopped by user")
-            break
-        except Exception as e:
-            logger.error(f"Unexpected error in monitoring loop: {e}")
-            time.sleep(60)  # Wait 1 minute before retrying 
\ No newline at end of file
+            # Sleep in short steps so a stop request is noticed promptly
+            wait = scheduler.seconds_until_next(time.time())
+            time.sleep(min(wait if wait is not None else 1.0, 1.0))
+    
+    def _last_post_epoch(self, username: str) -> Optional[int]:
+        with self.stats_lock:
+            watermark = self.watermarks.get(username)
+        return to_epoch(watermark['last_timestamp']) if watermark else None
+    
+    def _maybe_enforce_retention(self):
+        """Drop data past the retention window, at most once per retention interval"""
+        interval = MONITORING_CONFIG["retention_interval_hours"] * 3600
+        if self.last_retention_run and time.monotonic() - self.last_retention_run < interval:
+            return
+        self.last_retention_run = time.monotonic()
+        try:
+            enforce_retention(self.storage)
+        except sqlite3.Error as e:
+            logger.error(f"Retention run failed: {e}")
+        try:
+            # Re-check the recent windows that cycles since the last run changed. The sweep's writes
+            # move the data version, so cached reports pick up the new history.
+            self.analyzer.sweep_compliance(MONITORING_CONFIG["compliance_sweep"]["refresh_days"])
+        except sqlite3.Error as e:
+            logger.error(f"Compliance sweep failed: {e}")
+
+if __name__ == "__main__":
+    # Records are queued here and written by the log pipeline's own thread
+    setup_logging(f"{LOGS_DIR}/monitor.log")
+    scraper = TwitterScraper()
+    
+    try:
+        scraper.run_scheduled()
+    except KeyboardInterrupt:
+        logger.info("Monitoring stopped by user")
+    finally:
+        scraper.close()
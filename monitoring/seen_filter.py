@@ -0,0 +1,232 @@
+"""
+Seen-Post Filter
+Fingerprints of stored posts, so re-scraped posts that have not changed skip the database write
+"""
+
+import math
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from config import MONITORING_CONFIG
+from migrations import migrate, engagement_counts, last_ingest_seq
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# The columns store_posts compares to decide whether a stored post changed
+STORED_COLUMNS_SQL = 'id, content, post_type, reply_to, likes, retweets, replies, quotes'
+
+# Post ids per verification query
+VERIFY_CHUNK = 500
+
+def row_fingerprint(row: Tuple) -> int:
+    """64-bit fingerprint of a post's stored columns, in STORED_COLUMNS_SQL order"""
+    digest = hashlib.blake2b(repr(tuple(row)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def post_fingerprint(post: Dict[str, Any]) -> int:
+    """The fingerprint the post would have once stored"""
+    return row_fingerprint((str(post['id']), post['content'], post.get('post_type', 'original'),
+                            post.get('reply_to'), *engagement_counts(post.get('metrics'))))
+
+class BloomFilter:
+    """Fixed-size bloom filter over 64-bit fingerprints, using double hashing"""
+
+    def __init__(self, bit_count: int, hash_count: int, bits: Optional[bytes] = None, entries: int = 0):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits is not None else bytearray((bit_count + 7) // 8)
+        self.entries = entries
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> 'BloomFilter':
+        bit_count = max(64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        return cls(bit_count, hash_count)
+
+    @property
+    def capacity(self) -> int:
+        """Entries the filter holds at the false-positive rate it was sized for"""
+        return int(self.bit_count * math.log(2) / self.hash_count)
+
+    def _positions(self, fingerprint: int) -> Iterable[int]:
+        low, high = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        return ((low + i * high) % self.bit_count for i in range(self.hash_count))
+
+    def add(self, fingerprint: int):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.entries += 1
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return all(self.bits[position >> 3] >> (position & 7) & 1 for position in self._positions(fingerprint))
+
+class SeenPosts:
+    """
+    Which posts are already stored exactly as scraped. Each account's most
+    recent posts are kept exactly, as post id -> fingerprint; older ones are
+    only in a bloom filter. A bloom hit is checked against the database
+    before a post is skipped, so a false positive costs a read, never a
+    lost update.
+
+    The filter is saved to the database every save_interval_seconds and
+    reloaded at start-up, topped up with any posts stored after it was
+    saved. It is rebuilt from the posts table when missing or outgrown.
+    """
+
+    def __init__(self, db_path: str, usernames: Iterable[str], settings: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.storage = get_storage(db_path)
+        migrate(self.storage)
+        self.settings = settings or MONITORING_CONFIG["seen_filter"]
+        self.lock = threading.Lock()
+        self.recent: Dict[str, OrderedDict] = {}
+        self.setup_table()
+        self.bloom = self._load(usernames)
+        self.reset_stats()
+
+    def setup_table(self):
+        """Create the filter table if needed"""
+        with self.storage.writer() as conn:
+            # Filters saved against rowids, before ingest_seq; they are rebuilt from posts
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(seen_filter)")]
+            if 'max_rowid' in columns:
+                conn.execute('DROP TABLE seen_filter')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS seen_filter (
+                    name TEXT PRIMARY KEY,
+                    bit_count INTEGER NOT NULL,
+                    hash_count INTEGER NOT NULL,
+                    entries INTEGER NOT NULL,
+                    max_ingest_seq INTEGER NOT NULL,  -- posts.ingest_seq covered when the bits were saved
+                    bits BLOB NOT NULL,
+                    updated_at DATETIME
+                )
+            ''')
+
+    def _load(self, usernames: Iterable[str]) -> BloomFilter:
+        with self.storage.reader() as conn:
+            saved = conn.execute('SELECT bit_count, hash_count, entries, max_ingest_seq, bits FROM seen_filter '
+                                 'WHERE name = ?', ('posts',)).fetchone()
+            post_count = conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+            capacity = max(self.settings["capacity"], post_count * 2)
+
+            bloom = BloomFilter(*saved[:2], saved[4], saved[2]) if saved else None
+            if bloom is not None and bloom.entries <= bloom.capacity:
+                max_ingest_seq = saved[3]
+            else:
+                if bloom is not None:
+                    logger.info(f"Seen-post filter holds {bloom.entries} posts, over its capacity; rebuilding")
+                bloom = BloomFilter.for_capacity(capacity, self.settings["false_positive_rate"])
+                max_ingest_seq = 0
+
+            # Posts stored since the filter was saved; updates to older rows are
+            # missed, which only means they get written once more
+            added = 0
+            for row in conn.execute(f'SELECT {STORED_COLUMNS_SQL} FROM posts WHERE ingest_seq > ?',
+                                    (max_ingest_seq,)):
+                bloom.add(row_fingerprint(row))
+                added += 1
+
+            # Each account's newest posts, for exact matches without a read
+            for username in usernames:
+                rows = conn.execute(f'''
+                    SELECT {STORED_COLUMNS_SQL} FROM posts
+                    WHERE username = ? ORDER BY timestamp DESC LIMIT ?
+                ''', (username, self.settings["recent_per_account"])).fetchall()
+                recent = self.recent.setdefault(username, OrderedDict())
+                for row in reversed(rows):
+                    recent[row[0]] = row_fingerprint(row)
+
+        logger.info(f"Seen-post filter loaded: {bloom.entries} posts, {added} added since last save, "
+                    f"{sum(len(recent) for recent in self.recent.values())} recent")
+        self.saved_at = datetime.now(timezone.utc)
+        return bloom
+
+    def unseen(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The posts that are new or changed since they were stored"""
+        to_store, to_verify = [], []
+        with self.lock:
+            for post in posts:
+                fingerprint = post_fingerprint(post)
+                known = self.recent.get(post['username'], {}).get(str(post['id']))
+                if known is not None:
+                    if known != fingerprint:
+                        to_store.append(post)
+                elif fingerprint in self.bloom:
+                    to_verify.append((post, fingerprint))
+                else:
+                    to_store.append(post)
+
+        false_positives = 0
+        if to_verify:
+            # Bloom hits outside the recent window: one read to confirm they really are stored as-is
+            ids = [str(post['id']) for post, _ in to_verify]
+            stored = {}
+            with self.storage.reader() as conn:
+                # Chunked to stay under SQLite's limit on bound parameters
+                for chunk_start in range(0, len(ids), VERIFY_CHUNK):
+                    chunk = ids[chunk_start:chunk_start + VERIFY_CHUNK]
+                    stored.update((row[0], row_fingerprint(row)) for row in conn.execute(
+                        f"SELECT {STORED_COLUMNS_SQL} FROM posts WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            for post, fingerprint in to_verify:
+                if stored.get(str(post['id'])) != fingerprint:
+                    to_store.append(post)
+                    false_positives += 1
+
+        with self.lock:
+            self.stats['checked'] += len(posts)
+            self.stats['skipped'] += len(posts) - len(to_store)
+            self.stats['verified'] += len(to_verify)
+            self.stats['false_positives'] += false_positives
+        return to_store
+
+    def remember(self, posts: List[Dict[str, Any]]):
+        """Record posts that were just stored"""
+        limit = self.settings["recent_per_account"]
+        with self.lock:
+            for post in posts:
+                fingerprint = post_fingerprint(post)
+                self.bloom.add(fingerprint)
+                recent = self.recent.setdefault(post['username'], OrderedDict())
+                recent[str(post['id'])] = fingerprint
+                recent.move_to_end(str(post['id']))
+                if len(recent) > limit:
+                    recent.popitem(last=False)
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'checked': 0, 'skipped': 0, 'verified': 0, 'false_positives': 0}
+
+    def cycle_stats(self) -> Dict[str, Any]:
+        """This cycle's counts, with the share of posts skipped and of bloom hits that were wrong"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats['skip_ratio'] = round(stats['skipped'] / stats['checked'], 3) if stats['checked'] else None
+        stats['false_positive_rate'] = (round(stats['false_positives'] / stats['verified'], 3)
+                                        if stats['verified'] else None)
+        return stats
+
+    def maybe_save(self):
+        """Save the filter if save_interval_seconds have passed since it was last saved"""
+        if (datetime.now(timezone.utc) - self.saved_at).total_seconds() >= self.settings["save_interval_seconds"]:
+            self.save()
+
+    def save(self):
+        with self.storage.writer() as conn:
+            # Holding the writer, no post can be stored between reading the sequence and copying the bits
+            max_ingest_seq = last_ingest_seq(conn)
+            with self.lock:
+                bits = bytes(self.bloom.bits)
+                bloom = self.bloom
+            conn.execute('''
+                INSERT OR REPLACE INTO seen_filter
+                (name, bit_count, hash_count, entries, max_ingest_seq, bits, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', ('posts', bloom.bit_count, bloom.hash_count, bloom.entries, max_ingest_seq, bits,
+                  datetime.now(timezone.utc).isoformat()))
+        self.saved_at = datetime.now(timezone.utc)
@@ -9,16 +9,16 @@ import time
 import threading
 import signal
 import logging
+from datetime import datetime, timezone
 from multiprocessing import Process
 
 from scraper import TwitterScraper
 from dashboard import run_dashboard_server
 from analyzer import ScheduleAnalyzer
+from report_cache import get_report_cache
+from config import ACCOUNTS, MONITORING_CONFIG
+from log_pipeline import setup_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class MonitoringOrchestrator:
@@ -33,21 +33,11 @@ class MonitoringOrchestrator:
         
         def run_scraper():
             scraper = TwitterScraper()
-            while self.running:
-                try:
-                    posts_found, errors = scraper.run_monitoring_cycle()
-                    logger.info(f"Scraper cycle complete: {posts_found} posts, {len(errors)} errors")
-                    
-                    if not self.running:
-                        break
-                    
-                    # Sleep for the configured interval
-                    time.sleep(300)  # 5 minutes
-                    
-                except Exception as e:
-                    logger.error(f"Scraper error: {e}")
-                    if self.running:
-                        time.sleep(60)  # Wait 1 minute before retrying
+            try:
+                # Each account is polled as it falls due; see poll_scheduler
+                scraper.run_scheduled(lambda: self.running)
+            finally:
+                scraper.close()
         
         self.scraper_thread = threading.Thread(target=run_scraper, daemon=True)
         self.scraper_thread.start()
@@ -82,14 +72,15 @@ class MonitoringOrchestrator:
             
             logger.info(f"✅ Monitoring system started!")
             logger.info(f"📊 Dashboard: http://localhost:{dashboard_port}")
-            logger.info(f"🔍 Scraper: Running every 5 minutes")
+            logger.info(f"🔍 Scraper: Every {MONITORING_CONFIG['check_interval_minutes']} minutes in active hours, "
+                        f"every {MONITORING_CONFIG['poll_scheduling']['idle_interval_minutes']} outside them")
             logger.info(f"📁 Data: monitoring/data/")
             logger.info(f"📋 Reports: monitoring/reports/")
             logger.info("Press Ctrl+C to stop")
             
             # Run initial analysis
             analyzer = ScheduleAnalyzer()
-            initial_report = analyzer.generate_report(24)
+            initial_report = get_report_cache(analyzer.db_path).get(24)
             analyzer.print_report_summary(initial_report)
             
             # Keep main thread alive
@@ -141,13 +132,42 @@ def main():
                        help='Generate a one-time report and exit')
     parser.add_argument('--hours', type=int, default=24,
                        help='Hours to analyze for report (default: 24)')
+    parser.add_argument('--backfill-until', metavar='YYYY-MM-DD',
+                       help='Backfill post history back to this UTC date and exit (resumable)')
+    parser.add_argument('--account', choices=sorted(ACCOUNTS.keys()),
+                       help='Limit --backfill-until or --sweep-days to one account')
+    parser.add_argument('--sweep-days', type=int, metavar='DAYS',
+                       help='Re-check compliance over the last DAYS days into the compliance history and exit')
+    parser.add_argument('--sweep-step-hours', type=int, default=None,
+                       help='Hours between swept windows: 24 for daily, 1 for hourly '
+                            f"(default: {MONITORING_CONFIG['compliance_sweep']['step_hours']})")
     
     args = parser.parse_args()
+    # The dashboard process is forked after this, so it logs through the same pipeline
+    setup_logging()
+    
+    if args.backfill_until:
+        until = datetime.strptime(args.backfill_until, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        scraper = TwitterScraper()
+        account_keys = [args.account] if args.account else list(ACCOUNTS.keys())
+        for account_key in account_keys:
+            progress = scraper.backfill_account(ACCOUNTS[account_key].username, until)
+            status = "✅ complete" if progress['completed'] else "⏸️  incomplete (rerun to resume)"
+            print(f"📥 @{progress['username']}: {progress['posts_stored']} posts over "
+                  f"{progress['pages_fetched']} pages, oldest {progress['oldest_timestamp']} - {status}")
+        return
+    
+    if args.sweep_days:
+        result = ScheduleAnalyzer().sweep_compliance(args.sweep_days, args.sweep_step_hours,
+                                                     account_keys=[args.account] if args.account else None)
+        print(f"📈 Swept {result['windows']:,} windows for {result['accounts']} accounts from "
+              f"{result['rollup_rows']:,} hourly rollups in {result['seconds']}s")
+        return
     
     if args.report_only:
         # Generate one-time report
         analyzer = ScheduleAnalyzer()
-        report = analyzer.generate_report(args.hours)
+        report = get_report_cache(analyzer.db_path).get(args.hours)
         analyzer.print_report_summary(report)
         return
     
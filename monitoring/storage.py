@@ -0,0 +1,122 @@
+"""
+Monitoring Storage
+Shared SQLite connections: one writer and a small pool of read-only readers per database
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+from urllib.request import pathname2url
+
+from config import MONITORING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[Tuple[str, int], 'Storage'] = {}
+_registry_lock = threading.Lock()
+
+def get_storage(db_path: str) -> 'Storage':
+    """The shared Storage for a database file, created on first use in each process"""
+    key = (os.path.abspath(db_path), os.getpid())
+    with _registry_lock:
+        storage = _registry.get(key)
+        if storage is None:
+            storage = _registry[key] = Storage(key[0])
+        return storage
+
+class Storage:
+    """
+    Owns every connection to one database file. Writes go through a single
+    connection behind a lock, so the scraper never contends with itself;
+    reads borrow one of up to `reader_connections` read-only connections and
+    run alongside the writer thanks to WAL. Connections live as long as the
+    process, so sqlite3's per-connection statement cache keeps queries prepared.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.settings = MONITORING_CONFIG["storage"]
+        self.write_lock = threading.RLock()
+        self.write_conn = self._connect(read_only=False)
+        # Both are properties of the database file, so the writer sets them once for everyone.
+        # auto_vacuum only takes effect on a new file; retention converts older ones.
+        self.write_conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.write_conn.execute("PRAGMA journal_mode=WAL")
+
+        self.readers = queue.LifoQueue()
+        self.reader_count = 0
+        self.reader_lock = threading.Lock()
+        self.closed = False
+        self.schema_version = None  # Set by migrations.migrate() once the schema is current
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        settings = self.settings
+        if read_only:
+            conn = sqlite3.connect(f"file:{pathname2url(self.db_path)}?mode=ro", uri=True,
+                                   check_same_thread=False, cached_statements=settings["cached_statements"],
+                                   timeout=settings["busy_timeout_ms"] / 1000)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=settings["cached_statements"],
+                                   timeout=settings["busy_timeout_ms"] / 1000)
+            conn.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        conn.execute(f"PRAGMA mmap_size={settings['mmap_size_mb'] * 1024 * 1024}")
+        conn.execute(f"PRAGMA cache_size={-settings['cache_size_mb'] * 1024}")  # Negative means KiB
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Exclusive use of the write connection for one transaction: committed
+        when the block exits, rolled back if it raises
+        """
+        with self.write_lock:
+            try:
+                yield self.write_conn
+                self.write_conn.commit()
+            except BaseException:
+                self.write_conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection; blocks while all of them are in use"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            # Leave no statement open, or the connection would pin an old WAL snapshot
+            if conn.in_transaction:
+                conn.rollback()
+            self.readers.put(conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self.readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self.reader_lock:
+            if self.reader_count < self.settings["reader_connections"]:
+                self.reader_count += 1
+                return self._connect(read_only=True)
+        return self.readers.get()
+
+    def close(self):
+        """Close every connection and forget this database in the registry"""
+        with _registry_lock:
+            _registry.pop((self.db_path, os.getpid()), None)
+        with self.write_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.write_conn.close()
+        while True:
+            try:
+                self.readers.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,328 @@
+"""
+Synthetic Workload
+Seeded post streams generated from each account's schedule, for the scraper's fallback and for load tests
+"""
+
+import math
+import time
+import random
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional, Tuple
+
+from accounts import AccountConfig
+from config import MONITORING_CONFIG
+from migrations import migrate
+from retention import refresh_rollups
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# Ways a day can break its account's schedule, as injected by generate_day
+VIOLATIONS = ('off_hours', 'too_frequent', 'over_daily_limit', 'missed_cue', 'extra_cue')
+
+class SyntheticPost(NamedTuple):
+    id: str  # Never numeric, so synthetic posts can't move a scraper watermark
+    username: str
+    content: str
+    timestamp: int  # Epoch seconds, UTC
+    post_type: str
+    reply_to: Optional[str]
+    snapshots: Tuple[Tuple[int, int, int, int, int], ...]  # (scraped_at, likes, retweets, replies, quotes), oldest first
+
+    def as_scraped(self) -> Dict[str, Any]:
+        """The post as a scraper source returns it, with engagement as of its last snapshot"""
+        _, likes, retweets, replies, quotes = self.snapshots[-1]
+        return {
+            'id': self.id,
+            'username': self.username,
+            'content': self.content,
+            'timestamp': datetime.fromtimestamp(self.timestamp, timezone.utc).isoformat(),
+            'post_type': self.post_type,
+            'reply_to': self.reply_to,
+            'metrics': {'likes': likes, 'retweets': retweets, 'replies': replies, 'quotes': quotes}
+        }
+
+class SyntheticDay(NamedTuple):
+    posts: List[SyntheticPost]  # Sorted by timestamp
+    violations: List[str]  # Kinds from VIOLATIONS injected into the day
+
+def _active_starts(config: AccountConfig, day_start: int, after: float) -> Iterator[int]:
+    """Start of each active hour of the day beginning after `after`"""
+    for hour in range(24):
+        start = day_start + hour * 3600
+        if start > after and config.is_active_hour(hour):
+            yield start
+
+def _originals(config: AccountConfig, day_start: int, rng: random.Random) -> List[float]:
+    """
+    Original post times for one day: Poisson arrivals inside the active
+    hours, each gap at least min_interval_minutes, stopping at the daily limit
+    """
+    min_gap = config.min_interval_minutes * 60
+    # The mean gap sits between the schedule's min and max intervals
+    mean_extra = max(60.0, (config.max_interval_minutes - config.min_interval_minutes) * 30)
+    times = []
+    t = day_start - min_gap
+    while len(times) < config.max_posts_per_day:
+        t += min_gap + rng.expovariate(1 / mean_extra)
+        if t >= day_start + DAY:
+            break
+        if not config.is_active_hour(int(t - day_start) // 3600):
+            t = next(_active_starts(config, day_start, t), None)
+            if t is None:
+                break
+            t += rng.expovariate(1 / mean_extra)
+            if t >= day_start + DAY or not config.is_active_hour(int(t - day_start) // 3600):
+                continue
+        times.append(t)
+    return times
+
+def _cue_originals(config: AccountConfig, cue: Dict[str, Any], day_start: int,
+                   rng: random.Random) -> List[float]:
+    """The day's scheduled cue posts, at uniform times inside the cue window"""
+    hours = cue.get('hours_utc', config.active_hours_utc)
+    return sorted(day_start + rng.choice(hours) * 3600 + rng.uniform(0, 3600)
+                  for _ in range(cue.get('max_per_day', 1)))
+
+def _inject_violation(config: AccountConfig, day_start: int, originals: List[float],
+                      rng: random.Random) -> Optional[str]:
+    """Break the day's schedule in one way that fits the account, editing `originals` in place"""
+    cue = config.checks.get('daily_cue')
+    inactive = [hour for hour in range(24) if not config.is_active_hour(hour)]
+    kinds = ['over_daily_limit']
+    if inactive:
+        kinds.append('off_hours')
+    if originals and config.min_interval_minutes > 1:
+        kinds.append('too_frequent')
+    if cue is not None:
+        kinds += ['missed_cue', 'extra_cue']
+    kind = rng.choice(kinds)
+
+    if kind == 'off_hours':
+        originals.append(day_start + rng.choice(inactive) * 3600 + rng.uniform(0, 3600))
+    elif kind == 'too_frequent':
+        originals.append(rng.choice(originals) + rng.uniform(60, config.min_interval_minutes * 30))
+    elif kind == 'over_daily_limit':
+        hours = [hour for hour in range(24) if config.is_active_hour(hour)] or inactive
+        for _ in range(config.max_posts_per_day - len(originals) + rng.randint(1, 3)):
+            originals.append(day_start + rng.choice(hours) * 3600 + rng.uniform(0, 3600))
+    elif kind == 'missed_cue':
+        originals.clear()
+    else:
+        originals.extend(_cue_originals(config, cue, day_start, rng))
+    originals[:] = sorted(t for t in originals if t < day_start + DAY)
+    return kind
+
+def _replies(config: AccountConfig, originals: List[float], rng: random.Random,
+             settings: Dict[str, Any]) -> List[Tuple[float, str]]:
+    """Bursts of replies shortly after some originals, as (time, handle replied to)"""
+    window = (config.reply_window_minutes or 30) * 60
+    mean_extra = settings["reply_burst_mean_size"] - 1
+    replies = []
+    for posted_at in originals:
+        if rng.random() >= settings["reply_burst_probability"]:
+            continue
+        t = posted_at + rng.uniform(0, window)
+        # Burst sizes are geometric: every further reply is as likely as the last
+        while True:
+            replies.append((t, f"follower{rng.randrange(10000)}"))
+            if rng.random() >= mean_extra / (mean_extra + 1):
+                break
+            t += rng.expovariate(1 / settings["reply_gap_seconds"])
+    return replies
+
+def _snapshots(timestamp: int, final: Tuple[float, float, float, float], now: float,
+               growth: List[Tuple[int, float]], tau: float) -> Tuple[Tuple[int, int, int, int, int], ...]:
+    """
+    Engagement as seen by scrapes at fixed ages and one at `now`, rising
+    towards `final` as 1 - exp(-age / tau); `growth` holds that factor for
+    each fixed age. Scrapes that saw no change are dropped, as store_posts
+    would, leaving a post that never got any engagement with a single
+    all-zero snapshot at `now`.
+    """
+    likes, retweets, replies, quotes = final
+    age_now = now - timestamp
+    points = [(timestamp + age, grown) for age, grown in growth if age < age_now]
+    points.append((int(now), 1 - math.exp(-age_now / tau)))
+    snapshots = []
+    last = (0, 0, 0, 0)
+    for scraped_at, grown in points:
+        counts = (int(likes * grown), int(retweets * grown), int(replies * grown), int(quotes * grown))
+        if counts != last:
+            snapshots.append((scraped_at, *counts))
+            last = counts
+    return tuple(snapshots) or ((int(now), 0, 0, 0, 0),)
+
+def generate_day(config: AccountConfig, day_start: int, now: Optional[float] = None,
+                 settings: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> SyntheticDay:
+    """
+    One UTC day of an account's posts up to `now`. The day's stream depends
+    only on the seed, the username and the day, so asking again returns the
+    same posts, with engagement grown by however much time has passed.
+    """
+    settings = settings or MONITORING_CONFIG["synthetic_workload"]
+    seed = settings["seed"] if seed is None else seed
+    now = time.time() if now is None else now
+    rng = random.Random(f"{seed}:{config.username}:{day_start}")
+
+    cue = config.checks.get('daily_cue')
+    if cue is not None:
+        originals = _cue_originals(config, cue, day_start, rng)
+    else:
+        originals = _originals(config, day_start, rng)
+    violations = []
+    if rng.random() < settings["violation_rate"]:
+        violations.append(_inject_violation(config, day_start, originals, rng))
+    replies = _replies(config, originals, rng, settings)
+
+    stream = [(t, 'original', None) for t in originals] + [(t, 'reply', to) for t, to in replies]
+    stream.sort()
+    # Every draw happens before `now` is applied, so the stream itself never depends on it
+    tau = settings["engagement_time_constant_minutes"] * 60
+    growth = [(minutes * 60, 1 - math.exp(-minutes * 60 / tau)) for minutes in settings["snapshot_minutes"]]
+    mu = math.log(settings["median_likes"])
+    sigma = settings["likes_sigma"]
+    engagement = [(rng.lognormvariate(mu, sigma), rng.uniform(0.05, 0.2),
+                   rng.uniform(0.02, 0.1), rng.uniform(0.0, 0.03)) for _ in stream]
+
+    posts = []
+    for n, ((t, post_type, reply_to), (likes, retweet_ratio, reply_ratio, quote_ratio)) in enumerate(zip(stream, engagement)):
+        timestamp = int(t)
+        if timestamp > now:
+            break
+        if post_type == 'reply':
+            likes *= settings["reply_engagement_factor"]
+            content = f"@{reply_to} {config.display_name} synthetic reply {n}"
+        else:
+            content = f"{config.display_name} synthetic post {n}"
+        posts.append(SyntheticPost(
+            id=f"synthetic_{config.username}_{timestamp}_{n}",
+            username=config.username,
+            content=content,
+            timestamp=timestamp,
+            post_type=post_type,
+            reply_to=reply_to,
+            snapshots=_snapshots(timestamp, (likes, likes * retweet_ratio, likes * reply_ratio, likes * quote_ratio),
+                                 now, growth, tau)
+        ))
+    return SyntheticDay(posts, violations)
+
+def recent_posts(config: AccountConfig, hours_back: int = 24, now: Optional[float] = None,
+                 settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """An account's synthetic posts from the last `hours_back` hours, as a scraper source returns them"""
+    now = time.time() if now is None else now
+    start = now - hours_back * 3600
+    posts = []
+    for day_start in range(int(start) // DAY * DAY, int(now) + 1, DAY):
+        posts.extend(post.as_scraped() for post in generate_day(config, day_start, now, settings).posts
+                     if post.timestamp >= start)
+    posts.reverse()  # Newest first, like a timeline
+    return posts
+
+def bulk_load(db_path: str, accounts: Dict[str, AccountConfig], days: int,
+              now: Optional[float] = None, settings: Optional[Dict[str, Any]] = None,
+              seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Write `days` days of synthetic posts for every account straight into the
+    monitoring database, with their engagement history and rollups, in
+    batches of one transaction each. Accounts that already have posts are
+    skipped. Returns row counts, the violations injected and rows per minute.
+    """
+    settings = settings or MONITORING_CONFIG["synthetic_workload"]
+    now = time.time() if now is None else now
+    storage = get_storage(db_path)
+    migrate(storage)
+
+    first_day = int(now) // DAY * DAY - (days - 1) * DAY
+    with storage.reader() as conn:
+        loaded = {config.username for config in accounts.values()
+                  if conn.execute('SELECT 1 FROM posts WHERE username = ? LIMIT 1', (config.username,)).fetchone()}
+    for username in loaded:
+        logger.warning(f"Skipping @{username}: it already has posts in {db_path}")
+
+    totals = {'posts': 0, 'history_rows': 0}
+    violations = Counter()
+    started = time.perf_counter()
+
+    posts, history = [], []
+    first_snapshots = 0  # Posts whose only history row is the one the insert trigger writes
+    def flush():
+        nonlocal first_snapshots
+        with storage.writer() as conn:
+            # The insert trigger adds each post's full counts to its last snapshot's row;
+            # pre-loading that row with minus the earlier deltas leaves just the last delta
+            conn.executemany('INSERT INTO post_metrics_history VALUES (?, ?, ?, ?, ?, ?, ?)', history)
+            conn.executemany('''
+                INSERT OR IGNORE INTO posts
+                (id, username, content, timestamp, post_type, reply_to, scraped_at, likes, retweets, replies, quotes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', posts)
+            refresh_rollups(conn, [(post[1], post[3]) for post in posts])
+        totals['posts'] += len(posts)
+        totals['history_rows'] += len(history) + first_snapshots
+        posts.clear()
+        history.clear()
+        first_snapshots = 0
+
+    for config in accounts.values():
+        if config.username in loaded:
+            continue
+        for day_start in range(first_day, int(now) + 1, DAY):
+            day = generate_day(config, day_start, now, settings, seed)
+            violations.update(day.violations)
+            for post in day.posts:
+                *earlier, last = post.snapshots
+                previous = (0, 0, 0, 0)
+                for scraped_at, *counts in earlier:
+                    history.append((post.id, post.username, scraped_at,
+                                    *(count - before for count, before in zip(counts, previous))))
+                    previous = counts
+                if earlier:
+                    history.append((post.id, post.username, last[0], *(-count for count in previous)))
+                elif any(last[1:]):
+                    first_snapshots += 1
+                posts.append((post.id, post.username, post.content, post.timestamp, post.post_type,
+                              post.reply_to, *last))
+            if len(posts) >= settings["bulk_batch_size"]:
+                flush()
+    if posts:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    rows = totals['posts'] + totals['history_rows']
+    result = {
+        **totals,
+        'accounts': len(accounts),
+        'days': days,
+        'violations': dict(violations),
+        'seconds': round(elapsed, 2),
+        'rows_per_minute': round(rows / elapsed * 60) if elapsed else 0
+    }
+    logger.info(f"Loaded {totals['posts']} synthetic posts and {totals['history_rows']} history rows "
+                f"into {db_path} in {elapsed:.1f}s")
+    return result
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import ACCOUNTS, DATA_DIR
+
+    parser = argparse.ArgumentParser(description='Load synthetic posts for the monitored accounts into a database')
+    parser.add_argument('--db', default=f"{DATA_DIR}/synthetic_monitoring.db", help='Database file')
+    parser.add_argument('--days', type=int, default=90, help='Days of history per account (default: 90)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help=f"Generator seed (default: {MONITORING_CONFIG['synthetic_workload']['seed']})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    result = bulk_load(args.db, ACCOUNTS, args.days, seed=args.seed)
+    print(f"🧪 Loaded {result['posts']:,} posts and {result['history_rows']:,} engagement snapshots "
+          f"for {result['accounts']} accounts over {result['days']} days "
+          f"({result['rows_per_minute']:,} rows/min)")
+    for kind in VIOLATIONS:
+        if result['violations'].get(kind):
+            print(f"   {kind:<18} injected on {result['violations'][kind]} days")
@@ -3,28 +3,44 @@ import os
 import sys
 import json
 from pathlib import Path
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # Add the parent directory to sys.path for proper imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-# Setup logging first
-def setup_logging():
-    logs_dir = Path(__file__).parent / "logs"
-    logs_dir.mkdir(exist_ok=True)
-
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
+logger = logging.getLogger(__name__)
+_listener: "QueueListener | None" = None
+
+def setup_logging() -> logging.Logger:
+    """
+    Route the root logger through a queue to one listener thread that writes
+    logs/biome.log and the console. Only the first call sets it up; modules
+    just call logging.getLogger and never configure handlers themselves.
+    """
+    global _listener
+    if _listener is None:
+        logs_dir = Path(__file__).parent / "logs"
+        logs_dir.mkdir(exist_ok=True)
+
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [
             logging.FileHandler(logs_dir / "biome.log", encoding='utf-8'),
             logging.StreamHandler()
         ]
-    )
-    return logging.getLogger(__name__)
-
-# Initialize logging
-logger = setup_logging()
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(-1)
+        root = logging.getLogger()
+        root.setLevel(logging.DEBUG)
+        root.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return logger
 
 from typing import Dict, Any, List, Optional
 import json
@@ -300,6 +316,7 @@ def view_reports(
 
 def main():
     """Main entry point for the CLI."""
+    setup_logging()
     try:
         action, params = show_main_menu()
         if action == "start":
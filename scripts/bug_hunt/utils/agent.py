@@ -16,11 +16,6 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 # Initialize Rich console
 console = Console()
 
@@ -199,6 +194,11 @@ Format:
             return {"error": error_msg, "status": "failed"}
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
     # Configure paths
     PR_REPORTS_PATH = Path("/Users/ilessio/dev-agents/ELIZA_FIX/eliza_aiflow/scripts/bug_hunt/reports")
 
@@ -7,27 +7,6 @@ from termcolor import colored
 from datetime import datetime
 import logging
 
-# Setup logging configuration at module level
-def setup_logging():
-    # Create logs directory if it doesn't exist
-    logs_dir = Path(__file__).parent.parent / "logs"
-    logs_dir.mkdir(exist_ok=True)
-
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            # File handler for biome.log
-            logging.FileHandler(logs_dir / "biome.log", encoding='utf-8'),
-            # Console handler for immediate feedback
-            logging.StreamHandler()
-        ]
-    )
-
-# Call setup_logging when module is imported
-setup_logging()
-
 @dataclass
 class BiomeDiagnostic:
     message: str
@@ -247,11 +226,6 @@ class ReportGenerator:
         self.reports_dir = Path(reports_dir)
         self.reports_dir.mkdir(exist_ok=True)
 
-        # Setup logging
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
         self.logger = logging.getLogger(__name__)
 
     def parse_biome_output(self, output: str, plugin_name: str) -> BiomeReport: